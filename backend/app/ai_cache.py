@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .db_pool import ConnectionPool
+
+load_dotenv()
+
+# Kept next to app.db but in its own file, so cache churn never contends
+# with payment ingest for the app.db write lock
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "data" / "ai_cache.db"
+# Expired rows are purged at least this often (in stores), and on reaching the cap
+_SWEEP_EVERY_STORES = 256
+# Eviction trims the disk tier to this share of its cap, so it does not rerun on every store
+_EVICT_TO_FRACTION = 0.9
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars hash like the equal Python value; anything else as text
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class AICache:
+    """
+    Two-tier cache for AI responses.
+
+    - Memory tier: LRU of recent entries, served without touching disk
+    - Disk tier: SQLite table that survives restarts; disk hits are promoted
+
+    Entries expire ``ttl_seconds`` after they were stored. Each tier is capped
+    in entries and evicts least recently used entries first; the disk tier is
+    swept (expired rows purged, then trimmed below the cap) every few hundred
+    stores or when it reaches the cap, not on every write. Keys are content
+    hashes (see ``make_key``), so an entity whose metrics change simply misses.
+    """
+
+    def __init__(self, path: Path, memory_entries: int, disk_entries: int, ttl_seconds: int):
+        self.path = Path(path)
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._pool = ConnectionPool(self.path)
+        self._initialized = False
+        # Upper bound on disk rows since the last sweep (replacements count as new)
+        self._disk_estimate = 0
+        self._stores_since_sweep = 0
+        self._counters = {
+            "memoryHits": 0,
+            "diskHits": 0,
+            "misses": 0,
+            "stores": 0,
+            "expired": 0,
+            "memoryEvictions": 0,
+            "diskEvictions": 0,
+        }
+
+    @staticmethod
+    def make_key(task: str, entity_type: str, data: Any, model: str, system: str = "") -> str:
+        """sha256 over the task, entity type, model, system prompt and canonical JSON of the data."""
+        payload = json.dumps(
+            {"task": task, "entity": entity_type, "model": model, "system": system, "data": data},
+            sort_keys=True, default=_json_default, separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _ensure_schema(self) -> None:
+        if self._initialized:
+            return
+        with self._pool.connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                Key TEXT PRIMARY KEY,
+                Value TEXT,
+                ExpiresAt REAL,
+                LastUsed REAL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache(LastUsed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_expires_at ON ai_cache(ExpiresAt)")
+            self._disk_estimate = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        self._initialized = True
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+                self._counters["memoryEvictions"] += 1
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(True, value)`` on a hit, ``(False, None)`` on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memoryHits"] += 1
+                    return True, entry[1]
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        self._ensure_schema()
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT Value, ExpiresAt FROM ai_cache WHERE Key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                conn.execute("DELETE FROM ai_cache WHERE Key = ?", (key,))
+                self._count("expired")
+                row = None
+            elif row is not None:
+                conn.execute("UPDATE ai_cache SET LastUsed = ? WHERE Key = ?", (now, key))
+
+        if row is None:
+            self._count("misses")
+            return False, None
+
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        self._count("diskHits")
+        return True, value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in both tiers; sweeps the disk tier when due."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, expires_at, value)
+        self._ensure_schema()
+        with self._pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (Key, Value, ExpiresAt, LastUsed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+        with self._lock:
+            self._counters["stores"] += 1
+            self._disk_estimate += 1
+            self._stores_since_sweep += 1
+            sweep = self._disk_estimate > self.disk_entries or self._stores_since_sweep >= _SWEEP_EVERY_STORES
+        if sweep:
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        """Purge expired rows, then evict least recently used rows down to 90% of the cap."""
+        with self._pool.connection() as conn:
+            expired = conn.execute("DELETE FROM ai_cache WHERE ExpiresAt <= ?", (now,)).rowcount
+            evicted = 0
+            remaining = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+            if remaining > self.disk_entries:
+                evicted = conn.execute(
+                    """
+                    DELETE FROM ai_cache WHERE Key IN (
+                        SELECT Key FROM ai_cache ORDER BY LastUsed DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (int(self.disk_entries * _EVICT_TO_FRACTION),),
+                ).rowcount
+        with self._lock:
+            self._disk_estimate = remaining - evicted
+            self._stores_since_sweep = 0
+            self._counters["expired"] += expired
+            self._counters["diskEvictions"] += evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        self._ensure_schema()
+        with self._pool.connection() as conn:
+            conn.execute("DELETE FROM ai_cache")
+        with self._lock:
+            self._disk_estimate = 0
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_schema()
+        with self._pool.connection() as conn:
+            disk_entries = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+        hits = counters["memoryHits"] + counters["diskHits"]
+        lookups = hits + counters["misses"]
+        return {
+            "path": str(self.path),
+            "ttlSeconds": self.ttl_seconds,
+            "memoryEntries": memory_entries,
+            "memoryCapacity": self.memory_entries,
+            "diskEntries": disk_entries,
+            "diskCapacity": self.disk_entries,
+            **counters,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        self._pool.close_all()
+
+
+def _enabled() -> bool:
+    return os.getenv("AI_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+# Shared cache for call_ai summaries and recommendations
+ai_cache: Optional[AICache] = AICache(
+    path=Path(os.getenv("AI_CACHE_PATH") or DEFAULT_CACHE_PATH),
+    memory_entries=int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "1024")),
+    disk_entries=int(os.getenv("AI_CACHE_DISK_ENTRIES", "50000")),
+    ttl_seconds=int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+) if _enabled() else None
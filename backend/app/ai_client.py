@@ -0,0 +1,133 @@
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+
+# ------------------------------
+# Settings
+# ------------------------------
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# In-flight async model calls per worker; extra callers wait for a slot
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "64"))
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS)
+
+
+def api_key_configured() -> bool:
+    key = os.getenv("OPENAI_API_KEY")
+    return bool(key) and key != "your_openai_api_key_here"
+
+
+# ------------------------------
+# Clients
+# ------------------------------
+# Blocking client for sync callers (thread pools, jobs); keep-alive pooled
+sync_client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+)
+
+_async_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Process-wide AsyncOpenAI client over one keep-alive httpx connection pool.
+    Created lazily so it binds to the server's event loop.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        )
+    return _async_client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def achat(
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    timeout: Optional[float] = None
+) -> str:
+    """
+    One chat completion on the shared async client, bounded by
+    AI_MAX_CONCURRENCY and a per-call timeout (OPENAI_TIMEOUT_SECONDS by
+    default). Returns the message content; OpenAI errors propagate.
+    """
+    async with _get_semaphore():
+        response = await get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout if timeout is not None else OPENAI_TIMEOUT_SECONDS,
+        )
+    return response.choices[0].message.content
+
+
+async def astream_chat(
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: int = 1000,
+    temperature: float = 0.5,
+    timeout: Optional[float] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of achat: yields content deltas as the model produces
+    them. Holds a concurrency slot until the stream ends; OpenAI errors
+    propagate (before the first delta for request errors).
+    """
+    async with _get_semaphore():
+        stream = await get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout if timeout is not None else OPENAI_TIMEOUT_SECONDS,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+
+
+async def aclose() -> None:
+    """Close the async client's connection pool (on shutdown)."""
+    global _async_client, _semaphore
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = None
+    _semaphore = None
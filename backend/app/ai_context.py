@@ -0,0 +1,180 @@
+import io
+import os
+import re
+from itertools import zip_longest
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from .utils import estimate_tokens, select_top_k
+
+load_dotenv()
+
+# ------------------------------
+# Settings
+# ------------------------------
+# Estimated prompt tokens for the data context of one analysis call
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "3000"))
+# Upper bound on sample rows, whatever the budget
+AI_CONTEXT_MAX_ROWS = int(os.getenv("AI_CONTEXT_MAX_ROWS", "200"))
+
+LOYALTY_TIERS = ["Platinum", "Gold", "Silver", "Bronze"]
+
+# Query words -> the column a question is about, first match wins
+COLUMN_KEYWORDS: List[Tuple[str, Sequence[str]]] = [
+    ("RepaymentRate", ("repay", "on-time", "on time", "paid")),
+    ("DefaultRate", ("default",)),
+    ("DisputeRate", ("dispute",)),
+    ("DisputeCount", ("dispute",)),
+    ("TransactionVolume", ("volume", "transaction", "spend", "revenue", "amount")),
+    ("TenureMonths", ("tenure", "longest", "oldest")),
+    ("EngagementScore", ("engag",)),
+    ("ComplianceScore", ("complian",)),
+    ("ResponsivenessScore", ("responsive",)),
+    ("TrustScore", ("trust", "score", "reliab")),
+]
+# Columns where a high value is bad, so "risky" questions want the top of them
+RISK_COLUMNS = {"DefaultRate", "DisputeRate", "DisputeCount"}
+LOW_WORDS = {"low", "lowest", "worst", "bottom", "least", "fewest", "smallest", "poor", "poorest", "weak", "weakest"}
+HIGH_WORDS = {"top", "best", "highest", "most", "largest", "biggest", "strongest"}
+RISK_PREFIXES = ("risk", "concern", "problem", "churn", "struggl")
+
+
+# ------------------------------
+# Column statistics
+# ------------------------------
+def describe_frame(df: pd.DataFrame, id_column: str) -> str:
+    """
+    Pre-aggregated statistics over the whole population as compact CSV:
+    count and quantiles per numeric column, value counts per categorical one.
+    Independent of the query, so callers can memoize it per data version.
+    """
+    lines = [f"rows: {len(df)}"]
+    numeric = df.select_dtypes("number")
+    if not numeric.empty:
+        stats = numeric.describe(percentiles=[0.25, 0.5, 0.75]).T
+        stats = stats[["mean", "min", "25%", "50%", "75%", "max"]].round(3)
+        lines.append("column,mean,min,p25,median,p75,max")
+        lines.extend(
+            f"{column},{','.join(_format(value) for value in row)}"
+            for column, row in zip(stats.index, stats.itertuples(index=False, name=None))
+        )
+    for column in df.select_dtypes(exclude="number").columns:
+        if column == id_column or df[column].nunique() > 20:
+            continue
+        counts = df[column].value_counts()
+        lines.append(f"{column} counts: " + ", ".join(f"{value}={count}" for value, count in counts.items()))
+    return "\n".join(lines)
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}".rstrip("0").rstrip(".") if pd.notna(value) else ""
+    return str(value)
+
+
+# ------------------------------
+# Relevance-selected sample
+# ------------------------------
+def select_relevant_rows(
+    df: pd.DataFrame,
+    query: str,
+    id_column: str,
+    name_column: Optional[str] = None,
+    max_rows: int = AI_CONTEXT_MAX_ROWS
+) -> Tuple[pd.DataFrame, str]:
+    """
+    Up to ``max_rows`` rows ordered by relevance to ``query``, and how they were chosen:
+
+    - entities named by ID (or name) in the query come first
+    - a tier mentioned in the query restricts the rest to that tier
+    - the rest are the top of the column the query is about (TrustScore by
+      default), highest first unless it asks for the lowest/worst, and
+      riskiest first for risk questions
+    - a query with no ranking signal gets both ends of the TrustScore range
+    """
+    text = query.lower()
+    notes = []
+
+    # Case variants of the query's words and phrases, matched without
+    # transforming the (possibly million-row) ID and name columns
+    tokens = re.findall(r"[A-Za-z0-9_-]+", query)
+    candidates = {variant for token in tokens for variant in (token, token.upper())}
+    mentioned = df[id_column].isin(candidates)
+    if name_column:
+        grams = {" ".join(tokens[i:i + n]) for n in (1, 2, 3) for i in range(len(tokens) - n + 1)}
+        mentioned |= df[name_column].isin({variant for gram in grams for variant in (gram, gram.title())})
+    named = df[mentioned].iloc[:max_rows]
+    if len(named):
+        notes.append(f"{len(named)} mentioned by ID or name")
+
+    rest = df[~mentioned] if len(named) else df
+    tiers = [tier for tier in LOYALTY_TIERS if tier.lower() in text]
+    if tiers:
+        rest = rest[rest["LoyaltyTier"].isin(tiers)]
+        notes.append(f"{len(rest)} in tier {'/'.join(tiers)}")
+    k = max_rows - len(named)
+
+    column = next(
+        (col for col, words in COLUMN_KEYWORDS if col in rest and any(word in text for word in words)),
+        None,
+    )
+    words = set(re.findall(r"[a-z]+", text))
+    risky = any(word.startswith(RISK_PREFIXES) for word in words)
+    low = bool(words & LOW_WORDS)
+    if column is None and not (risky or low or words & HIGH_WORDS):
+        # No ranking signal: alternate the highest and lowest TrustScores
+        k = min(k, len(rest))
+        top = select_top_k(rest, ["TrustScore"], [False], (k + 1) // 2)
+        bottom = select_top_k(rest.drop(top.index), ["TrustScore"], [True], k // 2)
+        labels = [label for pair in zip_longest(top.index, bottom.index) for label in pair if label is not None]
+        notes.append("alternating highest and lowest TrustScore")
+        return pd.concat([named, rest.loc[labels]]), "; ".join(notes)
+
+    column = column or "TrustScore"
+    ascending = column not in RISK_COLUMNS if risky and not low else low
+    ranked = select_top_k(rest, [column], [ascending], k)
+    notes.append(f"top {column} {'ascending' if ascending else 'descending'}")
+    return pd.concat([named, ranked]), "; ".join(notes)
+
+
+# ------------------------------
+# Context
+# ------------------------------
+def build_context(
+    df: pd.DataFrame,
+    query: str,
+    id_column: str,
+    columns: Sequence[str],
+    stats: Optional[str] = None,
+    name_column: Optional[str] = None,
+    token_budget: int = AI_CONTEXT_TOKEN_BUDGET,
+    max_rows: int = AI_CONTEXT_MAX_ROWS
+) -> str:
+    """
+    Compact data context for an analysis prompt, within ``token_budget``
+    estimated tokens: population statistics (``stats`` from describe_frame,
+    or computed here) followed by a CSV sample of the rows most relevant to
+    ``query``, added until the budget or ``max_rows`` is reached.
+    """
+    stats = stats if stats is not None else describe_frame(df[list(columns)], id_column)
+    ordered, how = select_relevant_rows(df, query, id_column, name_column, max_rows)
+
+    header = f"Population statistics:\n{stats}\n\nSample rows ({how}), CSV:\n"
+    budget = token_budget - estimate_tokens(header)
+    # Encode the candidates once, then keep whole lines that fit the budget
+    buffer = io.StringIO()
+    ordered[list(columns)].to_csv(buffer, index=False, float_format="%.4g", lineterminator="\n")
+    lines = buffer.getvalue().splitlines()
+
+    kept = [lines[0]]
+    budget -= estimate_tokens(lines[0])
+    for line in lines[1:]:
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        kept.append(line)
+        budget -= cost
+
+    return header + "\n".join(kept) + f"\n({len(kept) - 1} of {len(df)} rows shown)"
@@ -0,0 +1,214 @@
+import csv
+import io
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------
+# Settings
+# ------------------------------
+# CSV bytes parsed and committed per transaction; bounds the loader's memory
+BULK_LOAD_CHUNK_MB = int(os.getenv("BULK_LOAD_CHUNK_MB", "8"))
+# Rows handed to executemany at a time within a chunk
+_INSERT_BATCH_ROWS = 50_000
+
+
+def _create_progress_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS load_progress (
+            TableName TEXT PRIMARY KEY,
+            Source TEXT NOT NULL,
+            SourceSize INTEGER NOT NULL,
+            SourceMtimeNs INTEGER NOT NULL,
+            ByteOffset INTEGER NOT NULL,
+            RowsLoaded INTEGER NOT NULL,
+            Completed INTEGER NOT NULL DEFAULT 0,
+            StartedAt REAL,
+            UpdatedAt REAL
+        )
+        """
+    )
+
+
+def load_progress(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Every tracked CSV load: source, bytes/rows loaded and whether it finished."""
+    _create_progress_table(conn)
+    cursor = conn.execute("SELECT * FROM load_progress ORDER BY TableName")
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _column_dtype(declared_type: str) -> Optional[str]:
+    """pandas dtype for a column's declared SQLite type (affinity rules); None lets pandas infer."""
+    declared_type = declared_type.upper()
+    if "INT" in declared_type:
+        return "Int64"
+    if any(name in declared_type for name in ("CHAR", "CLOB", "TEXT")):
+        return "str"
+    if any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return "float64"
+    return None
+
+
+def _read_header(source: BinaryIO, conn: sqlite3.Connection, table: str, path: Path) -> Tuple[List[str], Dict[str, str]]:
+    """
+    The CSV's column names, checked against ``table``'s schema, and the dtype
+    to parse each with. Raises ValueError for unknown or repeated columns, so
+    a malformed header fails before anything is written.
+    """
+    header = next(csv.reader([source.readline().decode("utf-8-sig")], skipinitialspace=True), [])
+    columns = [name.strip() for name in header]
+    schema = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+    unknown = [name for name in columns if name not in schema]
+    if not columns or unknown:
+        raise ValueError(f"{path.name}: header columns not in {table}: {unknown or columns}")
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"{path.name}: repeated header columns: {columns}")
+    dtypes = {name: _column_dtype(schema[name]) for name in columns}
+    return columns, {name: dtype for name, dtype in dtypes.items() if dtype}
+
+
+def _read_chunk(
+    source: BinaryIO,
+    chunk_bytes: int,
+    columns: List[str],
+    dtypes: Dict[str, str]
+) -> Optional[Tuple[pd.DataFrame, int]]:
+    """The next whole-line block of ``source`` as a frame, and the byte offset after it."""
+    block = source.read(chunk_bytes)
+    if not block:
+        return None
+    if not block.endswith(b"\n"):
+        block += source.readline()
+    if not block.strip():
+        return pd.DataFrame(columns=columns), source.tell()
+    frame = pd.read_csv(io.BytesIO(block), header=None, names=columns, dtype=dtypes)
+    return frame, source.tell()
+
+
+def _bind_values(values: pd.Series) -> list:
+    """Plain Python values for executemany; missing values (NaN, NA) bind as NULL."""
+    if values.hasnans:
+        return values.astype(object).where(values.notna(), None).tolist()
+    return values.tolist()
+
+
+def load_csv(
+    conn: sqlite3.Connection,
+    table: str,
+    path: Path,
+    chunk_bytes: int = BULK_LOAD_CHUNK_MB * 1024 * 1024
+) -> Dict[str, Any]:
+    """
+    Stream ``path`` into ``table`` in ``chunk_bytes`` blocks, one transaction
+    per block, and return the load's progress row.
+
+    - Memory is bounded by the chunk size, not the file size
+    - Each transaction also records the byte offset and row count reached in
+      load_progress, so an interrupted load resumes from the last committed
+      block (unless the CSV changed meanwhile, in which case it restarts)
+    - The next block is parsed on a reader thread while this one is inserted
+    - Runs with synchronous=OFF; the connection's setting is restored after
+    - A table that already has rows and no progress record is left alone
+
+    - The header must name columns of ``table`` (ValueError otherwise); values
+      are parsed with dtypes from the table's declared column types
+
+    Records must not span lines (no quoted newlines), as with the bundled
+    data generators. Secondary indexes are left to the caller to build after.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    _create_progress_table(conn)
+    stat = path.stat()
+    with open(path, "rb") as source:
+        columns, dtypes = _read_header(source, conn, table, path)
+    progress = conn.execute(
+        "SELECT Source, SourceSize, SourceMtimeNs, ByteOffset, RowsLoaded, Completed FROM load_progress WHERE TableName = ?",
+        (table,),
+    ).fetchone()
+
+    if progress is None:
+        if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            return {"TableName": table, "Completed": 1, "RowsLoaded": None, "skipped": "table already populated"}
+        offset, rows_loaded = 0, 0
+    elif progress[5]:
+        return {"TableName": table, "Completed": 1, "RowsLoaded": progress[4], "skipped": "already loaded"}
+    elif progress[:3] != (str(path), stat.st_size, stat.st_mtime_ns):
+        logger.warning(f"{path.name} changed since the interrupted load of {table}; restarting it")
+        conn.execute(f"DELETE FROM {table}")
+        conn.commit()
+        offset, rows_loaded = 0, 0
+    else:
+        offset, rows_loaded = progress[3], progress[4]
+        logger.info(f"Resuming load of {table} from {path.name} at row {rows_loaded:,}")
+
+    started = time.time()
+    conn.execute(
+        """
+        INSERT INTO load_progress VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+        ON CONFLICT(TableName) DO UPDATE SET
+            Source = excluded.Source, SourceSize = excluded.SourceSize,
+            SourceMtimeNs = excluded.SourceMtimeNs, ByteOffset = excluded.ByteOffset,
+            RowsLoaded = excluded.RowsLoaded, UpdatedAt = excluded.UpdatedAt
+        """,
+        (table, str(path), stat.st_size, stat.st_mtime_ns, offset, rows_loaded, started, started),
+    )
+    conn.commit()
+
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA synchronous=OFF")
+    session_rows, session_start = 0, time.perf_counter()
+    try:
+        with open(path, "rb") as source, ThreadPoolExecutor(max_workers=1) as reader:
+            # Header columns were validated against the table above
+            insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            source.readline()
+            source.seek(max(offset, source.tell()))
+            pending = reader.submit(_read_chunk, source, chunk_bytes, columns, dtypes)
+            while (chunk := pending.result()) is not None:
+                frame, offset = chunk
+                pending = reader.submit(_read_chunk, source, chunk_bytes, columns, dtypes)
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for start in range(0, len(frame), _INSERT_BATCH_ROWS):
+                        part = frame.iloc[start:start + _INSERT_BATCH_ROWS]
+                        conn.executemany(insert, zip(*(_bind_values(part[column]) for column in columns)))
+                    rows_loaded += len(frame)
+                    conn.execute(
+                        "UPDATE load_progress SET ByteOffset = ?, RowsLoaded = ?, UpdatedAt = ? WHERE TableName = ?",
+                        (offset, rows_loaded, time.time(), table),
+                    )
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+
+                session_rows += len(frame)
+                elapsed = time.perf_counter() - session_start
+                logger.info(
+                    f"{table}: {rows_loaded:,} rows ({offset / max(stat.st_size, 1):.1%}), "
+                    f"{session_rows / elapsed if elapsed else 0:,.0f} rows/s"
+                )
+
+        conn.execute("UPDATE load_progress SET Completed = 1, UpdatedAt = ? WHERE TableName = ?", (time.time(), table))
+        conn.commit()
+    finally:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+
+    elapsed = time.perf_counter() - session_start
+    logger.info(f"Loaded {session_rows:,} rows into {table} in {elapsed:.1f}s")
+    return next(row for row in load_progress(conn) if row["TableName"] == table)
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from .db import DATA_DIR, get_connection, get_data_version
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow import fs
+except ImportError:  # optional dependency: the store then reads from SQLite
+    pa = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within the process
+    fcntl = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------
+# Settings
+# ------------------------------
+COLUMNAR_STORE_ENABLED = os.getenv("COLUMNAR_STORE_ENABLED", "0").lower() not in ("0", "false", "no")
+COLUMNAR_STORE_DIR = Path(os.getenv("COLUMNAR_STORE_DIR") or DATA_DIR / "payments_parquet")
+# Payments copied from app.db per Parquet write
+_EXPORT_BATCH_ROWS = 250_000
+# Month partitions with more files than this are compacted into one
+_MAX_FILES_PER_MONTH = 32
+
+PAYMENT_COLUMNS = [
+    "PaymentID", "CustomerID", "CustomerName", "MerchantID", "MerchantName",
+    "PaymentDate", "PaymentAmount", "PaymentStatus", "DisputeFlag", "DefaultFlag",
+]
+
+
+def _payments_schema() -> "pa.Schema":
+    text = ["PaymentID", "CustomerID", "CustomerName", "MerchantID", "MerchantName", "PaymentDate", "PaymentStatus"]
+    return pa.schema(
+        [(column, pa.string() if column in text else pa.float64() if column == "PaymentAmount" else pa.int64())
+         for column in PAYMENT_COLUMNS]
+    )
+
+
+class ColumnarPaymentStore:
+    """
+    Optional columnar copy of the payments table: Parquet files partitioned by
+    month (``Month=YYYY-MM/``), read through memory-mapped Arrow so a reader
+    only touches the columns and months it asks for.
+
+    app.db stays the source of truth. ``sync`` appends payments added since
+    the last sync (by rowid) as new files; it runs at startup, where it also
+    checks the copy against the table and rebuilds it if they differ, and
+    after each ingest. Writers hold a lock file, so API worker processes
+    sharing the directory never write it at the same time. Reads never sync:
+    ``read_payments`` uses Parquet only when the manifest's watermark matches
+    app.db, and reads the same columns from SQLite when it is behind, without
+    pyarrow, or with the store disabled or failing.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        enabled: bool,
+        connect: Callable[[], ContextManager[sqlite3.Connection]] = get_connection
+    ):
+        self.path = path
+        self._connect = connect
+        self.enabled = enabled and pa is not None
+        if enabled and pa is None:
+            logger.warning("COLUMNAR_STORE_ENABLED is set but pyarrow is not installed; reading payments from SQLite")
+        self._sync_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._counters = {
+            "parquetReads": 0, "sqliteReads": 0, "staleReads": 0, "fallbacks": 0, "rowsAppended": 0, "rebuilds": 0,
+        }
+
+    # ------------------------------
+    # Manifest: what the Parquet copy holds
+    # ------------------------------
+    @property
+    def _manifest_path(self) -> Path:
+        return self.path / "_manifest.json"
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        temp = self._manifest_path.with_suffix(".tmp")
+        temp.write_text(json.dumps(manifest))
+        os.replace(temp, self._manifest_path)
+
+    def _dataset(self) -> "ds.Dataset":
+        schema = _payments_schema().append(pa.field("Month", pa.string()))
+        return ds.dataset(
+            self.path,
+            schema=schema,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([("Month", pa.string())]), flavor="hive"),
+            filesystem=fs.LocalFileSystem(use_mmap=True),
+            ignore_prefixes=["_", "."],  # _manifest.json
+        )
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        """Exclusive access to the manifest and partitions, across threads and processes."""
+        with self._sync_lock:
+            if fcntl is None:
+                yield
+                return
+            # Next to the directory, which a rebuild deletes
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_name(f"{self.path.name}.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ------------------------------
+    # Sync from app.db
+    # ------------------------------
+    @staticmethod
+    def _watermark(conn: sqlite3.Connection) -> Tuple[int, int]:
+        """app.db's (data version, max payments rowid), as recorded in the manifest after a sync."""
+        max_rowid = conn.execute("SELECT MAX(rowid) FROM payments").fetchone()[0] or 0
+        return get_data_version(conn), max_rowid
+
+    def _is_current(self, conn: sqlite3.Connection, manifest: Optional[Dict[str, Any]]) -> bool:
+        """Whether the files hold exactly the payments up to the manifest's rowid."""
+        if manifest is None:
+            return False
+        exported = conn.execute("SELECT COUNT(*) FROM payments WHERE rowid <= ?", (manifest["maxRowid"],)).fetchone()[0]
+        return exported == manifest["rows"] == self._dataset().count_rows()
+
+    def _append(self, conn: sqlite3.Connection, manifest: Dict[str, Any]) -> int:
+        appended = 0
+        months = set()
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, {', '.join(PAYMENT_COLUMNS)} FROM payments WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (manifest["maxRowid"], _EXPORT_BATCH_ROWS),
+            ).fetchall()
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            table = pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns[1:], _payments_schema())],
+                schema=_payments_schema(),
+            )
+            month = pc.utf8_slice_codeunits(table["PaymentDate"], 0, 7)
+            table = table.append_column("Month", month)
+            ds.write_dataset(
+                table,
+                self.path,
+                format="parquet",
+                partitioning=["Month"],
+                partitioning_flavor="hive",
+                basename_template=f"part-{manifest['files']:06d}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            months.update(month.unique().to_pylist())
+            manifest.update(maxRowid=columns[0][-1], rows=manifest["rows"] + len(rows), files=manifest["files"] + 1)
+            appended += len(rows)
+
+        for month in months:
+            self._compact(self.path / f"Month={month}", manifest)
+        return appended
+
+    def _compact(self, partition: Path, manifest: Dict[str, Any]) -> None:
+        """Rewrite a month partition grown by many small ingest appends as one file."""
+        files = sorted(partition.glob("*.parquet"))
+        if len(files) <= _MAX_FILES_PER_MONTH:
+            return
+        table = ds.dataset(files, schema=_payments_schema(), format="parquet").to_table()
+        pq.write_table(table, partition / f"part-{manifest['files']:06d}-compact.parquet")
+        manifest["files"] += 1
+        for file in files:
+            file.unlink()
+
+    def sync(self, conn: Optional[sqlite3.Connection] = None, verify: bool = False) -> Dict[str, Any]:
+        """
+        Bring the Parquet copy up to date with app.db; returns the store's stats.
+
+        Called at startup and after ingest, never by reads. Appends trust the
+        manifest's rowid watermark, so the work is proportional to the new
+        payments. ``verify`` (startup) also checks the copy against the table's
+        row counts, an O(payments) scan, and rebuilds it on mismatch.
+        """
+        if not self.enabled:
+            return self.stats()
+        if conn is None:
+            with self._connect() as conn:
+                return self.sync(conn, verify)
+
+        with self._writing():
+            manifest = self._read_manifest()
+            version, max_rowid = self._watermark(conn)
+            if not verify and manifest is not None and (manifest["dataVersion"], manifest["maxRowid"]) == (version, max_rowid):
+                return self.stats()
+            # Without a manifest, or with a table that shrank below it (app.db replaced), start over
+            usable = manifest is not None and self.path.exists() and manifest["maxRowid"] <= max_rowid
+            if not usable or (verify and not self._is_current(conn, manifest)):
+                logger.info(f"Rebuilding the columnar payments store in {self.path}")
+                shutil.rmtree(self.path, ignore_errors=True)
+                self.path.mkdir(parents=True)
+                manifest = {"maxRowid": 0, "rows": 0, "files": 0, "dataVersion": None}
+                with self._lock:
+                    self._counters["rebuilds"] += 1
+            start = time.perf_counter()
+            appended = self._append(conn, manifest)
+            manifest["dataVersion"] = version
+            self._write_manifest(manifest)
+            with self._lock:
+                self._counters["rowsAppended"] += appended
+            if appended:
+                logger.info(f"Appended {appended:,} payments to the columnar store in {time.perf_counter() - start:.2f}s")
+        return self.stats()
+
+    def rebuild(self) -> Dict[str, Any]:
+        """Drop the Parquet copy and export it again from app.db."""
+        with self._writing():
+            shutil.rmtree(self.path, ignore_errors=True)
+        return self.sync()
+
+    # ------------------------------
+    # Reads
+    # ------------------------------
+    def _read_sqlite(self, columns: Sequence[str], months: Optional[Sequence[str]]) -> pd.DataFrame:
+        query = f"SELECT {', '.join(columns)} FROM payments"
+        params: List[str] = []
+        if months is not None:
+            query += f" WHERE substr(PaymentDate, 1, 7) IN ({', '.join('?' * len(months))})"
+            params = list(months)
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def _read_parquet(self, columns: Sequence[str], months: Optional[Sequence[str]]) -> pd.DataFrame:
+        # The month filter prunes whole partition directories before any file is opened
+        month_filter = ds.field("Month").isin(list(months)) if months is not None else None
+        return self._dataset().to_table(columns=list(columns), filter=month_filter).to_pandas()
+
+    def read_payments(self, columns: Sequence[str] = PAYMENT_COLUMNS, months: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        ``columns`` of the payments in ``months`` ("YYYY-MM"; all when None), from
+        Parquet when the store is enabled and in sync with app.db, and otherwise
+        (or on failure) from app.db. Row order is unspecified.
+        """
+        if self.enabled:
+            try:
+                manifest = self._read_manifest()
+                with self._connect() as conn:
+                    watermark = self._watermark(conn)
+                if manifest is not None and (manifest["dataVersion"], manifest["maxRowid"]) == watermark:
+                    frame = self._read_parquet(columns, months)
+                    with self._lock:
+                        self._counters["parquetReads"] += 1
+                    return frame
+                # Ingested (possibly by another process) and not synced yet: only app.db has every payment
+                with self._lock:
+                    self._counters["staleReads"] += 1
+            except (OSError, pa.ArrowException) as exc:
+                logger.warning(f"Columnar store read failed ({exc}); reading payments from SQLite")
+                with self._lock:
+                    self._counters["fallbacks"] += 1
+
+        frame = self._read_sqlite(columns, months)
+        with self._lock:
+            self._counters["sqliteReads"] += 1
+        return frame
+
+    def stats(self) -> Dict[str, Any]:
+        manifest = self._read_manifest() if self.enabled else None
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "enabled": self.enabled,
+            "pyarrowAvailable": pa is not None,
+            "path": str(self.path),
+            "rows": manifest["rows"] if manifest else None,
+            "files": len(list(self.path.glob("Month=*/*.parquet"))) if manifest else None,
+            "months": len(list(self.path.glob("Month=*"))) if manifest else None,
+            "dataVersion": manifest["dataVersion"] if manifest else None,
+            "bytes": sum(file.stat().st_size for file in self.path.glob("Month=*/*.parquet")) if manifest else None,
+            **counters,
+        }
+
+
+# Shared by the payments snapshot and /system/columnar-store
+columnar_store = ColumnarPaymentStore(COLUMNAR_STORE_DIR, COLUMNAR_STORE_ENABLED)
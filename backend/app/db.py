@@ -1,7 +1,12 @@
 import sqlite3
 from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
 
-import pandas as pd
+import numpy as np
+
+from .bulk_load import BULK_LOAD_CHUNK_MB, load_csv
+from .db_pool import ConnectionPool
+from .utils import calculate_customer_trust_scores, assign_loyalty_tiers
 
 
 # Use app/data for both CSVs and the SQLite DB
@@ -12,9 +17,28 @@ PAYMENTS_CSV = DATA_DIR / "payments.csv"
 MERCHANTS_CSV = DATA_DIR / "merchants_loyalty.csv"
 
 
-def _connect() -> sqlite3.Connection:
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+# Shared per-thread connections to app.db (WAL, tuned pragmas); see db_pool.py
+pool = ConnectionPool(DB_PATH)
+
+
+def get_connection():
+    """Context manager yielding this thread's pooled connection to app.db."""
+    return pool.connection()
+
+
+def dedicated_connection():
+    """Context manager yielding a private, non-pooled connection to app.db, closed on exit."""
+    return pool.dedicated()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool stats and applied pragmas for app.db."""
+    return pool.stats()
+
+
+def close_connections() -> None:
+    """Close every pooled connection to app.db (on shutdown)."""
+    pool.close_all()
 
 
 def _table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
@@ -30,12 +54,14 @@ def _row_count(conn: sqlite3.Connection, table_name: str) -> int:
     return int(cur.fetchone()[0])
 
 
-def init_db_from_csv() -> None:
+def init_db_from_csv(chunk_bytes: int = BULK_LOAD_CHUNK_MB * 1024 * 1024) -> None:
     """
     Initialize the SQLite database from CSVs if tables are missing or empty.
-    Creates basic indexes for faster aggregations used by dashboards.
+    CSVs are streamed in ``chunk_bytes`` blocks and resume after an interrupted
+    load (see bulk_load.load_csv). Creates basic indexes for faster
+    aggregations used by dashboards once the data is in.
     """
-    with _connect() as conn:
+    with get_connection() as conn:
         # Create tables if not exist
         conn.execute(
             """
@@ -72,18 +98,395 @@ def init_db_from_csv() -> None:
             """
         )
 
-        # Load from CSV if empty
-        if PAYMENTS_CSV.exists() and (_row_count(conn, "payments") == 0):
-            df = pd.read_csv(PAYMENTS_CSV)
-            df.to_sql("payments", conn, if_exists="append", index=False)
+        # Load from CSV if empty (or resume an interrupted load)
+        if PAYMENTS_CSV.exists():
+            load_csv(conn, "payments", PAYMENTS_CSV, chunk_bytes)
 
-        if MERCHANTS_CSV.exists() and (_row_count(conn, "merchants_loyalty") == 0):
-            dfm = pd.read_csv(MERCHANTS_CSV)
-            dfm.to_sql("merchants_loyalty", conn, if_exists="append", index=False)
+        if MERCHANTS_CSV.exists():
+            load_csv(conn, "merchants_loyalty", MERCHANTS_CSV, chunk_bytes)
 
         # Indexes for speed
         conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_status ON payments(PaymentStatus)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(PaymentDate)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_merchant ON payments(MerchantName)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_customer ON payments(CustomerID, PaymentDate)")
+
+        # Materialized per-customer aggregates and per-period rollups, built
+        # once from payments and then maintained by ingest_payments
+        _create_meta_table(conn)
+        _create_customer_metrics_table(conn)
+        _create_payment_rollup_tables(conn)
+        _create_enrichment_tables(conn)
+        if _row_count(conn, "payments") > 0:
+            if _row_count(conn, "customer_metrics") == 0:
+                rebuild_customer_metrics(conn)
+            if _row_count(conn, "payments_monthly") == 0:
+                rebuild_payment_rollups(conn)
+
+
+# ------------------------------
+# Data version
+# ------------------------------
+def _create_meta_table(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (Key TEXT PRIMARY KEY, Value INTEGER)")
+    conn.execute("INSERT OR IGNORE INTO meta (Key, Value) VALUES ('data_version', 0)")
+
+
+def get_data_version(conn: sqlite3.Connection) -> int:
+    """Counter bumped every time payments are ingested; 0 for a fresh database."""
+    row = conn.execute("SELECT Value FROM meta WHERE Key = 'data_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def _bump_data_version(conn: sqlite3.Connection) -> int:
+    conn.execute("UPDATE meta SET Value = Value + 1 WHERE Key = 'data_version'")
+    return get_data_version(conn)
+
+
+# ------------------------------
+# Payment deltas
+# ------------------------------
+def _payment_deltas(
+    payments: Iterable[Dict], key: Callable[[Dict], Hashable], name_field: Optional[str] = None
+) -> Dict[Hashable, List]:
+    """
+    Group a batch of payments into per-key counters:
+    [name, count, paid, disputes, defaults, total_cents, paid_cents].
+    Amounts are kept as integer cents so sums are exact in any order.
+    """
+    deltas: Dict[Hashable, List] = {}
+    for p in payments:
+        name = p[name_field] if name_field else None
+        delta = deltas.setdefault(key(p), [name, 0, 0, 0, 0, 0, 0])
+        cents = int(round(float(p["PaymentAmount"]) * 100))
+        paid = p["PaymentStatus"] == "PAID"
+        delta[0] = name
+        delta[1] += 1
+        delta[2] += paid
+        delta[3] += int(p["DisputeFlag"])
+        delta[4] += int(p["DefaultFlag"])
+        delta[5] += cents
+        delta[6] += cents if paid else 0
+    return deltas
+
+
+# ------------------------------
+# Materialized customer metrics
+# ------------------------------
+LOYALTY_SCORES = {"Platinum": 4, "Gold": 3, "Silver": 2, "Bronze": 1}
 
 
+def _create_customer_metrics_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS customer_metrics (
+            CustomerID TEXT PRIMARY KEY,
+            CustomerName TEXT,
+            PaymentCount INTEGER NOT NULL DEFAULT 0,
+            PaidCount INTEGER NOT NULL DEFAULT 0,
+            DisputeCount INTEGER NOT NULL DEFAULT 0,
+            DefaultCount INTEGER NOT NULL DEFAULT 0,
+            TotalCents INTEGER NOT NULL DEFAULT 0,
+            RepaymentRate REAL,
+            DefaultRate REAL,
+            TransactionVolume INTEGER,
+            TrustScore REAL,
+            LoyaltyTier TEXT,
+            LoyaltyScore INTEGER
+        )
+        """
+    )
+    # Matches the default /customers ordering, so top-K reads walk the index
+    # and stop after `limit` rows instead of sorting every customer
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_customer_metrics_rank "
+        "ON customer_metrics(TrustScore DESC, LoyaltyScore DESC, CustomerID)"
+    )
+
+
+def rebuild_customer_metrics(conn: sqlite3.Connection) -> int:
+    """
+    Recompute customer_metrics from scratch with one grouped scan of payments.
+    Returns the number of customers written.
+    """
+    conn.execute("DELETE FROM customer_metrics")
+    conn.execute(
+        """
+        INSERT INTO customer_metrics (
+            CustomerID, CustomerName, PaymentCount, PaidCount,
+            DisputeCount, DefaultCount, TotalCents
+        )
+        SELECT CustomerID,
+               MAX(CustomerName),
+               COUNT(*),
+               SUM(PaymentStatus = 'PAID'),
+               SUM(DisputeFlag),
+               SUM(DefaultFlag),
+               SUM(CAST(ROUND(PaymentAmount * 100) AS INTEGER))
+        FROM payments
+        GROUP BY CustomerID
+        """
+    )
+    return _rescore_customer_metrics(conn)
+
+
+def update_customer_metrics(conn: sqlite3.Connection, payments: Iterable[Dict]) -> int:
+    """
+    Fold newly added payments into customer_metrics in O(len(payments)).
+
+    Counts and sums are added to the stored aggregates, then only the touched
+    customers are re-scored. Callers are responsible for passing each payment
+    once (i.e. only rows that were actually inserted into ``payments``).
+    Returns the number of customers touched.
+    """
+    deltas = _payment_deltas(payments, key=lambda p: p["CustomerID"], name_field="CustomerName")
+    if not deltas:
+        return 0
+
+    conn.executemany(
+        """
+        INSERT INTO customer_metrics (
+            CustomerID, CustomerName, PaymentCount, PaidCount,
+            DisputeCount, DefaultCount, TotalCents
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(CustomerID) DO UPDATE SET
+            CustomerName = excluded.CustomerName,
+            PaymentCount = PaymentCount + excluded.PaymentCount,
+            PaidCount = PaidCount + excluded.PaidCount,
+            DisputeCount = DisputeCount + excluded.DisputeCount,
+            DefaultCount = DefaultCount + excluded.DefaultCount,
+            TotalCents = TotalCents + excluded.TotalCents
+        """,
+        [(customer_id, *delta[:6]) for customer_id, delta in deltas.items()],
+    )
+    return _rescore_customer_metrics(conn, list(deltas))
+
+
+def _rescore_customer_metrics(
+    conn: sqlite3.Connection, customer_ids: Optional[List[str]] = None
+) -> int:
+    """
+    Recompute rates, TrustScore and LoyaltyTier from the stored counts, using the
+    same rounding and vectorized formula as prepare_customer_metrics.
+    """
+    query = (
+        "SELECT CustomerID, PaymentCount, PaidCount, DisputeCount, DefaultCount, TotalCents "
+        "FROM customer_metrics"
+    )
+    if customer_ids is None:
+        rows = conn.execute(query).fetchall()
+    else:
+        rows = []
+        for start in range(0, len(customer_ids), 500):
+            chunk = customer_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(conn.execute(f"{query} WHERE CustomerID IN ({placeholders})", chunk))
+
+    if not rows:
+        return 0
+
+    ids, counts, paid, disputes, defaults, cents = (np.array(col) for col in zip(*rows))
+    counts = counts.astype(float)
+    repayment_rate = np.round(paid / counts, 2)
+    default_rate = np.round(defaults / counts, 2)
+    # Amounts are summed as integer cents so the total is exact whatever the
+    # order payments arrived in
+    transaction_volume = np.round(cents / 100, 0).astype(np.int64)
+    trust_score = calculate_customer_trust_scores(repayment_rate, disputes, default_rate)
+    loyalty_tier = assign_loyalty_tiers(trust_score)
+
+    conn.executemany(
+        """
+        UPDATE customer_metrics
+        SET RepaymentRate = ?, DefaultRate = ?, TransactionVolume = ?,
+            TrustScore = ?, LoyaltyTier = ?, LoyaltyScore = ?
+        WHERE CustomerID = ?
+        """,
+        zip(
+            repayment_rate.tolist(), default_rate.tolist(), transaction_volume.tolist(),
+            trust_score.tolist(), loyalty_tier.tolist(),
+            [LOYALTY_SCORES[tier] for tier in loyalty_tier], ids.tolist(),
+        ),
+    )
+    return len(rows)
+
+
+# ------------------------------
+# Daily / monthly rollups
+# ------------------------------
+# One row per period, status and merchant: time series, status mixes and
+# per-merchant totals read these instead of scanning payments. Customers are
+# not a rollup dimension (per customer and day is as large as payments
+# itself); their totals live in customer_metrics.
+ROLLUP_TABLES = {"payments_daily": ("Day", 10), "payments_monthly": ("Month", 7)}
+
+_ROLLUP_COLUMNS = """
+    PaymentStatus TEXT NOT NULL,
+    MerchantID TEXT NOT NULL,
+    MerchantName TEXT,
+    PaymentCount INTEGER NOT NULL DEFAULT 0,
+    DisputeCount INTEGER NOT NULL DEFAULT 0,
+    DefaultCount INTEGER NOT NULL DEFAULT 0,
+    AmountCents INTEGER NOT NULL DEFAULT 0
+"""
+
+
+def _create_payment_rollup_tables(conn: sqlite3.Connection) -> None:
+    for table, (period, _) in ROLLUP_TABLES.items():
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {period} TEXT NOT NULL,
+                {_ROLLUP_COLUMNS},
+                PRIMARY KEY ({period}, PaymentStatus, MerchantID)
+            )
+            """
+        )
+
+
+def rebuild_payment_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Recompute payments_daily and payments_monthly from payments; returns rows per table."""
+    rows = {}
+    for table, (period, length) in ROLLUP_TABLES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(
+            f"""
+            INSERT INTO {table}
+            SELECT substr(PaymentDate, 1, {length}), PaymentStatus, MerchantID, MAX(MerchantName),
+                   COUNT(*), SUM(DisputeFlag), SUM(DefaultFlag),
+                   SUM(CAST(ROUND(PaymentAmount * 100) AS INTEGER))
+            FROM payments
+            GROUP BY substr(PaymentDate, 1, {length}), PaymentStatus, MerchantID
+            """
+        )
+        rows[table] = _row_count(conn, table)
+    return rows
+
+
+def update_payment_rollups(conn: sqlite3.Connection, payments: List[Dict]) -> Dict[str, int]:
+    """Fold newly added payments into payments_daily and payments_monthly; returns rows touched per table."""
+    touched = {}
+    for table, (period, length) in ROLLUP_TABLES.items():
+        deltas = _payment_deltas(
+            payments,
+            key=lambda p: (str(p["PaymentDate"])[:length], p["PaymentStatus"], p["MerchantID"]),
+            name_field="MerchantName",
+        )
+        conn.executemany(
+            f"""
+            INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT({period}, PaymentStatus, MerchantID) DO UPDATE SET
+                MerchantName = excluded.MerchantName,
+                PaymentCount = PaymentCount + excluded.PaymentCount,
+                DisputeCount = DisputeCount + excluded.DisputeCount,
+                DefaultCount = DefaultCount + excluded.DefaultCount,
+                AmountCents = AmountCents + excluded.AmountCents
+            """,
+            [
+                (*key, name, count, disputes, defaults, total_cents)
+                for key, (name, count, _, disputes, defaults, total_cents, _) in deltas.items()
+            ],
+        )
+        touched[table] = len(deltas)
+    return touched
+
+
+def rebuild_rollups() -> Dict[str, Any]:
+    """
+    Rebuild the rollup tables from payments in one transaction (on demand,
+    e.g. after editing payments by hand). Bumps the data version so cached
+    responses and snapshots built from the old rollups are refreshed.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = rebuild_payment_rollups(conn)
+            version = _bump_data_version(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return {"rows": rows, "dataVersion": version}
+
+
+# ------------------------------
+# Precomputed AI enrichment
+# ------------------------------
+def _create_enrichment_tables(conn: sqlite3.Connection) -> None:
+    # One row per entity, written by the enrichment worker (app/jobs/enrichment_worker.py).
+    # MetricsHash identifies the metrics the row was generated from.
+    for table, id_column in (("customer_enrichment", "CustomerID"), ("merchant_enrichment", "MerchantID")):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {id_column} TEXT PRIMARY KEY,
+                MetricsHash TEXT NOT NULL,
+                Summary TEXT,
+                Recommendations TEXT,
+                RiskScore TEXT,
+                Benchmark TEXT,
+                Source TEXT,
+                UpdatedAt REAL
+            )
+            """
+        )
+
+
+# ------------------------------
+# Payment ingest
+# ------------------------------
+PAYMENT_COLUMNS = [
+    "PaymentID", "CustomerID", "CustomerName", "MerchantID", "MerchantName",
+    "PaymentDate", "PaymentAmount", "PaymentStatus", "DisputeFlag", "DefaultFlag",
+]
+
+
+def ingest_payments(
+    conn: sqlite3.Connection,
+    payments: List[Dict[str, Any]],
+    on_inserted: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+) -> Dict[str, int]:
+    """
+    Insert a batch of payments and update every derived aggregate in one transaction.
+
+    Idempotent on PaymentID: rows whose ID already exists (or repeats earlier in
+    the same batch) are skipped and not counted twice, so retries are safe.
+    Work is O(len(payments)) and the data version is bumped when anything was inserted.
+    ``on_inserted`` is called with the newly inserted payments once they are committed.
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for p in payments:
+        unique.setdefault(p["PaymentID"], p)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        ids = list(unique)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for (existing_id,) in conn.execute(
+                f"SELECT PaymentID FROM payments WHERE PaymentID IN ({placeholders})", chunk
+            ):
+                del unique[existing_id]
+
+        new_payments = list(unique.values())
+        conn.executemany(
+            f"INSERT INTO payments ({', '.join(PAYMENT_COLUMNS)}) VALUES ({', '.join('?' * len(PAYMENT_COLUMNS))})",
+            [tuple(p[column] for column in PAYMENT_COLUMNS) for p in new_payments],
+        )
+
+        result = {"received": len(payments), "inserted": len(new_payments)}
+        result["duplicates"] = result["received"] - result["inserted"]
+        result["customersUpdated"] = update_customer_metrics(conn, new_payments)
+        result["merchantsUpdated"] = len({p["MerchantID"] for p in new_payments})
+        result["monthsUpdated"] = len({str(p["PaymentDate"])[:7] for p in new_payments})
+        result["rollupRowsUpdated"] = sum(update_payment_rollups(conn, new_payments).values())
+        result["dataVersion"] = _bump_data_version(conn) if new_payments else get_data_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if on_inserted is not None and new_payments:
+        on_inserted(new_payments)
+    return result
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+class ConnectionPool:
+    """
+    Per-thread pooled SQLite connections.
+
+    Each worker thread lazily opens one connection and reuses it for every
+    request it serves, instead of paying for ``sqlite3.connect`` (and page
+    cache warm-up) per request. Connections run in WAL mode so dashboard
+    readers are not blocked by ingest writers, with tunable pragmas:
+
+    - SQLITE_CACHE_SIZE_KIB  page cache per connection (default 65536 = 64 MiB)
+    - SQLITE_MMAP_SIZE       bytes of the DB file to memory-map (default 256 MiB)
+    - SQLITE_SYNCHRONOUS     OFF | NORMAL | FULL | EXTRA (default NORMAL, durable with WAL)
+    - SQLITE_BUSY_TIMEOUT_MS wait for a competing writer (default 5000)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.cache_size_kib = _env_int("SQLITE_CACHE_SIZE_KIB", 65536)
+        self.mmap_size = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+        self.synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+        if self.synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_MODES)}, got {self.synchronous!r}")
+        self.busy_timeout_ms = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._opened = 0
+        self._checkouts = 0
+        self._in_use = 0
+        self._wait_seconds = 0.0
+        self._journal_mode: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size=-{self.cache_size_kib}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # What SQLite actually applied (WAL can be refused, e.g. on some network filesystems)
+        self._journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        # Each connection is only used by the thread that opened it;
+        # check_same_thread is off so close_all can close them at shutdown
+        conn = self._connect()
+        with self._lock:
+            self._connections.append(conn)
+            self._opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow this thread's connection. Like ``with sqlite3.connect(...)``, the
+        outermost block commits on success and rolls back on error; nested
+        blocks on the same thread share the connection and its transaction.
+        """
+        start = time.perf_counter()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+            self._local.depth = 0
+        self._local.depth += 1
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += self._local.depth == 1
+            self._wait_seconds += time.perf_counter() - start
+
+        try:
+            yield conn
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if self._local.depth == 1 and conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                with self._lock:
+                    self._in_use -= 1
+
+    @contextmanager
+    def dedicated(self) -> Iterator[sqlite3.Connection]:
+        """
+        A private, non-pooled connection with the same pragmas, closed on exit.
+        For long reads consumed across threads (e.g. a streaming response
+        iterated from the threadpool) that must not hold a pooled connection.
+        """
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "path": str(self.path),
+                "connections": len(self._connections),
+                "opened": self._opened,
+                "checkouts": checkouts,
+                "reused": checkouts - self._opened,
+                "inUse": self._in_use,
+                "avgCheckoutMs": round(self._wait_seconds / checkouts * 1000, 4) if checkouts else 0.0,
+                "pragmas": {
+                    "journal_mode": self._journal_mode,
+                    "synchronous": self.synchronous,
+                    "cache_size_kib": self.cache_size_kib,
+                    "mmap_size": self.mmap_size,
+                    "busy_timeout_ms": self.busy_timeout_ms,
+                },
+            }
+
+    def close_all(self) -> None:
+        """Close every pooled connection (threads reopen lazily on next use)."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -1,13 +1,17 @@
-import pandas as pd
 import json
 import re
 import logging
 from fastapi import APIRouter, Body
-from typing import Dict, Any, Union
+from fastapi.concurrency import run_in_threadpool
+from typing import Dict, Any, Optional, Tuple, Union
 
-from ..utils import call_ai
-from .customers_router import prepare_customer_metrics
-from .merchants_router import prepare_merchant_metrics
+from ..utils import acall_ai
+from ..ai_context import build_context, describe_frame
+from ..intent import intent_classifier
+from ..query_engine import query_engine
+from ..snapshot import payments_snapshot, merchants_snapshot
+from .customers_router import CUSTOMER_FULL_FIELDS_ORDER, load_customer_metrics
+from .merchants_router import MERCHANT_OUTPUT_FIELDS_ORDER, load_merchant_metrics
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -16,35 +20,55 @@ router = APIRouter()
 # -----------------------------
 # Helper functions
 # -----------------------------
-def _prepare_data(entity_type: str) -> list:
-    """Load and prepare data for the given entity type, ensure JSON-serializable"""
-    if entity_type == "merchants":
-        df = pd.read_csv("app/data/merchants_loyalty.csv")
-        prepared_data = prepare_merchant_metrics(df)
-    else:
-        df = pd.read_csv("app/data/payments.csv")
-        prepared_data = prepare_customer_metrics(df)
+ANALYST_SYSTEM = "You are a helpful financial data analyst."
 
-    if isinstance(prepared_data, pd.DataFrame):
-        prepared_data = prepared_data.to_dict(orient="records")
-    return prepared_data
+# entity type -> (snapshot, metrics loader, ID column, name column, columns shown to the model)
+ENTITY_SOURCES = {
+    "customers": (payments_snapshot, load_customer_metrics, "CustomerID", "CustomerName", CUSTOMER_FULL_FIELDS_ORDER),
+    "merchants": (merchants_snapshot, load_merchant_metrics, "MerchantID", "MerchantName", MERCHANT_OUTPUT_FIELDS_ORDER),
+}
 
 
-def _build_prompt(query: str, preview_data: list, system: str = "") -> str:
-    """Build AI analysis prompt with a preview of data"""
-    return f"""
-{system}
+def parse_entity_type(reply: Any) -> str:
+    """Map the LLM classifier's reply onto ENTITY_SOURCES: "merchants" only if it names merchants alone."""
+    words = re.findall(r"[a-z]+", reply.lower()) if isinstance(reply, str) else []
+    named = {word.rstrip("s") for word in words} & {"customer", "merchant"}
+    return "merchants" if named == {"merchant"} else "customers"
 
-User query: "{query}"
 
-Data sample (for reference):
-{json.dumps(preview_data, indent=2)}
+def _answer_locally(entity_type: str, query: str) -> Optional[Dict[str, Any]]:
+    """Exact answer from the scored frame for common query shapes; None if the LLM is needed."""
+    _, load_metrics, _, _, columns = ENTITY_SOURCES[entity_type]
+    return query_engine.answer(load_metrics(), query, columns)
 
-⚠️ IMPORTANT:
-- Respond with clean, structured, readable data.
-- Output can be JSON, HTML table, or text, depending on request.
-- Do NOT include markdown, explanations, or extra text outside output.
-"""
+
+def _build_context(entity_type: str, query: str) -> str:
+    """Token-budgeted data context (statistics + relevant CSV sample) for an analysis prompt."""
+    snapshot, load_metrics, id_column, name_column, columns = ENTITY_SOURCES[entity_type]
+    df = load_metrics()
+    # Population statistics only change with the data, so they are built once per snapshot version
+    stats = snapshot.derived(f"{entity_type}_context_stats", lambda _: describe_frame(df[columns], id_column))
+    return build_context(df, query, id_column, columns, stats=stats, name_column=name_column)
+
+
+async def _analyze(entity_type: str, query: str) -> Tuple[Any, str]:
+    """The query's result and what answered it: "local" (query_engine) or "ai"."""
+    local = await run_in_threadpool(_answer_locally, entity_type, query)
+    if local is not None:
+        return local, "local"
+
+    context = await run_in_threadpool(_build_context, entity_type, query)
+    ai_response = await acall_ai(
+        task="analysis",
+        entity_type=entity_type,
+        data={"query": query, "context": context},
+        default_response={"message": "Unable to process query."},
+        system=ANALYST_SYSTEM
+    )
+
+    if isinstance(ai_response, str):
+        ai_response = safe_parse_json(ai_response, {"message": ai_response})
+    return ai_response, "ai"
 
 
 def safe_parse_json(ai_output: str, default_response: Any):
@@ -69,80 +93,44 @@ def safe_parse_json(ai_output: str, default_response: Any):
 # Generic AI query (auto-detect entity)
 # -----------------------------
 @router.post("/ai-query")
-def query_entities(query: str = Body(..., embed=True)) -> Dict[str, Any]:
+async def query_entities(query: str = Body(..., embed=True)) -> Dict[str, Any]:
     classify_prompt = """
 You are a classifier. Given a user query, decide if it is about 'customers' or 'merchants'.
 Respond with ONLY one word: 'customers' or 'merchants'.
 """
-    entity_type = call_ai(
-        task="classification",
-        entity_type="auto",
-        data={"query": query},
-        default_response="customers",
-        system=classify_prompt
-    )
-    entity_type = entity_type.strip().lower() if isinstance(entity_type, str) else "customers"
-    logger.info(f"Detected entity type: {entity_type}")
-
-    prepared_data = _prepare_data(entity_type)
-    preview = prepared_data[:5]
-    prompt = _build_prompt(query, preview, system="You are a helpful financial data analyst.")
-
-    ai_response = call_ai(
-        task="analysis",
-        entity_type=entity_type,
-        data={"query": query, "records": prepared_data[:200]},
-        default_response={"message": "Unable to process query."},
-        system=prompt
-    )
-
-    if isinstance(ai_response, str):
-        ai_response = safe_parse_json(ai_response, {"message": ai_response})
+    # Keyword classifier first; only ambiguous queries pay for an LLM round trip
+    entity_type, confidence = intent_classifier.classify(query)
+    if entity_type is None:
+        reply = await acall_ai(
+            task="classification",
+            entity_type="auto",
+            data={"query": query},
+            default_response="customers",
+            system=classify_prompt
+        )
+        # Free text from the model: only a known entity type may select the data source
+        entity_type = parse_entity_type(reply)
+        logger.info(f"Detected entity type: {entity_type} (LLM, local confidence {confidence})")
+    else:
+        logger.info(f"Detected entity type: {entity_type} (local, confidence {confidence})")
 
-    return {"entity": entity_type, "query": query, "result": ai_response}
+    result, answered_by = await _analyze(entity_type, query)
+    return {"entity": entity_type, "query": query, "result": result, "answeredBy": answered_by}
 
 
 # -----------------------------
 # Customer-specific query
 # -----------------------------
 @router.post("/customers/ai-query")
-def query_customers(query: str = Body(..., embed=True)) -> Dict[str, Any]:
-    prepared_data = _prepare_data("customers")
-    preview = prepared_data[:5]
-    prompt = _build_prompt(query, preview, system="You are a helpful financial data analyst.")
-
-    ai_response = call_ai(
-        task="analysis",
-        entity_type="customers",
-        data={"query": query, "records": prepared_data[:200]},
-        default_response={"message": "Unable to process query."},
-        system=prompt
-    )
-
-    if isinstance(ai_response, str):
-        ai_response = safe_parse_json(ai_response, {"message": ai_response})
-
-    return {"entity": "customers", "query": query, "result": ai_response}
+async def query_customers(query: str = Body(..., embed=True)) -> Dict[str, Any]:
+    result, answered_by = await _analyze("customers", query)
+    return {"entity": "customers", "query": query, "result": result, "answeredBy": answered_by}
 
 
 # -----------------------------
 # Merchant-specific query
 # -----------------------------
 @router.post("/merchants/ai-query")
-def query_merchants(query: str = Body(..., embed=True)) -> Dict[str, Any]:
-    prepared_data = _prepare_data("merchants")
-    preview = prepared_data[:5]
-    prompt = _build_prompt(query, preview, system="You are a helpful financial data analyst.")
-
-    ai_response = call_ai(
-        task="analysis",
-        entity_type="merchants",
-        data={"query": query, "records": prepared_data[:200]},
-        default_response={"message": "Unable to process query."},
-        system=prompt
-    )
-
-    if isinstance(ai_response, str):
-        ai_response = safe_parse_json(ai_response, {"message": ai_response})
-
-    return {"entity": "merchants", "query": query, "result": ai_response}
+async def query_merchants(query: str = Body(..., embed=True)) -> Dict[str, Any]:
+    result, answered_by = await _analyze("merchants", query)
+    return {"entity": "merchants", "query": query, "result": result, "answeredBy": answered_by}
@@ -1,35 +1,30 @@
-import sqlite3
-from pathlib import Path
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+import asyncio
+import json
 import pandas as pd
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import openai
 import os
 from dotenv import load_dotenv
 
+from ..ai_client import achat, api_key_configured, astream_chat
+from ..db import get_connection
+
 # Load environment variables
 load_dotenv()
 
 router = APIRouter()
 
-# Database path
-DB_PATH = Path(__file__).resolve().parent / ".." / "data" / "app.db"
-DB_PATH = DB_PATH.resolve()
-
-# Initialize OpenAI client
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
 class ChatRequest(BaseModel):
     prompt: str
     userType: str  # "consumer" or "merchant"
 
-def _connect() -> sqlite3.Connection:
-    return sqlite3.connect(DB_PATH)
-
 def get_consumer_data() -> str:
     """Get consumer-related data from the database"""
-    with _connect() as conn:
+    with get_connection() as conn:
         # Get payment data for consumers
         payments_df = pd.read_sql_query(
             """
@@ -42,17 +37,16 @@ def get_consumer_data() -> str:
             parse_dates=["PaymentDate"]
         )
         
-        # Get monthly collections data
+        # Get monthly collections data (from the monthly rollup)
         monthly_df = pd.read_sql_query(
             """
             SELECT 
-                strftime('%Y-%m', PaymentDate) as month,
-                SUM(PaymentAmount) as total_amount,
-                COUNT(CASE WHEN PaymentStatus = 'PAID' THEN 1 END) as paid_count,
-                COUNT(CASE WHEN PaymentStatus = 'PENDING' THEN 1 END) as pending_count,
-                COUNT(CASE WHEN PaymentStatus = 'FAILED' THEN 1 END) as failed_count
-            FROM payments
-            GROUP BY strftime('%Y-%m', PaymentDate)
+                Month as month,
+                SUM(AmountCents) / 100.0 as total_amount,
+                SUM(CASE WHEN PaymentStatus = 'PAID' THEN PaymentCount ELSE 0 END) as paid_count,
+                SUM(CASE WHEN PaymentStatus = 'FAILED' THEN PaymentCount ELSE 0 END) as failed_count
+            FROM payments_monthly
+            GROUP BY Month
             ORDER BY month DESC
             LIMIT 12
             """,
@@ -81,8 +75,8 @@ def is_chart_request(prompt: str) -> bool:
     prompt_lower = prompt.lower()
     return any(word in prompt_lower for word in chart_keywords)
 
-def generate_chart_code_with_openai(prompt: str, user_type: str, context_data: str) -> str:
-    """Generate Nivo chart code using OpenAI based on user's specific request"""
+def chart_messages(prompt: str, user_type: str, context_data: str) -> List[Dict[str, str]]:
+    """Chat messages asking for a Nivo chart component for the user's request"""
     
     chart_system_prompt = f"""You are an expert React developer specializing in Nivo charts. 
     Generate ONLY the React component code for a Nivo chart based on the user's request.
@@ -111,27 +105,30 @@ def generate_chart_code_with_openai(prompt: str, user_type: str, context_data: s
     
     Generate the React component code:"""
     
+    return [
+        {"role": "system", "content": chart_system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+async def generate_chart_code_with_openai(prompt: str, user_type: str, context_data: str) -> str:
+    """Generate Nivo chart code using OpenAI based on user's specific request"""
     try:
-        response = openai.chat.completions.create(
+        return await achat(
             model="gpt-4",
-            messages=[
-                {"role": "system", "content": chart_system_prompt},
-                {"role": "user", "content": prompt}
-            ],
+            messages=chart_messages(prompt, user_type, context_data),
             max_tokens=2000,
             temperature=0.3
         )
-        return response.choices[0].message.content
     except Exception as e:
         # Fallback to a basic chart if OpenAI fails
         return generate_fallback_chart_code(prompt, user_type)
 
 def generate_fallback_chart_code(prompt: str, user_type: str) -> str:
     """Generate a basic fallback chart code when OpenAI is not available"""
-    return f'''import React from 'react';
-import {{ ResponsiveBar }} from '@nivo/bar';
+    return '''import React from 'react';
+import { ResponsiveBar } from '@nivo/bar';
 
-const GeneratedChart = ({{ data }}) => {{
+const GeneratedChart = ({ data }) => {
   return (
     <div style={{ height: '400px', width: '100%' }}>
       <ResponsiveBar
@@ -139,12 +136,12 @@ const GeneratedChart = ({{ data }}) => {{
         keys={['value']}
         indexBy="id"
         margin={{ top: 50, right: 130, bottom: 50, left: 60 }}
-        padding={{0.3}}
+        padding={0.3}
         valueScale={{ type: 'linear' }}
         indexScale={{ type: 'band', round: true }}
         colors={{ scheme: 'nivo' }}
-        axisTop={{null}}
-        axisRight={{null}}
+        axisTop={null}
+        axisRight={null}
         axisBottom={{
           tickSize: 5,
           tickPadding: 5,
@@ -161,14 +158,14 @@ const GeneratedChart = ({{ data }}) => {{
           legendPosition: 'middle',
           legendOffset: -40
         }}
-        labelSkipWidth={{12}}
-        labelSkipHeight={{12}}
+        labelSkipWidth={12}
+        labelSkipHeight={12}
         role="application"
         ariaLabel="Generated Chart"
       />
     </div>
   );
-}};
+};
 
 export default GeneratedChart;'''
 
@@ -180,6 +177,7 @@ def generate_fallback_response(prompt: str, user_type: str, context_data: str) -
         return generate_fallback_chart_code(prompt, user_type)
     
     # Simple keyword-based responses for non-chart requests
+    prompt_lower = prompt.lower()
     if user_type == "consumer":
         if any(word in prompt_lower for word in ["trend", "pattern", "monthly", "collection"]):
             return """Based on the consumer payment data:
@@ -308,18 +306,17 @@ def generate_fallback_response(prompt: str, user_type: str, context_data: str) -
 
 def get_merchant_data() -> str:
     """Get merchant-related data from the database"""
-    with _connect() as conn:
-        # Get merchant payment data
+    with get_connection() as conn:
+        # Get merchant payment data (from the monthly rollup)
         merchant_payments_df = pd.read_sql_query(
             """
             SELECT 
                 MerchantName,
-                SUM(PaymentAmount) as total_amount,
-                COUNT(*) as payment_count,
-                COUNT(CASE WHEN PaymentStatus = 'PAID' THEN 1 END) as paid_count,
-                COUNT(CASE WHEN PaymentStatus = 'PENDING' THEN 1 END) as pending_count,
-                COUNT(CASE WHEN PaymentStatus = 'FAILED' THEN 1 END) as failed_count
-            FROM payments
+                SUM(AmountCents) / 100.0 as total_amount,
+                SUM(PaymentCount) as payment_count,
+                SUM(CASE WHEN PaymentStatus = 'PAID' THEN PaymentCount ELSE 0 END) as paid_count,
+                SUM(CASE WHEN PaymentStatus = 'FAILED' THEN PaymentCount ELSE 0 END) as failed_count
+            FROM payments_monthly
             GROUP BY MerchantName
             ORDER BY total_amount DESC
             LIMIT 20
@@ -356,6 +353,35 @@ Merchant Data Summary:
 - Payment success rate: {(merchant_payments_df['paid_count'] / merchant_payments_df['payment_count'] * 100).mean():.1f}%
 """
 
+async def get_chat_context(user_type: str) -> Tuple[str, str]:
+    """Data context and system prompt for a user type; 400 for unknown types"""
+    if user_type == "consumer":
+        context_data = await run_in_threadpool(get_consumer_data)
+        system_prompt = """You are an AI assistant specialized in analyzing consumer payment data and trends. 
+            You help users understand payment patterns, identify trends, and provide insights about consumer behavior.
+            Use the provided data context to answer questions accurately and provide actionable insights."""
+    elif user_type == "merchant":
+        context_data = await run_in_threadpool(get_merchant_data)
+        system_prompt = """You are an AI assistant specialized in analyzing merchant performance data, trust scores, and business metrics.
+            You help merchants understand their performance, identify opportunities for growth, and provide business insights.
+            Use the provided data context to answer questions accurately and provide actionable recommendations."""
+    else:
+        raise HTTPException(status_code=400, detail="Invalid userType. Must be 'consumer' or 'merchant'")
+    return context_data, system_prompt
+
+def chat_prompt(system_prompt: str, context_data: str, prompt: str) -> str:
+    """Full user prompt with data context for regular (non-chart) responses"""
+    return f"""
+{system_prompt}
+
+Data Context:
+{context_data}
+
+User Question: {prompt}
+
+Please provide a detailed, helpful response based on the data context provided. If the question cannot be answered with the available data, please explain what information would be needed.
+"""
+
 @router.post("/chat")
 async def chat_with_ai(request: ChatRequest) -> Dict[str, Any]:
     """
@@ -363,23 +389,12 @@ async def chat_with_ai(request: ChatRequest) -> Dict[str, Any]:
     """
     try:
         # Get relevant data based on user type
-        if request.userType == "consumer":
-            context_data = get_consumer_data()
-            system_prompt = """You are an AI assistant specialized in analyzing consumer payment data and trends. 
-            You help users understand payment patterns, identify trends, and provide insights about consumer behavior.
-            Use the provided data context to answer questions accurately and provide actionable insights."""
-        elif request.userType == "merchant":
-            context_data = get_merchant_data()
-            system_prompt = """You are an AI assistant specialized in analyzing merchant performance data, trust scores, and business metrics.
-            You help merchants understand their performance, identify opportunities for growth, and provide business insights.
-            Use the provided data context to answer questions accurately and provide actionable recommendations."""
-        else:
-            raise HTTPException(status_code=400, detail="Invalid userType. Must be 'consumer' or 'merchant'")
+        context_data, system_prompt = await get_chat_context(request.userType)
         
         # Check if user wants a chart
         if is_chart_request(request.prompt):
             # Generate chart code using OpenAI
-            chart_code = generate_chart_code_with_openai(request.prompt, request.userType, context_data)
+            chart_code = await generate_chart_code_with_openai(request.prompt, request.userType, context_data)
             return {
                 "response": chart_code,
                 "userType": request.userType,
@@ -388,16 +403,7 @@ async def chat_with_ai(request: ChatRequest) -> Dict[str, Any]:
             }
         
         # Prepare the full prompt with context for regular responses
-        full_prompt = f"""
-{system_prompt}
-
-Data Context:
-{context_data}
-
-User Question: {request.prompt}
-
-Please provide a detailed, helpful response based on the data context provided. If the question cannot be answered with the available data, please explain what information would be needed.
-"""
+        full_prompt = chat_prompt(system_prompt, context_data, request.prompt)
         
         # Check if OpenAI API key is available and has quota
         if not os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY") == "your_openai_api_key_here":
@@ -411,8 +417,8 @@ Please provide a detailed, helpful response based on the data context provided.
             }
         
         try:
-            # Call OpenAI API
-            response = openai.chat.completions.create(
+            # Call OpenAI API (shared async client, bounded concurrency)
+            response = await achat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -423,7 +429,7 @@ Please provide a detailed, helpful response based on the data context provided.
             )
             
             return {
-                "response": response.choices[0].message.content,
+                "response": response,
                 "userType": request.userType,
                 "status": "success"
             }
@@ -445,6 +451,98 @@ Please provide a detailed, helpful response based on the data context provided.
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") from e
 
+# ------------------------------
+# Streaming chat (server-sent events)
+# ------------------------------
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """One SSE frame; data is JSON so multi-line text stays in one frame"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def stream_text(text: str) -> AsyncIterator[str]:
+    """Canned text as delta frames, line by line, yielding to the event loop in between"""
+    for line in text.splitlines(keepends=True):
+        yield sse_event({"delta": line})
+        await asyncio.sleep(0)
+
+def _is_quota_error(error: Exception) -> bool:
+    return isinstance(error, openai.APIError) and ("quota" in str(error).lower() or "429" in str(error))
+
+async def chat_events(request: ChatRequest, context_data: str, system_prompt: str) -> AsyncIterator[str]:
+    """
+    SSE frames for one chat request, mirroring /chat: a "meta" frame, the
+    answer as {"delta": text} frames as the model produces them, then a
+    "done" frame with the status (success | chart_code | fallback, with a
+    note) or an "error" frame.
+    """
+    is_chart = is_chart_request(request.prompt)
+    yield sse_event({"userType": request.userType, "isChart": is_chart}, event="meta")
+
+    if is_chart:
+        status = "chart_code"
+        call = dict(
+            model="gpt-4",
+            messages=chart_messages(request.prompt, request.userType, context_data),
+            max_tokens=2000,
+            temperature=0.3
+        )
+    else:
+        status = "success"
+        call = dict(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": chat_prompt(system_prompt, context_data, request.prompt)}
+            ],
+            max_tokens=1000,
+            temperature=0.7
+        )
+
+    note = None
+    # Like /chat, charts always try the model and fall back to template code
+    if not is_chart and not api_key_configured():
+        note = "Using fallback response - OpenAI API not available"
+    else:
+        started = False
+        try:
+            async for delta in astream_chat(**call):
+                started = True
+                yield sse_event({"delta": delta})
+        except Exception as e:
+            # Once tokens are out the answer cannot be swapped for a fallback
+            if started or not (is_chart or _is_quota_error(e)):
+                detail = f"OpenAI API error: {str(e)}" if isinstance(e, openai.APIError) else f"Internal server error: {str(e)}"
+                yield sse_event({"detail": detail}, event="error")
+                return
+            if not is_chart:
+                note = "Using fallback response - OpenAI quota exceeded"
+        else:
+            yield sse_event({"userType": request.userType, "status": status}, event="done")
+            return
+
+    # Fallback text streams the same way, so clients handle a single format
+    async for frame in stream_text(generate_fallback_response(request.prompt, request.userType, context_data)):
+        yield frame
+    done = {"userType": request.userType, "status": "fallback" if note else status}
+    if note:
+        done["note"] = note
+    yield sse_event(done, event="done")
+
+@router.post("/chat/stream")
+async def chat_with_ai_stream(request: ChatRequest) -> StreamingResponse:
+    """
+    Streaming variant of /chat: forwards the model's tokens as server-sent
+    events as they arrive, so the first bytes arrive after the model's
+    first-token latency instead of the full completion.
+    """
+    # Validation and data context happen before the stream starts, so errors keep their status codes
+    context_data, system_prompt = await get_chat_context(request.userType)
+    return StreamingResponse(
+        chat_events(request, context_data, system_prompt),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for AI service"""
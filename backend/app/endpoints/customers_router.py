@@ -1,11 +1,19 @@
+import sqlite3
+
 import pandas as pd
-from fastapi import APIRouter, Query, HTTPException
-from typing import List
+from fastapi import APIRouter, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from ..utils import (
-    get_customer_trust_loyalty,   # formula-based
-    generate_summary,
-    generate_customer_recommendations
+    calculate_customer_trust_scores,   # formula-based
+    assign_loyalty_tiers,
+    encode_cursor,
+    decode_cursor
 )
+from ..snapshot import payments_snapshot
+from ..db import dedicated_connection, get_connection
+from ..export import EXPORT_CHUNK_ROWS, ExportFormat, export_response
+from ..enrichment import serve_enrichment
 
 router = APIRouter()
 
@@ -28,9 +36,9 @@ CUSTOMER_FULL_FIELDS_ORDER = [
 # Helper function
 # ------------------------------
 def prepare_customer_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    grouped = df.groupby(["CustomerID", "CustomerName"])
+    grouped = df.assign(IsPaid=df["PaymentStatus"].eq("PAID")).groupby(["CustomerID", "CustomerName"])
     customers = grouped.agg(
-        RepaymentRate=("PaymentStatus", lambda x: (x == "PAID").mean()),
+        RepaymentRate=("IsPaid", "mean"),
         DisputeCount=("DisputeFlag", "sum"),
         DefaultRate=("DefaultFlag", "mean"),
         TransactionVolume=("PaymentAmount", "sum")
@@ -42,130 +50,219 @@ def prepare_customer_metrics(df: pd.DataFrame) -> pd.DataFrame:
     # ------------------------------
     # Formula-based TrustScore & LoyaltyTier
     # ------------------------------
-    trust_loyalty_results = customers.apply(
-        lambda row: get_customer_trust_loyalty(
-            row["RepaymentRate"], row["DisputeCount"], row["DefaultRate"]
-        ),
-        axis=1
+    customers["TrustScore"] = calculate_customer_trust_scores(
+        customers["RepaymentRate"], customers["DisputeCount"], customers["DefaultRate"]
     )
-
-    customers["TrustScore"] = trust_loyalty_results.apply(lambda x: x["TrustScore"])
-    customers["LoyaltyTier"] = trust_loyalty_results.apply(lambda x: x["LoyaltyTier"])
+    customers["LoyaltyTier"] = assign_loyalty_tiers(customers["TrustScore"])
 
     return customers
 
+
+def fetch_customer_metrics(customer_id: str) -> dict:
+    """
+    Point lookup of one customer's metrics from the materialized customer_metrics
+    table (primary key), so detail endpoints stay O(1) in the number of payments.
+    Raises 404 if the customer does not exist.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute(
+            f"SELECT {', '.join(CUSTOMER_FULL_FIELDS_ORDER)} FROM customer_metrics WHERE CustomerID = ?",
+            (customer_id,),
+        ).fetchone()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return dict(row)
+
+
+def load_customer_metrics() -> pd.DataFrame:
+    """Customer metrics for the current payments snapshot (shared, read-only)."""
+    return payments_snapshot.derived("customer_metrics", prepare_customer_metrics)
+
+
+def keyset_condition(sort_terms: List[tuple], after: list) -> tuple:
+    """
+    WHERE clause selecting the rows strictly after ``after`` in the
+    (column, order) sort, e.g. for TrustScore DESC, CustomerID ASC:
+
+        TrustScore <= ? AND (TrustScore < ? OR (TrustScore = ? AND CustomerID > ?))
+
+    The leading bound lets SQLite seek into idx_customer_metrics_rank instead of
+    scanning from the top, so deep pages cost the same as the first one.
+    """
+    first_column, first_order = sort_terms[0]
+    clauses, params = [], []
+    for i, (column, order) in enumerate(sort_terms):
+        equal = [f"{prev} = ?" for prev, _ in sort_terms[:i]]
+        clauses.append(" AND ".join(equal + [f"{column} {'>' if order == 'asc' else '<'} ?"]))
+        params.extend(after[:i + 1])
+    bound = f"{first_column} {'>=' if first_order == 'asc' else '<='} ?"
+    where = f"WHERE {bound} AND ({' OR '.join(f'({c})' for c in clauses)})"
+    return where, [after[0], *params]
+
 ALLOWED_SORT_BY = ["TrustScore", "LoyaltyTier"]
 ALLOWED_SORT_ORDER = ["asc", "desc"]
+SORT_BY_DESCRIPTION = "Columns to sort by, comma separated. Allowed: TrustScore,LoyaltyTier"
+SORT_ORDER_DESCRIPTION = "Sort order for each column, comma separated. Allowed: asc,desc"
 
-# ------------------------------
-# Customers Endpoints
-# ------------------------------
-@router.get("/", summary="Get Customers with Trust & Loyalty Info")
-def get_customers(
-    limit: int = Query(10, ge=1),
-    sort_by: str = Query("TrustScore,LoyaltyTier", description="Columns to sort by, comma separated. Allowed: TrustScore,LoyaltyTier"),
-    sort_order: str = Query("desc,desc", description="Sort order for each column, comma separated. Allowed: asc,desc")
-) -> List[dict]:
-    # Load data
-    df = pd.read_csv("app/data/payments.csv")
-    customers = prepare_customer_metrics(df)
-
-    # Map LoyaltyTier to numeric for sorting
-    loyalty_mapping = {"Platinum": 4, "Gold": 3, "Silver": 2, "Bronze": 1}
-    customers["LoyaltyScore"] = customers["LoyaltyTier"].map(loyalty_mapping)
 
-    # Split and validate query params
+def parse_sort(sort_by: str, sort_order: str) -> tuple:
+    """
+    Validate sort_by / sort_order (400 on bad input) and return the
+    (column, order) terms, ending in the CustomerID tie-break, plus the
+    sort key cursors are bound to.
+    """
     sort_by_list = [s.strip() for s in sort_by.split(",")]
     sort_order_list = [s.strip().lower() for s in sort_order.split(",")]
 
     if len(sort_by_list) != len(sort_order_list):
         raise HTTPException(status_code=400, detail="sort_by and sort_order must have same number of elements")
+    if len(set(sort_by_list)) != len(sort_by_list):
+        raise HTTPException(status_code=400, detail="sort_by columns must be distinct")
 
-    sort_columns = []
-    ascending_list = []
+    sort_terms = []
     for col, order in zip(sort_by_list, sort_order_list):
         if col not in ALLOWED_SORT_BY:
             raise HTTPException(status_code=400, detail=f"Invalid sort_by value: {col}")
         if order not in ALLOWED_SORT_ORDER:
             raise HTTPException(status_code=400, detail=f"Invalid sort_order value: {order}")
 
-        if col == "LoyaltyTier":
-            sort_columns.append("LoyaltyScore")
-        else:
-            sort_columns.append(col)
+        # LoyaltyTier sorts by its numeric LoyaltyScore (Platinum=4 ... Bronze=1)
+        column = "LoyaltyScore" if col == "LoyaltyTier" else col
+        sort_terms.append((column, order))
+    sort_terms.append(("CustomerID", "asc"))
+    sort_key = ",".join(f"{col}:{order}" for col, order in zip(sort_by_list, sort_order_list))
+    return sort_terms, sort_key
 
-        ascending_list.append(order == "asc")
+# ------------------------------
+# Customers Endpoints
+# ------------------------------
+@router.get("/", summary="Get Customers with Trust & Loyalty Info")
+def get_customers(
+    response: Response,
+    limit: int = Query(10, ge=1),
+    sort_by: str = Query("TrustScore,LoyaltyTier", description=SORT_BY_DESCRIPTION),
+    sort_order: str = Query("desc,desc", description=SORT_ORDER_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page; omit for the first page")
+) -> List[dict]:
+    sort_terms, sort_key = parse_sort(sort_by, sort_order)
 
-    if sort_columns:
-        customers = customers.sort_values(sort_columns, ascending=ascending_list)
+    where, params = "", []
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort_key)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {exc}")
+        if len(after) != len(sort_terms):
+            raise HTTPException(status_code=400, detail="Invalid cursor: wrong number of values")
+        where, params = keyset_condition(sort_terms, after)
 
-    results = customers[["CustomerID", "CustomerName", "TrustScore", "LoyaltyTier"]].head(limit).to_dict(orient="records")
-    return results
+    order_by = ", ".join(f"{column} {order.upper()}" for column, order in sort_terms)
+    columns = list(dict.fromkeys(["CustomerID", "CustomerName", "TrustScore", "LoyaltyTier"] + [c for c, _ in sort_terms]))
 
-@router.get("/{customer_id}", summary="Get Customer Full Metrics with Recommendations")
-def get_customer_details(customer_id: str) -> dict:
-    df = pd.read_csv("app/data/payments.csv")
-    customers = prepare_customer_metrics(df)
-    row = customers[customers["CustomerID"] == customer_id]
+    # Indexed read from the materialized customer_metrics table; one extra row
+    # tells whether there is a next page
+    with get_connection() as conn:
+        db_cursor = conn.cursor()
+        db_cursor.row_factory = sqlite3.Row
+        rows = db_cursor.execute(
+            f"""
+            SELECT {", ".join(columns)}
+            FROM customer_metrics
+            {where}
+            ORDER BY {order_by}
+            LIMIT ?
+            """,
+            (*params, limit + 1),
+        ).fetchall()
 
-    if row.empty:
-        raise HTTPException(status_code=404, detail="Customer not found")
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort_key, [rows[-1][column] for column, _ in sort_terms]
+        )
+    return [
+        {field: row[field] for field in ("CustomerID", "CustomerName", "TrustScore", "LoyaltyTier")}
+        for row in rows
+    ]
+
+@router.get("/export", summary="Stream All Scored Customers as NDJSON or CSV")
+def export_customers(
+    fmt: ExportFormat = Query("ndjson", alias="format", description="Output format. Allowed: ndjson,csv"),
+    sort_by: str = Query("TrustScore,LoyaltyTier", description=SORT_BY_DESCRIPTION),
+    sort_order: str = Query("desc,desc", description=SORT_ORDER_DESCRIPTION)
+) -> StreamingResponse:
+    # Validated before the response starts, so bad input is a 400 rather than a broken stream
+    sort_terms, _ = parse_sort(sort_by, sort_order)
+    order_by = ", ".join(f"{column} {order.upper()}" for column, order in sort_terms)
 
-    customer_data = row.iloc[0].to_dict()
+    def chunks():
+        # Dedicated connection: the stream is resumed on arbitrary threadpool
+        # threads, and one SELECT reads a single consistent WAL snapshot
+        with dedicated_connection() as conn:
+            cursor = conn.execute(
+                f"""
+                SELECT {", ".join(CUSTOMER_FULL_FIELDS_ORDER)}
+                FROM customer_metrics
+                ORDER BY {order_by}
+                """
+            )
+            while rows := cursor.fetchmany(EXPORT_CHUNK_ROWS):
+                yield rows
+
+    return export_response("customers", CUSTOMER_FULL_FIELDS_ORDER, chunks(), fmt)
+
+@router.get("/{customer_id}", summary="Get Customer Full Metrics with Recommendations")
+def get_customer_details(customer_id: str) -> dict:
+    customer_data = fetch_customer_metrics(customer_id)
     result = {field: customer_data[field] for field in CUSTOMER_FULL_FIELDS_ORDER}
-    result["Summary"] = generate_summary("customer", customer_data)
-    result["Recommendations"] = generate_customer_recommendations(customer_data)
+    # Precomputed by the enrichment worker; never waits on the LLM
+    result.update(serve_enrichment("customer", customer_data))
     return result
 
 @router.get("/{customer_id}/summary/explain", summary="Explain Customer TrustScore & LoyaltyTier")
 def explain_customer_summary(customer_id: str) -> dict:
-    df = pd.read_csv("app/data/payments.csv")
-    customers = prepare_customer_metrics(df)
-    row = customers[customers["CustomerID"] == customer_id]
-
-    if row.empty:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
-    data = row.iloc[0].to_dict()
-    explanation = generate_summary("customer", data)
-    return {"CustomerID": data["CustomerID"], "Explanation": explanation}
+    data = fetch_customer_metrics(customer_id)
+    enrichment = serve_enrichment("customer", data)
+    return {"CustomerID": data["CustomerID"], "Explanation": enrichment["Summary"], "Enrichment": enrichment["Enrichment"]}
 
 @router.get("/{customer_id}/history", summary="Customer Historical Metrics")
 def customer_history(customer_id: str) -> dict:
-    df = pd.read_csv("app/data/payments.csv")
-    customer_df = df[df["CustomerID"] == customer_id].sort_values("PaymentDate")
+    # Only this customer's payments, via idx_payments_customer
+    with get_connection() as conn:
+        customer_df = pd.read_sql_query(
+            """
+            SELECT PaymentDate, PaymentAmount, PaymentStatus, DisputeFlag, DefaultFlag
+            FROM payments
+            WHERE CustomerID = ?
+            ORDER BY PaymentDate
+            """,
+            conn,
+            params=(customer_id,),
+        )
 
     if customer_df.empty:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    history = customer_df.groupby("PaymentDate").agg(
-        RepaymentRate=("PaymentStatus", lambda x: (x == "PAID").mean()),
+    history = customer_df.assign(IsPaid=customer_df["PaymentStatus"].eq("PAID")).groupby("PaymentDate").agg(
+        RepaymentRate=("IsPaid", "mean"),
         DisputeCount=("DisputeFlag", "sum"),
         DefaultRate=("DefaultFlag", "mean"),
         TransactionVolume=("PaymentAmount", "sum")
     ).reset_index()
 
     # Formula-based TrustScore & LoyaltyTier
-    trust_loyalty_results = history.apply(
-        lambda row: get_customer_trust_loyalty(
-            row["RepaymentRate"], row["DisputeCount"], row["DefaultRate"]
-        ),
-        axis=1
+    history["TrustScore"] = calculate_customer_trust_scores(
+        history["RepaymentRate"], history["DisputeCount"], history["DefaultRate"]
     )
-    history["TrustScore"] = trust_loyalty_results.apply(lambda x: x["TrustScore"])
-    history["LoyaltyTier"] = trust_loyalty_results.apply(lambda x: x["LoyaltyTier"])
+    history["LoyaltyTier"] = assign_loyalty_tiers(history["TrustScore"])
 
     return {"CustomerID": customer_id, "History": history.to_dict(orient="records")}
 
 @router.get("/{customer_id}/recommendations", summary="Customer Recommendations")
 def customer_recommendations(customer_id: str):
-    df = pd.read_csv("app/data/payments.csv")
-    customers = prepare_customer_metrics(df)
-    row = customers[customers["CustomerID"] == customer_id]
-
-    if row.empty:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
-    data = row.iloc[0].to_dict()
-    recommendations = generate_customer_recommendations(data)
-    return {"CustomerID": customer_id, "Recommendations": recommendations}
+    data = fetch_customer_metrics(customer_id)
+    enrichment = serve_enrichment("customer", data)
+    return {"CustomerID": customer_id, "Recommendations": enrichment["Recommendations"], "Enrichment": enrichment["Enrichment"]}
@@ -1,26 +1,19 @@
-import sqlite3
-from pathlib import Path
 from typing import Dict, Any
 
 import pandas as pd
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response
 
-from ..utils import calculate_merchant_trust_score, assign_loyalty_tier
+from ..db import get_connection
+from ..response_cache import response_cache
+from ..utils import calculate_merchant_trust_scores, assign_loyalty_tiers, select_top_k
 
 
 router = APIRouter()
 
-# Match db.py location: app/data/app.db
-DB_PATH = Path(__file__).resolve().parent / ".." / "data" / "app.db"
-DB_PATH = DB_PATH.resolve()
-
-
-def _connect() -> sqlite3.Connection:
-    return sqlite3.connect(DB_PATH)
-
-
+# Dashboards only change when payments are ingested, so responses are cached
+# per data version and carry an ETag; polling clients get 304s in between.
 @router.get("/merchants")
-def merchants_dashboard(limit: int = Query(10, ge=1, le=50)) -> Dict[str, Any]:
+def merchants_dashboard(request: Request, limit: int = Query(10, ge=1, le=50)) -> Response:
     """
     Returns chart-ready data for the merchants dashboard in one payload.
 
@@ -28,13 +21,29 @@ def merchants_dashboard(limit: int = Query(10, ge=1, le=50)) -> Dict[str, Any]:
     - paymentStatusMix: [{ id, value }]
     - topMerchantTrust: [{ merchant, trustScore, loyaltyTier }]
     """
-    with _connect() as conn:
-        # Top merchants by total collected payments
+    return response_cache.respond(
+        request, "dashboard/merchants", {"limit": limit}, lambda: build_merchants_dashboard(limit)
+    )
+
+
+@router.get("/consumers")
+def consumers_dashboard(request: Request) -> Response:
+    """
+    Returns chart-ready data for the consumers dashboard in one payload.
+
+    - monthlyCollections: line series [{ id, data: [{ x, y }] }]
+    """
+    return response_cache.respond(request, "dashboard/consumers", {}, build_consumers_dashboard)
+
+
+def build_merchants_dashboard(limit: int) -> Dict[str, Any]:
+    with get_connection() as conn:
+        # Top merchants by total collected payments (from the monthly rollup)
         top_merchants_df = pd.read_sql_query(
             """
             SELECT MerchantName AS merchant,
-                   ROUND(SUM(PaymentAmount), 2) AS amount
-            FROM payments
+                   ROUND(SUM(AmountCents) / 100.0, 2) AS amount
+            FROM payments_monthly
             GROUP BY MerchantName
             ORDER BY amount DESC
             LIMIT ?
@@ -46,8 +55,8 @@ def merchants_dashboard(limit: int = Query(10, ge=1, le=50)) -> Dict[str, Any]:
         # Payment status mix
         status_mix_df = pd.read_sql_query(
             """
-            SELECT PaymentStatus AS id, COUNT(*) AS value
-            FROM payments
+            SELECT PaymentStatus AS id, SUM(PaymentCount) AS value
+            FROM payments_monthly
             GROUP BY PaymentStatus
             """,
             conn,
@@ -65,15 +74,13 @@ def merchants_dashboard(limit: int = Query(10, ge=1, le=50)) -> Dict[str, Any]:
             conn,
         )
 
-    merchants_df["TrustScore"] = merchants_df.apply(
-        lambda r: calculate_merchant_trust_score(
-            r["RepaymentRate"], r["DisputeRate"], r["DefaultRate"],
-            r["TransactionVolume"], r["EngagementScore"], r["ComplianceScore"],
-            r["ResponsivenessScore"], int(r["ExclusivityFlag"])
-        ), axis=1
+    merchants_df["TrustScore"] = calculate_merchant_trust_scores(
+        merchants_df["RepaymentRate"], merchants_df["DisputeRate"], merchants_df["DefaultRate"],
+        merchants_df["TransactionVolume"], merchants_df["EngagementScore"], merchants_df["ComplianceScore"],
+        merchants_df["ResponsivenessScore"], merchants_df["ExclusivityFlag"].astype(int)
     )
-    merchants_df["LoyaltyTier"] = merchants_df["TrustScore"].apply(assign_loyalty_tier)
-    top_trust_df = merchants_df.sort_values("TrustScore", ascending=False).head(limit)
+    merchants_df["LoyaltyTier"] = assign_loyalty_tiers(merchants_df["TrustScore"])
+    top_trust_df = select_top_k(merchants_df, ["TrustScore"], [False], limit)
 
     return {
         "topMerchantsByPayments": top_merchants_df.to_dict(orient="records"),
@@ -89,52 +96,30 @@ def merchants_dashboard(limit: int = Query(10, ge=1, le=50)) -> Dict[str, Any]:
     }
 
 
-@router.get("/consumers")
-def consumers_dashboard() -> Dict[str, Any]:
-    """
-    Returns chart-ready data for the consumers dashboard in one payload.
-
-    - monthlyCollections: line series [{ id, data: [{ x, y }] }]
-    """
-    with _connect() as conn:
-        df = pd.read_sql_query(
+def build_consumers_dashboard() -> Dict[str, Any]:
+    # Monthly totals come from the payments_monthly rollup (exact cents,
+    # maintained by ingest), so this reads a few rows per month, not every payment
+    with get_connection() as conn:
+        months = conn.execute(
             """
-            SELECT PaymentDate, PaymentAmount, PaymentStatus
-            FROM payments
-            """,
-            conn,
-            parse_dates=["PaymentDate"],
-        )
-
-    df["month"] = df["PaymentDate"].dt.to_period("M").astype(str)
-    monthly_expected = df.groupby("month")["PaymentAmount"].sum().reset_index()
-    monthly_received = (
-        df[df["PaymentStatus"] == "PAID"]
-        .groupby("month")["PaymentAmount"].sum().reset_index()
-    )
-
-    # Ensure union of months for consistent x-axis
-    all_months = pd.DataFrame({"month": sorted(set(df["month"]))})
-    monthly_expected = all_months.merge(monthly_expected, on="month", how="left").fillna(0)
-    monthly_received = all_months.merge(monthly_received, on="month", how="left").fillna(0)
+            SELECT Month,
+                   SUM(AmountCents),
+                   SUM(CASE WHEN PaymentStatus = 'PAID' THEN AmountCents ELSE 0 END)
+            FROM payments_monthly
+            GROUP BY Month
+            ORDER BY Month
+            """
+        ).fetchall()
 
     series = [
         {
             "id": "expected",
-            "data": [
-                {"x": m, "y": float(v)}
-                for m, v in zip(monthly_expected["month"], monthly_expected["PaymentAmount"])
-            ],
+            "data": [{"x": month, "y": total_cents / 100} for month, total_cents, _ in months],
         },
         {
             "id": "received",
-            "data": [
-                {"x": m, "y": float(v)}
-                for m, v in zip(monthly_received["month"], monthly_received["PaymentAmount"])
-            ],
+            "data": [{"x": month, "y": paid_cents / 100} for month, _, paid_cents in months],
         },
     ]
 
     return {"monthlyCollections": series}
-
-
@@ -1,12 +1,18 @@
 import pandas as pd
-from fastapi import APIRouter, Query, HTTPException
-from typing import List, Literal
+from fastapi import APIRouter, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from ..utils import (
-    calculate_merchant_trust_score,
-    assign_loyalty_tier,
-    generate_summary,
-    generate_merchant_recommendations
+    calculate_merchant_trust_scores,
+    assign_loyalty_tiers,
+    build_keyset_index,
+    keyset_start,
+    encode_cursor,
+    decode_cursor
 )
+from ..snapshot import merchants_snapshot
+from ..export import EXPORT_CHUNK_ROWS, ExportFormat, export_response
+from ..enrichment import serve_enrichment
 
 router = APIRouter()
 
@@ -30,51 +36,65 @@ def prepare_merchant_metrics(df: pd.DataFrame) -> pd.DataFrame:
     ]
     df[numeric_cols] = df[numeric_cols].round(2)
 
-    def compute_scores(row):
-        trust = calculate_merchant_trust_score(
-            row["RepaymentRate"], row["DisputeRate"], row["DefaultRate"],
-            row["TransactionVolume"], row["EngagementScore"],
-            row["ComplianceScore"], row["ResponsivenessScore"],
-            row.get("ExclusivityFlag", 0)
-        )
-        return pd.Series({
-            "TrustScore": trust,
-            "LoyaltyTier": assign_loyalty_tier(trust)
-        })
-
-    scores = df.apply(compute_scores, axis=1)
-    df["TrustScore"] = scores["TrustScore"]
-    df["LoyaltyTier"] = scores["LoyaltyTier"]
+    df["TrustScore"] = calculate_merchant_trust_scores(
+        df["RepaymentRate"], df["DisputeRate"], df["DefaultRate"],
+        df["TransactionVolume"], df["EngagementScore"],
+        df["ComplianceScore"], df["ResponsivenessScore"],
+        df["ExclusivityFlag"] if "ExclusivityFlag" in df else 0
+    )
+    df["LoyaltyTier"] = assign_loyalty_tiers(df["TrustScore"])
 
     return df
 
-ALLOWED_SORT_BY = ["TrustScore", "LoyaltyTier"]
-ALLOWED_SORT_ORDER = ["asc", "desc"]
 
-# ------------------------------
-# Merchant Endpoints
-# ------------------------------
-@router.get("/", summary="Get Merchants with Trust & Loyalty Info")
-def get_merchants(
-    limit: int = Query(10, ge=1),
-    sort_by: str = Query("TrustScore,LoyaltyTier", description="Columns to sort by, comma separated. Allowed: TrustScore,LoyaltyTier"),
-    sort_order: str = Query("desc,desc", description="Sort order for each column, comma separated. Allowed: asc,desc")
-) -> List[dict]:
-    import pandas as pd
+def load_merchant_metrics() -> pd.DataFrame:
+    """Merchant metrics for the current merchants snapshot (shared, read-only)."""
+    return merchants_snapshot.derived(
+        "merchant_metrics", lambda df: prepare_merchant_metrics(df.copy())
+    )
 
-    df = pd.read_csv("app/data/merchants_loyalty.csv")
-    df = prepare_merchant_metrics(df)
 
-    # Map LoyaltyTier to numeric
-    loyalty_mapping = {"Platinum": 4, "Gold": 3, "Silver": 2, "Bronze": 1}
-    df["LoyaltyScore"] = df["LoyaltyTier"].map(loyalty_mapping)
+def fetch_merchant_metrics(merchant_id: str) -> dict:
+    """One merchant's metrics from the current snapshot. Raises 404 if it does not exist."""
+    df = load_merchant_metrics()
+    row = df[df["MerchantID"] == merchant_id]
+    if row.empty:
+        raise HTTPException(404, "Merchant not found")
+    return row.iloc[0].to_dict()
+
+
+def load_merchant_keyset(sort_key: str, sort_columns: List[str], ascending: List[bool]):
+    """
+    Merchant metrics plus their sorted keyset index for one sort order,
+    built once per merchants snapshot version and shared by every page.
+    """
+    def build(_):
+        df = load_merchant_metrics()
+        # Map LoyaltyTier to numeric
+        loyalty_mapping = {"Platinum": 4, "Gold": 3, "Silver": 2, "Bronze": 1}
+        df = df.assign(LoyaltyScore=df["LoyaltyTier"].map(loyalty_mapping))
+        return df, build_keyset_index(df, sort_columns, ascending, "MerchantID")
+
+    return merchants_snapshot.derived(f"merchant_keyset:{sort_key}", build)
 
-    # Split and validate input
+ALLOWED_SORT_BY = ["TrustScore", "LoyaltyTier"]
+ALLOWED_SORT_ORDER = ["asc", "desc"]
+SORT_BY_DESCRIPTION = "Columns to sort by, comma separated. Allowed: TrustScore,LoyaltyTier"
+SORT_ORDER_DESCRIPTION = "Sort order for each column, comma separated. Allowed: asc,desc"
+
+
+def parse_sort(sort_by: str, sort_order: str) -> tuple:
+    """
+    Validate sort_by / sort_order (400 on bad input) and return the sort key,
+    the columns to sort on and their ascending flags, for load_merchant_keyset.
+    """
     sort_by_list = [s.strip() for s in sort_by.split(",")]
     sort_order_list = [s.strip().lower() for s in sort_order.split(",")]
 
     if len(sort_by_list) != len(sort_order_list):
         raise HTTPException(status_code=400, detail="sort_by and sort_order must have same number of elements")
+    if len(set(sort_by_list)) != len(sort_by_list):
+        raise HTTPException(status_code=400, detail="sort_by columns must be distinct")
 
     sort_columns = []
     ascending_list = []
@@ -91,41 +111,80 @@ def get_merchants(
 
         ascending_list.append(order == "asc")
 
-    if sort_columns:
-        df = df.sort_values(sort_columns, ascending=ascending_list)
+    sort_key = ",".join(f"{col}:{order}" for col, order in zip(sort_by_list, sort_order_list))
+    return sort_key, sort_columns, ascending_list
 
-    results = df[["MerchantID", "MerchantName", "ExclusivityFlag", "TrustScore", "LoyaltyTier"]].head(limit).to_dict(orient="records")
+# ------------------------------
+# Merchant Endpoints
+# ------------------------------
+@router.get("/", summary="Get Merchants with Trust & Loyalty Info")
+def get_merchants(
+    response: Response,
+    limit: int = Query(10, ge=1),
+    sort_by: str = Query("TrustScore,LoyaltyTier", description=SORT_BY_DESCRIPTION),
+    sort_order: str = Query("desc,desc", description=SORT_ORDER_DESCRIPTION),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page; omit for the first page")
+) -> List[dict]:
+    sort_key, sort_columns, ascending_list = parse_sort(sort_by, sort_order)
+    df, index = load_merchant_keyset(sort_key, sort_columns, ascending_list)
+
+    # Keyset pagination: binary search past the cursor, then slice one page
+    start = 0
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort_key)
+            if len(after) != len(sort_columns) + 1:
+                raise ValueError("wrong number of values")
+            start = keyset_start(index, after)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {exc}")
+
+    page = df.iloc[index["order"][start:start + limit + 1]]
+    if len(page) > limit:
+        page = page.iloc[:limit]
+        last = page.iloc[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort_key, [float(last[col]) for col in sort_columns] + [last["MerchantID"]]
+        )
+
+    results = page[["MerchantID", "MerchantName", "ExclusivityFlag", "TrustScore", "LoyaltyTier"]].to_dict(orient="records")
     return results
         
+@router.get("/export", summary="Stream All Scored Merchants as NDJSON or CSV")
+def export_merchants(
+    fmt: ExportFormat = Query("ndjson", alias="format", description="Output format. Allowed: ndjson,csv"),
+    sort_by: str = Query("TrustScore,LoyaltyTier", description=SORT_BY_DESCRIPTION),
+    sort_order: str = Query("desc,desc", description=SORT_ORDER_DESCRIPTION)
+) -> StreamingResponse:
+    # Listing order, from the shared per-version keyset index
+    df, index = load_merchant_keyset(*parse_sort(sort_by, sort_order))
+    order = index["order"]
+
+    def chunks():
+        for start in range(0, len(order), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[order[start:start + EXPORT_CHUNK_ROWS]][MERCHANT_OUTPUT_FIELDS_ORDER]
+            yield list(chunk.itertuples(index=False, name=None))
+
+    return export_response("merchants", MERCHANT_OUTPUT_FIELDS_ORDER, chunks(), fmt)
+
 @router.get("/{merchant_id}", summary="Get Merchant Full Metrics with Recommendations")
 def get_merchant_details(merchant_id: str) -> dict:
-    df = pd.read_csv("app/data/merchants_loyalty.csv")
-    df = prepare_merchant_metrics(df)
-    row = df[df["MerchantID"] == merchant_id]
-    if row.empty:
-        raise HTTPException(404, "Merchant not found")
-    data = row.iloc[0].to_dict()
+    data = fetch_merchant_metrics(merchant_id)
 
     result = {field: data[field] for field in MERCHANT_OUTPUT_FIELDS_ORDER}
-    result["Summary"] = generate_summary("merchant", data)
-    result["Recommendations"] = generate_merchant_recommendations(data)
+    # Precomputed by the enrichment worker; never waits on the LLM
+    result.update(serve_enrichment("merchant", data))
     return result
 
 @router.get("/{merchant_id}/summary/explain", summary="Explain Merchant Scores/Tiers")
 def explain_merchant_summary(merchant_id: str) -> dict:
-    df = pd.read_csv("app/data/merchants_loyalty.csv")
-    df = prepare_merchant_metrics(df)
-    row = df[df["MerchantID"] == merchant_id]
-    if row.empty:
-        raise HTTPException(404, "Merchant not found")
-    data = row.iloc[0].to_dict()
-    explanation = generate_summary("merchant", data)
-    return {"MerchantID": merchant_id, "Explanation": explanation}
+    data = fetch_merchant_metrics(merchant_id)
+    enrichment = serve_enrichment("merchant", data)
+    return {"MerchantID": merchant_id, "Explanation": enrichment["Summary"], "Enrichment": enrichment["Enrichment"]}
 
 @router.get("/{merchant_id}/history", summary="Merchant Historical Metrics")
 def merchant_history(merchant_id: str) -> dict:
-    df = pd.read_csv("app/data/merchants_loyalty.csv")
-    df = prepare_merchant_metrics(df)
+    df = load_merchant_metrics()
     row = df[df["MerchantID"] == merchant_id]
     if row.empty:
         raise HTTPException(404, "Merchant not found")
@@ -140,8 +199,7 @@ def merchant_history(merchant_id: str) -> dict:
 
 @router.get("/{merchant_id}/benchmark", summary="Merchant Benchmark Against Peers")
 def merchant_benchmark(merchant_id: str):
-    df = pd.read_csv("app/data/merchants_loyalty.csv")
-    df = prepare_merchant_metrics(df)
+    df = load_merchant_metrics()
     row = df[df["MerchantID"] == merchant_id]
     if row.empty:
         raise HTTPException(404, "Merchant not found")
@@ -151,11 +209,6 @@ def merchant_benchmark(merchant_id: str):
 
 @router.get("/{merchant_id}/recommendations", summary="Merchant Recommendations")
 def merchant_recommendations(merchant_id: str):
-    df = pd.read_csv("app/data/merchants_loyalty.csv")
-    df = prepare_merchant_metrics(df)
-    row = df[df["MerchantID"] == merchant_id]
-    if row.empty:
-        raise HTTPException(404, "Merchant not found")
-    merchant = row.iloc[0].to_dict()
-    recommendations = generate_merchant_recommendations(merchant)
-    return {"MerchantID": merchant_id, "Recommendations": recommendations}
+    merchant = fetch_merchant_metrics(merchant_id)
+    enrichment = serve_enrichment("merchant", merchant)
+    return {"MerchantID": merchant_id, "Recommendations": enrichment["Recommendations"], "Enrichment": enrichment["Enrichment"]}
@@ -0,0 +1,43 @@
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from ..columnar_store import columnar_store
+from ..db import get_connection, ingest_payments
+from ..enrichment import enrichment_queue
+from ..models import PaymentBatch
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+# ------------------------------
+# Payments Endpoints
+# ------------------------------
+@router.post("/batch", summary="Ingest a Batch of Payments")
+def ingest_payment_batch(batch: PaymentBatch) -> Dict[str, Any]:
+    """
+    Writes the batch in one transaction and updates customer, merchant and
+    monthly aggregates incrementally. Idempotent on PaymentID: payments that
+    were already ingested are reported as duplicates and skipped. New
+    payments are appended to the columnar store (when enabled), and customers
+    with newly inserted payments are queued for AI enrichment.
+    """
+    payments = [
+        {**payment.__dict__, "PaymentDate": payment.PaymentDate.isoformat()}
+        for payment in batch.payments
+    ]
+    inserted = []
+    with get_connection() as conn:
+        result = ingest_payments(conn, payments, on_inserted=inserted.extend)
+    if inserted:
+        # Reads of the columnar store never sync, so ingest brings it up to date.
+        # The payments are committed either way; until a later sync, reads use SQLite
+        try:
+            columnar_store.sync()
+        except Exception as e:
+            logger.warning(f"Columnar store sync after ingest failed: {e}")
+        # Duplicates leave their customers' metrics, and so their enrichment, unchanged
+        result["enrichmentQueued"] = enrichment_queue.put("customer", dict.fromkeys(p["CustomerID"] for p in inserted))
+    return result
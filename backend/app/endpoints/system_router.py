@@ -0,0 +1,133 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException
+
+from ..ai_cache import ai_cache
+from ..bulk_load import load_progress
+from ..columnar_store import columnar_store
+from ..db import get_connection, pool_stats, rebuild_rollups
+from ..intent import intent_classifier
+from ..query_engine import query_engine
+from ..response_cache import response_cache
+from ..jobs.enrichment_worker import enrichment_worker
+from ..single_flight import ai_single_flight, ai_async_single_flight
+from ..snapshot import SNAPSHOTS
+
+router = APIRouter()
+
+
+# ------------------------------
+# Data snapshots
+# ------------------------------
+@router.get("/snapshots", summary="Version and age of the in-memory data snapshots")
+def get_snapshots() -> List[Dict[str, Any]]:
+    return [snapshot.info() for snapshot in SNAPSHOTS.values()]
+
+
+@router.post("/snapshots/reload", summary="Reload in-memory data snapshots from disk")
+def reload_snapshots(name: str = None) -> List[Dict[str, Any]]:
+    if name is not None and name not in SNAPSHOTS:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {name}")
+    targets = [SNAPSHOTS[name]] if name else list(SNAPSHOTS.values())
+    return [snapshot.reload() for snapshot in targets]
+
+
+# ------------------------------
+# Dashboard response cache
+# ------------------------------
+@router.get("/response-cache", summary="Versioned dashboard response cache stats")
+def get_response_cache_stats() -> Dict[str, Any]:
+    return response_cache.stats()
+
+
+@router.delete("/response-cache", summary="Drop every cached dashboard response")
+def clear_response_cache() -> Dict[str, Any]:
+    response_cache.clear()
+    return response_cache.stats()
+
+
+# ------------------------------
+# CSV bulk load
+# ------------------------------
+@router.get("/bulk-load", summary="Progress of the CSV loads into app.db")
+def get_bulk_load_progress() -> List[Dict[str, Any]]:
+    with get_connection() as conn:
+        return load_progress(conn)
+
+
+# ------------------------------
+# Columnar payments store
+# ------------------------------
+@router.get("/columnar-store", summary="Parquet payments store status and read counters")
+def get_columnar_store_stats() -> Dict[str, Any]:
+    return columnar_store.stats()
+
+
+@router.post("/columnar-store/rebuild", summary="Re-export the Parquet payments store from app.db")
+def rebuild_columnar_store() -> Dict[str, Any]:
+    return columnar_store.rebuild()
+
+
+# ------------------------------
+# Payment rollups
+# ------------------------------
+@router.post("/rollups/rebuild", summary="Rebuild payments_daily / payments_monthly from payments")
+def rebuild_payment_rollups() -> Dict[str, Any]:
+    return rebuild_rollups()
+
+
+# ------------------------------
+# SQLite connection pool
+# ------------------------------
+@router.get("/db-pool", summary="SQLite connection pool stats and pragmas")
+def get_db_pool_stats() -> Dict[str, Any]:
+    return pool_stats()
+
+
+# ------------------------------
+# AI response cache
+# ------------------------------
+@router.get("/ai-cache", summary="AI summary/recommendation cache stats")
+def get_ai_cache_stats() -> Dict[str, Any]:
+    if ai_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **ai_cache.stats()}
+
+
+@router.delete("/ai-cache", summary="Clear both tiers of the AI response cache")
+def clear_ai_cache() -> Dict[str, Any]:
+    if ai_cache is None:
+        raise HTTPException(status_code=404, detail="AI cache is disabled")
+    ai_cache.clear()
+    return {"enabled": True, **ai_cache.stats()}
+
+
+@router.get("/ai-inflight", summary="Coalescing of identical in-flight AI requests")
+def get_ai_inflight_stats() -> Dict[str, Any]:
+    return {"sync": ai_single_flight.stats(), "async": ai_async_single_flight.stats()}
+
+
+@router.get("/intent", summary="Local /ai-query intent classifier and LLM fallback rate")
+def get_intent_stats() -> Dict[str, Any]:
+    return intent_classifier.stats()
+
+
+@router.get("/query-engine", summary="/ai-query questions answered locally vs sent to the LLM")
+def get_query_engine_stats() -> Dict[str, Any]:
+    return query_engine.stats()
+
+
+# ------------------------------
+# AI enrichment worker
+# ------------------------------
+@router.get("/enrichment", summary="Background AI enrichment worker and table stats")
+def get_enrichment_stats() -> Dict[str, Any]:
+    return enrichment_worker.stats()
+
+
+@router.post("/enrichment/sweep", summary="Queue every entity with missing or stale enrichment")
+def sweep_enrichment() -> Dict[str, Any]:
+    if not enrichment_worker.stats()["running"]:
+        raise HTTPException(status_code=409, detail="Enrichment worker is not running")
+    enrichment_worker.request_sweep()
+    return enrichment_worker.stats()
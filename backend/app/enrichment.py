@@ -0,0 +1,203 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .ai_cache import AICache
+from .db import get_connection
+from .utils import AI_MODEL, RECOMMENDERS, assign_risk_score, default_summary
+
+# entity type -> (table, ID column); tables are created by init_db_from_csv
+ENRICHMENT_TABLES = {
+    "customer": ("customer_enrichment", "CustomerID"),
+    "merchant": ("merchant_enrichment", "MerchantID"),
+}
+ENRICHMENT_COLUMNS = ["MetricsHash", "Summary", "Recommendations", "RiskScore", "Benchmark", "Source", "UpdatedAt"]
+
+
+# ------------------------------
+# Derived fields
+# ------------------------------
+def metrics_hash(entity_type: str, data: Dict) -> str:
+    """Content hash of an entity's metrics (and the model); a change marks its enrichment stale."""
+    return AICache.make_key("enrichment", entity_type, data, AI_MODEL)
+
+
+def risk_score(entity_type: str, data: Dict) -> str:
+    disputes = data.get("DisputeCount", 0) if entity_type == "customer" else data.get("DisputeRate", 0)
+    return assign_risk_score(data.get("TrustScore", 0), data.get("DefaultRate", 0), disputes)
+
+
+def peer_benchmark(trust_score: float, peer_scores: np.ndarray) -> Optional[str]:
+    """Percentile statement against ``peer_scores`` (sorted ascending TrustScores)."""
+    if trust_score is None or len(peer_scores) == 0:
+        return None
+    higher = len(peer_scores) - np.searchsorted(peer_scores, trust_score, side="right")
+    return f"Top {max(math.ceil(100 * (higher + 1) / len(peer_scores)), 1)}% by TrustScore"
+
+
+# ------------------------------
+# Storage
+# ------------------------------
+def load_enrichment_state(entity_type: str, entity_ids: List[str]) -> Dict[str, Tuple[str, str, float]]:
+    """{ID: (MetricsHash, Source, UpdatedAt)} for the given IDs that have a stored row."""
+    table, id_column = ENRICHMENT_TABLES[entity_type]
+    state = {}
+    with get_connection() as conn:
+        for start in range(0, len(entity_ids), 500):
+            chunk = entity_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT {id_column}, MetricsHash, Source, UpdatedAt FROM {table} "
+                f"WHERE {id_column} IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            state.update({row[0]: tuple(row[1:]) for row in rows})
+    return state
+
+
+def needs_enrichment(state: Optional[Tuple[str, str, float]], current_hash: str, retry_after: float) -> bool:
+    """Missing, generated from other metrics, or a fallback older than ``retry_after`` (epoch seconds)."""
+    if state is None or state[0] != current_hash:
+        return True
+    return state[1] == "fallback" and state[2] < retry_after
+
+
+def store_enrichment(entity_type: str, records: List[Dict[str, Any]]) -> None:
+    table, id_column = ENRICHMENT_TABLES[entity_type]
+    columns = [id_column] + ENRICHMENT_COLUMNS
+    with get_connection() as conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [
+                tuple(json.dumps(r[c]) if c == "Recommendations" else r[c] for c in columns)
+                for r in records
+            ],
+        )
+
+
+def enrichment_table_stats() -> Dict[str, Dict[str, int]]:
+    stats = {}
+    with get_connection() as conn:
+        for entity_type, (table, _) in ENRICHMENT_TABLES.items():
+            rows = dict(conn.execute(f"SELECT Source, COUNT(*) FROM {table} GROUP BY Source").fetchall())
+            stats[entity_type] = {"rows": sum(rows.values()), "ai": rows.get("ai", 0), "fallback": rows.get("fallback", 0)}
+    return stats
+
+
+# ------------------------------
+# Work queue
+# ------------------------------
+class EnrichmentQueue:
+    """
+    Deduplicating FIFO of (entity type, ID) pairs waiting for the enrichment
+    worker. Accepts work only while a worker is running, so ingest never
+    grows it unbounded when enrichment is disabled.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self.active = False
+        self.enqueued = 0
+
+    def put(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Queue IDs not already waiting; returns how many were added."""
+        with self._cond:
+            if not self.active:
+                return 0
+            added = 0
+            for entity_id in entity_ids:
+                key = (entity_type, entity_id)
+                if key not in self._pending:
+                    self._pending[key] = None
+                    added += 1
+            self.enqueued += added
+            if added:
+                self._cond.notify_all()
+            return added
+
+    def take(self, max_items: int, timeout: float) -> Tuple[Optional[str], List[str]]:
+        """Up to ``max_items`` IDs of one entity type, waiting up to ``timeout`` for work."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None, []
+            entity_type = next(iter(self._pending))[0]
+            keys = []
+            for key in self._pending:
+                if key[0] == entity_type:
+                    keys.append(key)
+                    if len(keys) >= max_items:
+                        break
+            for key in keys:
+                del self._pending[key]
+            return entity_type, [entity_id for _, entity_id in keys]
+
+    def wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def clear(self) -> None:
+        with self._cond:
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+
+enrichment_queue = EnrichmentQueue()
+
+
+# ------------------------------
+# Serving
+# ------------------------------
+def serve_enrichment(entity_type: str, data: Dict) -> Dict[str, Any]:
+    """
+    Summary, Recommendations, RiskScore and Benchmark for a detail response,
+    read from the enrichment table without calling the LLM, plus an
+    ``Enrichment`` block describing their staleness:
+
+    - fresh: generated from the entity's current metrics
+    - stale: generated from older metrics; a refresh is queued
+    - pending: never generated; template fallbacks are served and a run is queued
+    """
+    table, id_column = ENRICHMENT_TABLES[entity_type]
+    entity_id = data[id_column]
+    with get_connection() as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(ENRICHMENT_COLUMNS)} FROM {table} WHERE {id_column} = ?", (entity_id,)
+        ).fetchone()
+
+    if row is None:
+        enrichment_queue.put(entity_type, [entity_id])
+        return {
+            "Summary": default_summary(data),
+            "Recommendations": RECOMMENDERS[entity_type][1](data),
+            "RiskScore": risk_score(entity_type, data),
+            "Benchmark": None,
+            "Enrichment": {"status": "pending", "source": None, "updatedAt": None, "ageSeconds": None},
+        }
+
+    stored = dict(zip(ENRICHMENT_COLUMNS, row))
+    stale = stored["MetricsHash"] != metrics_hash(entity_type, data)
+    if stale:
+        enrichment_queue.put(entity_type, [entity_id])
+    return {
+        "Summary": stored["Summary"],
+        "Recommendations": json.loads(stored["Recommendations"]),
+        "RiskScore": stored["RiskScore"],
+        "Benchmark": stored["Benchmark"],
+        "Enrichment": {
+            "status": "stale" if stale else "fresh",
+            "source": stored["Source"],
+            "updatedAt": datetime.fromtimestamp(stored["UpdatedAt"], tz=timezone.utc).isoformat(),
+            "ageSeconds": round(time.time() - stored["UpdatedAt"], 3),
+        },
+    }
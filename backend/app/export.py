@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator, List, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+
+# Rows encoded and flushed per chunk; peak memory is one chunk, not the population
+EXPORT_CHUNK_ROWS = 5000
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+# ------------------------------
+# Chunk Encoders
+# ------------------------------
+def iter_ndjson(fields: Sequence[str], chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """One JSON object per line, one yielded string per chunk of rows."""
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(fields, row))) + "\n" for row in rows)
+
+
+def iter_csv(fields: Sequence[str], chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """Header line, then one yielded CSV block per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: the population was empty
+        yield buffer.getvalue()
+
+
+def export_response(
+    name: str,
+    fields: Sequence[str],
+    chunks: Iterable[List[tuple]],
+    fmt: ExportFormat
+) -> StreamingResponse:
+    """
+    Stream ``chunks`` (lists of row tuples ordered like ``fields``) as an
+    NDJSON or CSV attachment. ``chunks`` should be a lazy generator so rows
+    are produced only as the client reads them.
+    """
+    encode = iter_csv if fmt == "csv" else iter_ndjson
+    return StreamingResponse(
+        encode(fields, chunks),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,110 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ------------------------------
+# Settings
+# ------------------------------
+# Share of the keyword evidence the winning entity needs for a local answer
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+# Minimum total evidence; weaker queries go to the LLM
+INTENT_MIN_SCORE = float(os.getenv("INTENT_MIN_SCORE", "2"))
+
+# ------------------------------
+# Vocabulary
+# ------------------------------
+# Unigrams and bigrams (lowercase words) -> evidence for each entity type
+ENTITY_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "customers": {
+        "customer": 3, "customers": 3, "consumer": 3, "consumers": 3, "borrower": 3, "borrowers": 3,
+        "client": 2, "clients": 2, "buyer": 2, "buyers": 2, "shopper": 2, "shoppers": 2,
+        "user": 1, "users": 1, "people": 1, "individuals": 1, "who": 0.5,
+        "loan": 1, "loans": 1, "credit": 1, "installment": 1, "installments": 1, "collections": 1,
+        "dispute count": 2, "disputecount": 2, "customerid": 3, "customer id": 3,
+    },
+    "merchants": {
+        "merchant": 3, "merchants": 3, "seller": 3, "sellers": 3, "vendor": 3, "vendors": 3,
+        "retailer": 3, "retailers": 3, "store": 2, "stores": 2, "shop": 2, "shops": 2,
+        "partner": 2, "partners": 2, "business": 2, "businesses": 2, "sector": 2, "sectors": 2,
+        "tenure": 2, "engagement": 2, "compliance": 2, "compliant": 2, "responsiveness": 2,
+        "responsive": 2, "exclusivity": 2, "exclusive": 2, "sales": 1, "revenue": 1,
+        "dispute rate": 1, "merchantid": 3, "merchant id": 3,
+    },
+}
+# Entity IDs (C001, M042) are the strongest evidence
+ID_PATTERNS = {
+    "customers": (re.compile(r"^c\d+$"), 4.0),
+    "merchants": (re.compile(r"^m\d+$"), 4.0),
+}
+
+
+def score_entities(query: str) -> Dict[str, float]:
+    """Keyword and ID evidence for each entity type in ``query``."""
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    scores = {entity: 0.0 for entity in ENTITY_KEYWORDS}
+    for gram in grams:
+        for entity, keywords in ENTITY_KEYWORDS.items():
+            scores[entity] += keywords.get(gram, 0.0)
+    for word in words:
+        for entity, (pattern, weight) in ID_PATTERNS.items():
+            if pattern.match(word):
+                scores[entity] += weight
+    return scores
+
+
+# ------------------------------
+# Classifier
+# ------------------------------
+class IntentClassifier:
+    """
+    Decides whether a query is about customers or merchants from keyword
+    evidence, in microseconds and deterministically. Returns no answer when
+    the evidence is weak or split (below the confidence threshold), so the
+    caller can fall back to the LLM; the fallback rate is tracked.
+    """
+
+    def __init__(self, threshold: float, min_score: float):
+        self.threshold = threshold
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "local": 0, "fallback": 0}
+        self._by_entity = {entity: 0 for entity in ENTITY_KEYWORDS}
+
+    def classify(self, query: str) -> Tuple[Optional[str], float]:
+        """``(entity type, confidence)``; the entity type is None when the LLM should decide."""
+        scores = score_entities(query)
+        total = sum(scores.values())
+        entity = max(scores, key=scores.get)
+        confidence = scores[entity] / total if total else 0.0
+        local = total >= self.min_score and confidence >= self.threshold
+
+        with self._lock:
+            self._counters["queries"] += 1
+            if local:
+                self._counters["local"] += 1
+                self._by_entity[entity] += 1
+            else:
+                self._counters["fallback"] += 1
+        return (entity if local else None), round(confidence, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            by_entity = dict(self._by_entity)
+        return {
+            "threshold": self.threshold,
+            "minScore": self.min_score,
+            **counters,
+            "fallbackRate": round(counters["fallback"] / counters["queries"], 4) if counters["queries"] else 0.0,
+            "localByEntity": by_entity,
+        }
+
+
+# Shared by the /ai-query router
+intent_classifier = IntentClassifier(INTENT_CONFIDENCE_THRESHOLD, INTENT_MIN_SCORE)
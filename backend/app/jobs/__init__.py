@@ -0,0 +1 @@
+# Marks jobs as a package
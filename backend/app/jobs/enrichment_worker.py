@@ -0,0 +1,291 @@
+"""
+enrichment_worker.py
+
+Background precompute of AI enrichment (Summary, Recommendations, RiskScore,
+Benchmark) into the customer_enrichment / merchant_enrichment tables, so
+detail endpoints serve stored values and never wait on the LLM.
+
+- Runs as a daemon thread started and stopped with the API
+- Entities are queued when their metrics change: by payment ingest, by a
+  detail request that finds a missing or stale row, and by periodic sweeps
+  that compare every entity's metrics hash with its stored row
+- Summaries are generated in batches; recommendations run concurrently on
+  the shared AI thread pool; both go through the AI response cache
+- Rows built from template fallbacks are retried after ENRICHMENT_RETRY_SECONDS
+
+Usage (from backend/), to enrich everything once without the API:
+    python -m app.jobs.enrichment_worker --entity all
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ..db import get_connection, get_data_version, init_db_from_csv
+from ..endpoints.customers_router import CUSTOMER_FULL_FIELDS_ORDER
+from ..endpoints.merchants_router import load_merchant_metrics
+from ..enrichment import (
+    ENRICHMENT_TABLES,
+    enrichment_queue,
+    enrichment_table_stats,
+    load_enrichment_state,
+    metrics_hash,
+    needs_enrichment,
+    peer_benchmark,
+    risk_score,
+    store_enrichment,
+)
+from ..snapshot import merchants_snapshot
+from ..utils import RECOMMENDERS, default_summary, generate_summaries_batch, run_ai_tasks
+from .summarize import customer_profiles, merchant_profiles
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# ------------------------------
+# Settings
+# ------------------------------
+ENRICHMENT_ENABLED = os.getenv("ENRICHMENT_ENABLED", "1").lower() not in ("0", "false", "no")
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "20"))
+ENRICHMENT_SWEEP_SECONDS = float(os.getenv("ENRICHMENT_SWEEP_SECONDS", "600"))
+ENRICHMENT_RETRY_SECONDS = float(os.getenv("ENRICHMENT_RETRY_SECONDS", "3600"))
+
+PROFILE_LOADERS = {"customer": customer_profiles, "merchant": merchant_profiles}
+
+
+def load_profiles(entity_type: str, entity_ids: List[str]) -> Dict[str, Dict]:
+    """Current profiles (shaped like the detail endpoints') for the IDs that still exist."""
+    if entity_type == "merchant":
+        df = load_merchant_metrics()
+        return {record["MerchantID"]: record for record in df[df["MerchantID"].isin(entity_ids)].to_dict(orient="records")}
+
+    profiles = {}
+    with get_connection() as conn:
+        for start in range(0, len(entity_ids), 500):
+            chunk = entity_ids[start:start + 500]
+            cursor = conn.execute(
+                f"SELECT {', '.join(CUSTOMER_FULL_FIELDS_ORDER)} FROM customer_metrics "
+                f"WHERE CustomerID IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            profiles.update({row[0]: dict(zip(CUSTOMER_FULL_FIELDS_ORDER, row)) for row in cursor})
+    return profiles
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp else None
+
+
+class EnrichmentWorker:
+    def __init__(self, batch_size: int, sweep_seconds: float, retry_seconds: float):
+        self.batch_size = batch_size
+        self.sweep_seconds = sweep_seconds
+        self.retry_seconds = retry_seconds
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._next_sweep = 0.0
+        # entity type -> (data version, sorted peer TrustScores)
+        self._peer_scores: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"batches": 0, "enriched": 0, "ai": 0, "fallback": 0, "skipped": 0, "sweeps": 0, "errors": 0}
+        self._last_error: Optional[str] = None
+        self._last_batch_at: Optional[float] = None
+        self._last_sweep_at: Optional[float] = None
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._next_sweep = 0.0
+        enrichment_queue.active = True
+        self._thread = threading.Thread(target=self._run, name="enrichment", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop after the current batch; anything still queued is dropped (the next sweep finds it)."""
+        enrichment_queue.active = False
+        enrichment_queue.clear()
+        self._stop.set()
+        enrichment_queue.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def request_sweep(self) -> None:
+        self._next_sweep = 0.0
+        enrichment_queue.wake()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= self._next_sweep:
+                    self._next_sweep = time.monotonic() + self.sweep_seconds
+                    for entity_type in PROFILE_LOADERS:
+                        self.sweep(entity_type)
+                entity_type, entity_ids = enrichment_queue.take(self.batch_size, timeout=1.0)
+                if entity_ids:
+                    self.enrich(entity_type, entity_ids)
+            except Exception as e:
+                # Keep the worker alive; the entities are found again by the next sweep
+                logger.exception("Enrichment worker error")
+                self._count("errors")
+                self._last_error = f"{type(e).__name__}: {e}"
+                self._stop.wait(1.0)
+
+    # ------------------------------
+    # Work
+    # ------------------------------
+    def sweep(self, entity_type: str, chunk_size: int = 2000) -> int:
+        """Queue every entity whose enrichment is missing, stale or a fallback due for retry."""
+        queued = 0
+        for profiles in PROFILE_LOADERS[entity_type](chunk_size):
+            if self._stop.is_set():
+                break
+            state = load_enrichment_state(entity_type, list(profiles))
+            retry_after = time.time() - self.retry_seconds
+            queued += enrichment_queue.put(entity_type, [
+                entity_id for entity_id, data in profiles.items()
+                if needs_enrichment(state.get(entity_id), metrics_hash(entity_type, data), retry_after)
+            ])
+        self._count("sweeps")
+        self._last_sweep_at = time.time()
+        if queued:
+            logger.info(f"Enrichment sweep queued {queued} {entity_type}s.")
+        return queued
+
+    def enrich(self, entity_type: str, entity_ids: List[str]) -> int:
+        """Generate and store enrichment for the IDs that need it; returns how many were written."""
+        profiles = load_profiles(entity_type, entity_ids)
+        state = load_enrichment_state(entity_type, list(profiles))
+        hashes = {entity_id: metrics_hash(entity_type, data) for entity_id, data in profiles.items()}
+        retry_after = time.time() - self.retry_seconds
+        todo = {
+            entity_id: data for entity_id, data in profiles.items()
+            if needs_enrichment(state.get(entity_id), hashes[entity_id], retry_after)
+        }
+        self._count("skipped", len(entity_ids) - len(todo))
+        if not todo:
+            return 0
+
+        recommend, default_recommend = RECOMMENDERS[entity_type]
+        summaries = generate_summaries_batch(entity_type, todo)["summaries"]
+        recommendations = run_ai_tasks(
+            tasks={entity_id: partial(recommend, data) for entity_id, data in todo.items()},
+            fallbacks={entity_id: partial(default_recommend, data) for entity_id, data in todo.items()},
+        )
+        peers = self._peers(entity_type)
+
+        now = time.time()
+        records = []
+        for entity_id, data in todo.items():
+            fallback = (
+                summaries[entity_id] == default_summary(data)
+                or recommendations[entity_id] == default_recommend(data)
+            )
+            records.append({
+                ENRICHMENT_TABLES[entity_type][1]: entity_id,
+                "MetricsHash": hashes[entity_id],
+                "Summary": summaries[entity_id],
+                "Recommendations": recommendations[entity_id],
+                "RiskScore": risk_score(entity_type, data),
+                "Benchmark": peer_benchmark(data.get("TrustScore"), peers),
+                "Source": "fallback" if fallback else "ai",
+                "UpdatedAt": now,
+            })
+        store_enrichment(entity_type, records)
+
+        fallbacks = sum(record["Source"] == "fallback" for record in records)
+        with self._lock:
+            self._counters["batches"] += 1
+            self._counters["enriched"] += len(records)
+            self._counters["fallback"] += fallbacks
+            self._counters["ai"] += len(records) - fallbacks
+            self._last_batch_at = now
+        return len(records)
+
+    def _peers(self, entity_type: str) -> np.ndarray:
+        """Sorted TrustScores of the whole population, rebuilt when its data version changes."""
+        if entity_type == "merchant":
+            df = load_merchant_metrics()
+            version = merchants_snapshot.version
+            if self._peer_scores.get(entity_type, (None,))[0] != version:
+                self._peer_scores[entity_type] = (version, np.sort(df["TrustScore"].dropna().to_numpy(dtype=float)))
+        else:
+            with get_connection() as conn:
+                version = get_data_version(conn)
+                if self._peer_scores.get(entity_type, (None,))[0] != version:
+                    scores = conn.execute("SELECT TrustScore FROM customer_metrics WHERE TrustScore IS NOT NULL")
+                    self._peer_scores[entity_type] = (version, np.sort(np.fromiter((s for (s,) in scores), dtype=float)))
+        return self._peer_scores[entity_type][1]
+
+    # ------------------------------
+    # Stats
+    # ------------------------------
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "enabled": ENRICHMENT_ENABLED,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queued": len(enrichment_queue),
+            "enqueued": enrichment_queue.enqueued,
+            **counters,
+            "lastError": self._last_error,
+            "lastBatchAt": _isoformat(self._last_batch_at),
+            "lastSweepAt": _isoformat(self._last_sweep_at),
+            "batchSize": self.batch_size,
+            "sweepSeconds": self.sweep_seconds,
+            "retrySeconds": self.retry_seconds,
+            "tables": enrichment_table_stats(),
+        }
+
+
+# Started and stopped by the API (see main.py) when ENRICHMENT_ENABLED
+enrichment_worker = EnrichmentWorker(
+    batch_size=ENRICHMENT_BATCH_SIZE,
+    sweep_seconds=ENRICHMENT_SWEEP_SECONDS,
+    retry_seconds=ENRICHMENT_RETRY_SECONDS,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entity", choices=["customers", "merchants", "all"], default="all")
+    parser.add_argument("--batch-size", type=int, default=ENRICHMENT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db_from_csv()
+    worker = EnrichmentWorker(args.batch_size, ENRICHMENT_SWEEP_SECONDS, ENRICHMENT_RETRY_SECONDS)
+    targets = ["customer", "merchant"] if args.entity == "all" else [args.entity.rstrip("s")]
+    enrichment_queue.active = True
+    for entity_type in targets:
+        start = time.perf_counter()
+        worker.sweep(entity_type)
+        written = 0
+        while True:
+            queued_type, entity_ids = enrichment_queue.take(args.batch_size, timeout=0)
+            if not entity_ids:
+                break
+            written += worker.enrich(queued_type, entity_ids)
+        print(f"{entity_type + 's':>10}: {written:,} enriched in {time.perf_counter() - start:.1f}s")
+    print(enrichment_table_stats())
+
+
+if __name__ == "__main__":
+    main()
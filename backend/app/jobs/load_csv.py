@@ -0,0 +1,42 @@
+"""
+load_csv.py
+
+Loads payments.csv and merchants_loyalty.csv into app.db ahead of starting
+the API (which otherwise does it on startup), logging progress, then builds
+the indexes and aggregates. Rerun it to resume an interrupted load.
+
+- CSVs are streamed in --chunk-mb blocks, one transaction each, so memory
+  does not grow with the file
+- Tables that are already loaded are skipped
+
+Usage (from backend/):
+    python -m app.jobs.load_csv
+    python -m app.jobs.load_csv --chunk-mb 32
+"""
+
+import argparse
+import time
+
+from ..bulk_load import BULK_LOAD_CHUNK_MB, load_progress
+from ..db import get_connection, init_db_from_csv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunk-mb", type=int, default=BULK_LOAD_CHUNK_MB,
+                        help="CSV megabytes parsed and committed per transaction")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    init_db_from_csv(args.chunk_mb * 1024 * 1024)
+    with get_connection() as conn:
+        for row in load_progress(conn):
+            print(
+                f"{row['TableName']:>18}: {row['RowsLoaded']:,} rows from {row['Source']} "
+                f"({'complete' if row['Completed'] else 'incomplete'})"
+            )
+    print(f"Database ready in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
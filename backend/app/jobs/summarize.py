@@ -0,0 +1,95 @@
+"""
+summarize.py
+
+Pre-generates AI summaries for the whole customer and/or merchant population
+with batched LLM calls, filling the AI response cache so detail pages are
+served from it.
+
+- Many profiles per prompt, split to fit the token budgets
+- Profiles already in the cache are skipped unless --force
+- Entities without a usable AI answer get the template fallback (not cached)
+- Customers are read from customer_metrics in chunks, merchants from the snapshot
+
+Usage (from backend/):
+    python -m app.jobs.summarize --entity all
+    python -m app.jobs.summarize --entity merchants --max-prompt-tokens 4000 --output summaries.ndjson
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from typing import Dict, Iterator
+
+from ..db import get_connection, init_db_from_csv
+from ..endpoints.customers_router import CUSTOMER_FULL_FIELDS_ORDER
+from ..endpoints.merchants_router import load_merchant_metrics
+from ..utils import generate_summaries_batch
+
+
+def customer_profiles(chunk_size: int) -> Iterator[Dict[str, Dict]]:
+    """Customer profiles shaped like fetch_customer_metrics, chunk_size at a time."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(
+            f"SELECT {', '.join(CUSTOMER_FULL_FIELDS_ORDER)} FROM customer_metrics ORDER BY CustomerID"
+        )
+        while rows := cursor.fetchmany(chunk_size):
+            yield {row["CustomerID"]: dict(row) for row in rows}
+
+
+def merchant_profiles(chunk_size: int) -> Iterator[Dict[str, Dict]]:
+    """Merchant profiles shaped like fetch_merchant_metrics, chunk_size at a time."""
+    records = load_merchant_metrics().to_dict(orient="records")
+    for start in range(0, len(records), chunk_size):
+        yield {record["MerchantID"]: record for record in records[start:start + chunk_size]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entity", choices=["customers", "merchants", "all"], default="all")
+    parser.add_argument("--max-prompt-tokens", type=int, default=6000,
+                        help="Estimated prompt tokens per LLM call")
+    parser.add_argument("--max-output-tokens", type=int, default=4000,
+                        help="Answer tokens per LLM call (caps profiles per batch)")
+    parser.add_argument("--chunk-size", type=int, default=2000,
+                        help="Profiles loaded and batched at a time")
+    parser.add_argument("--force", action="store_true", help="Regenerate cached summaries")
+    parser.add_argument("--output", help="Also write {id, entity, summary} lines to this NDJSON file")
+    args = parser.parse_args()
+
+    init_db_from_csv()
+    sources = {"customers": ("customer", customer_profiles), "merchants": ("merchant", merchant_profiles)}
+    targets = list(sources) if args.entity == "all" else [args.entity]
+    output = open(args.output, "w") if args.output else None
+
+    try:
+        for target in targets:
+            entity_type, load_profiles = sources[target]
+            totals = {"entities": 0, "cached": 0, "generated": 0, "fallback": 0, "calls": 0}
+            start = time.perf_counter()
+            for profiles in load_profiles(args.chunk_size):
+                result = generate_summaries_batch(
+                    entity_type, profiles,
+                    max_prompt_tokens=args.max_prompt_tokens,
+                    max_output_tokens=args.max_output_tokens,
+                    force=args.force,
+                )
+                for key, value in result["stats"].items():
+                    totals[key] += value
+                if output:
+                    for entity_id, summary in result["summaries"].items():
+                        output.write(json.dumps({"id": entity_id, "entity": entity_type, "summary": summary}) + "\n")
+            print(
+                f"{target:>10}: {totals['entities']:,} profiles, {totals['cached']:,} already cached, "
+                f"{totals['generated']:,} generated, {totals['fallback']:,} fallback, "
+                f"{totals['calls']:,} LLM calls in {time.perf_counter() - start:.1f}s"
+            )
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
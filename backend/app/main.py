@@ -3,8 +3,12 @@ from .endpoints import customers_router, merchants_router, ai_query_router   # i
 from fastapi.middleware.cors import CORSMiddleware
 from .endpoints import customers_router, merchants_router  # import your routers
 # from .endpoints import leaderboard
-from .endpoints import dashboard, ai_router
-from .db import init_db_from_csv
+from .endpoints import dashboard, ai_router, system_router, payments_router
+from .db import close_connections, init_db_from_csv
+from .columnar_store import columnar_store
+from .ai_cache import ai_cache
+from .ai_client import aclose as close_ai_client
+from .jobs.enrichment_worker import ENRICHMENT_ENABLED, enrichment_worker
 
 # Create FastAPI app instance with metadata
 app = FastAPI(
@@ -32,6 +36,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Listing endpoints return the next page's cursor in a header
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
@@ -41,15 +47,34 @@ def root():
 # Include all routers
 app.include_router(customers_router.router, prefix="/customers", tags=["Customers"])
 app.include_router(merchants_router.router, prefix="/merchants", tags=["Merchants"])
+app.include_router(payments_router.router, prefix="/payments", tags=["Payments"])
 
 # Include AI query router
 app.include_router(ai_query_router.router, prefix="", tags=["AI Query"])
 # app.include_router(leaderboard.router, prefix="/leaderboard", tags=["Leaderboard"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
 app.include_router(ai_router.router, prefix="/ai", tags=["AI Chat"])
+app.include_router(system_router.router, prefix="/system", tags=["System"])
 
 
 @app.on_event("startup")
 def startup_event() -> None:
     # Initialize SQLite DB from CSVs if needed
     init_db_from_csv()
+    # Check the optional Parquet copy of payments against app.db and bring it
+    # up to date (no-op when disabled); ingest keeps it current afterwards
+    columnar_store.sync(verify=True)
+    # Precompute AI enrichment in the background (see jobs/enrichment_worker.py)
+    if ENRICHMENT_ENABLED:
+        enrichment_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    enrichment_worker.stop()
+    # Close the shared OpenAI HTTP connection pool
+    await close_ai_client()
+    # Close pooled SQLite connections
+    close_connections()
+    if ai_cache is not None:
+        ai_cache.close()
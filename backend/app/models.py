@@ -2,7 +2,8 @@ from typing import Optional, List
 from pydantic import BaseModel, Field
 
 
-from typing import List, Optional
+from datetime import date
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -60,3 +61,29 @@ class Customer(BaseModel):
     Explanation: Optional[str] = Field(None, description="Reasoning for TrustScore and LoyaltyTier assignment")
     History: Optional[List[dict]] = Field(None, description="Historical trust, repayment, and dispute trends")
     Rank: Optional[int] = Field(None, description="Leaderboard rank for this customer")
+
+
+class Payment(BaseModel):
+    """
+    Pydantic model for a single payment accepted by the ingest API.
+    Mirrors the columns of payments.csv / the payments table.
+    """
+
+    PaymentID: str = Field(..., min_length=1, description="Unique payment identifier; retries with the same ID are ignored")
+    CustomerID: str = Field(..., min_length=1, description="Identifier of the paying customer")
+    CustomerName: str = Field(..., description="Name of the paying customer")
+    MerchantID: str = Field(..., min_length=1, description="Identifier of the merchant")
+    MerchantName: str = Field(..., description="Name of the merchant")
+    PaymentDate: date = Field(..., description="Payment date (YYYY-MM-DD)")
+    PaymentAmount: float = Field(..., ge=0, description="Payment amount")
+    # Only settled payments: ingest is append-only (a replayed PaymentID is ignored), so an
+    # in-flight payment could never be settled later and would count as a missed repayment
+    PaymentStatus: Literal["PAID", "FAILED"] = Field(..., description="Payment status (settled payments only)")
+    DisputeFlag: int = Field(0, ge=0, le=1, description="1 if the payment was disputed, 0 otherwise")
+    DefaultFlag: int = Field(0, ge=0, le=1, description="1 if the payment defaulted, 0 otherwise")
+
+
+class PaymentBatch(BaseModel):
+    """Batch of payments written in a single transaction."""
+
+    payments: List[Payment] = Field(..., min_length=1, max_length=50000, description="Payments to ingest (up to 50,000 per call)")
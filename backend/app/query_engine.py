@@ -0,0 +1,318 @@
+import operator
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from .ai_context import COLUMN_KEYWORDS, LOYALTY_TIERS, RISK_COLUMNS
+from .utils import select_top_k
+
+load_dotenv()
+
+# ------------------------------
+# Settings
+# ------------------------------
+# Rows returned for list-style answers ("customers in Bronze tier")
+QUERY_ENGINE_MAX_ROWS = int(os.getenv("QUERY_ENGINE_MAX_ROWS", "50"))
+QUERY_ENGINE_DEFAULT_LIMIT = 10
+
+# ------------------------------
+# Query vocabulary
+# ------------------------------
+# Questions that need judgement or prose go to the LLM
+OPEN_ENDED_WORDS = {
+    "why", "explain", "recommend", "recommendation", "recommendations", "suggest", "should",
+    "insight", "insights", "strategy", "improve", "predict", "forecast", "trend", "trends",
+    "analyze", "analyse", "summarize", "summary", "chart", "plot", "compare", "doing",
+}
+AGGREGATE_WORDS = {
+    "average": "mean", "avg": "mean", "mean": "mean", "median": "median",
+    "total": "sum", "sum": "sum", "maximum": "max", "max": "max", "minimum": "min", "min": "min",
+}
+COUNT_PATTERN = re.compile(r"\b(?:how many|count of|number of)\b|(?<!dispute )\bcount\b")
+HIGH_RANK_WORDS = {"top", "highest", "best", "most", "largest", "biggest", "strongest"}
+LOW_RANK_WORDS = {"bottom", "lowest", "worst", "least", "fewest", "smallest", "weakest"}
+# "best" of a risk column (DefaultRate, disputes) means its lowest values
+GOOD_WORDS = {"best", "strongest"}
+BAD_WORDS = {"worst", "weakest"}
+# "last 30 days" is a time window, not a ranking, so only top/bottom/first set a limit
+LIMIT_PATTERN = re.compile(r"\b(?:top|bottom|first)\s+(\d+)\b|\b(\d+)\s+(?:best|worst|highest|lowest|top|bottom)\b")
+COMPARISON_PATTERN = re.compile(
+    r"(>=|<=|>|<|=|at least|at most|more than|less than|greater than|fewer than|above|over|below|under|exactly|equal to)"
+    r"\s*(\d+(?:\.\d+)?)(?:\s*(%|months?\b))?"
+)
+COMPARATORS = {
+    ">=": ">=", "at least": ">=", "<=": "<=", "at most": "<=",
+    ">": ">", "more than": ">", "greater than": ">", "above": ">", "over": ">",
+    "<": "<", "less than": "<", "fewer than": "<", "below": "<", "under": "<",
+    "=": "==", "exactly": "==", "equal to": "==",
+}
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq}
+# Metrics stored as fractions: "10%" (or a bare 10) means 0.10
+FRACTION_COLUMNS = {
+    "RepaymentRate", "DefaultRate", "DisputeRate", "EngagementScore", "ComplianceScore", "ResponsivenessScore",
+}
+GROUP_PATTERN = re.compile(r"\b(?:by|per|for each|each|across)\s+(?:loyalty\s+)?tiers?\b")
+EXCLUSIVE_PATTERN = re.compile(r"\bnon-?exclusive\b|\bnot exclusive\b|\bexclusive\b")
+TIER_PATTERN = re.compile(rf"\b(?:{'|'.join(tier.lower() for tier in LOYALTY_TIERS)})\b")
+# Words a supported query may contain besides metrics, tiers, numbers it uses and
+# the ranking/aggregate vocabulary. Anything else (negations, "between", time
+# windows, units, numbers that no filter or limit consumed) sends it to the LLM.
+FILLER_WORDS = {
+    "customer", "customers", "merchant", "merchants", "the", "a", "an", "with", "by", "in", "of", "who",
+    "which", "whose", "that", "have", "has", "having", "are", "is", "their", "show", "list", "me", "give",
+    "find", "get", "what", "whats", "tier", "tiers", "loyalty", "and", "for", "all", "there", "how", "many",
+    "count", "number", "per", "each", "across", "please", "our", "do", "does", "rate", "score", "s",
+}
+
+
+# ------------------------------
+# Parsing
+# ------------------------------
+def _column_phrases(column: str) -> List[str]:
+    """Full spellings of a metric: "engagement score" and "engagementscore" for EngagementScore."""
+    words = re.findall(r"[A-Z][a-z]*", column)
+    return [" ".join(words).lower(), column.lower()]
+
+
+def _column_mentions(text: str, columns: Sequence[str]) -> List[Tuple[int, int, str]]:
+    """
+    (start, end, column) for each metric ``text`` names, in order. Full column
+    phrases are matched before COLUMN_KEYWORDS, so "engagement score" is
+    EngagementScore, not the generic "score" (TrustScore).
+    """
+    taken = np.zeros(len(text) + 1, dtype=bool)
+    mentions = []
+
+    def claim(pattern: str, column: str) -> None:
+        for match in re.finditer(pattern, text):
+            if not taken[match.start():match.end()].any():
+                taken[match.start():match.end()] = True
+                mentions.append((match.start(), match.end(), column))
+
+    phrases = [
+        (phrase, column) for column, _ in COLUMN_KEYWORDS if column in columns for phrase in _column_phrases(column)
+    ]
+    for phrase, column in sorted(phrases, key=lambda item: -len(item[0])):
+        claim(rf"\b{re.escape(phrase)}s?\b", column)
+    for column, words in COLUMN_KEYWORDS:
+        if column in columns:
+            for word in words:
+                claim(rf"\b{re.escape(word)}[\w-]*", column)
+    return sorted(mentions)
+
+
+def parse_query(query: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """
+    Structured plan for a common query shape, or None when the query needs the
+    LLM. Recognized shapes, combinable with filters:
+
+    - rank: "top 5 merchants by trust score", "customers with the lowest repayment"
+    - aggregate: "average default rate", "total volume by tier", "how many Gold customers"
+    - list: "customers in Bronze tier", "merchants with dispute rate above 10%"
+
+    Filters are tiers, exclusivity (merchants) and numeric comparisons such
+    as "TrustScore above 90" or "more than 2 disputes". A query is only
+    answered locally if every word is accounted for: negations, ranges,
+    time windows, ambiguous metrics or leftover numbers return None.
+    """
+    text = query.lower()
+    words = set(re.findall(r"[a-z]+", text))
+    if words & OPEN_ENDED_WORDS:
+        return None
+
+    mentions = _column_mentions(text, columns)
+    used = np.zeros(len(text), dtype=bool)
+    used_mentions = set()
+
+    def consume(start: int, end: int) -> None:
+        used[start:end] = True
+
+    filters: List[Tuple[str, str, float]] = []
+    for match in COMPARISON_PATTERN.finditer(text):
+        # The metric is named just before the comparison, or right after it ("more than 2 disputes")
+        before = [m for m in mentions if m[1] <= match.start() and match.start() - m[1] <= 30]
+        after = [m for m in mentions if m[0] >= match.end() and m[0] - match.end() <= 25]
+        mention = before[-1] if before else after[0] if after else None
+        if mention is None or mention in used_mentions:
+            return None
+        column, value, unit = mention[2], float(match.group(2)), match.group(3)
+        if unit == "%" or (column in FRACTION_COLUMNS and value > 1):
+            if column not in FRACTION_COLUMNS or value > 100:
+                return None
+            value /= 100
+        elif unit and column != "TenureMonths":
+            return None
+        used_mentions.add(mention)
+        consume(match.start(), match.end())
+        consume(mention[0], mention[1])
+        filters.append((column, COMPARATORS[match.group(1)], value))
+
+    tiers = []
+    for match in TIER_PATTERN.finditer(text):
+        consume(match.start(), match.end())
+        tiers.append(next(tier for tier in LOYALTY_TIERS if tier.lower() == match.group()))
+    exclusive = None
+    if "ExclusivityFlag" in columns:
+        for match in EXCLUSIVE_PATTERN.finditer(text):
+            flag = 1 if match.group() == "exclusive" else 0
+            if exclusive is not None and flag != exclusive:
+                return None
+            exclusive = flag
+            consume(match.start(), match.end())
+    plan: Dict[str, Any] = {"filters": filters, "tiers": list(dict.fromkeys(tiers)), "exclusive": exclusive}
+
+    limit = LIMIT_PATTERN.search(text)
+    if limit:
+        group = next(i for i in (1, 2) if limit.group(i))
+        if int(limit.group(group)) < 1:
+            return None  # "top 0" asks for no rows; not a shape to answer exactly
+        consume(*limit.span(group))
+    # Metrics not used by a filter name the column to rank or aggregate; more than one is ambiguous
+    free = list(dict.fromkeys(m[2] for m in mentions if m not in used_mentions))
+    if len(free) > 1:
+        return None
+    column = free[0] if free else None
+    for m in mentions:
+        consume(m[0], m[1])
+    remainder = "".join(" " if flag else char for char, flag in zip(text, used))
+
+    leftover = set(re.findall(r"[a-z]+|\d", remainder)) - FILLER_WORDS - set(AGGREGATE_WORDS) \
+        - HIGH_RANK_WORDS - LOW_RANK_WORDS - {"top", "bottom", "first"}
+    if leftover:
+        return None
+
+    aggregate = next((AGGREGATE_WORDS[word] for word in re.findall(r"[a-z]+", remainder) if word in AGGREGATE_WORDS), None)
+    if aggregate or COUNT_PATTERN.search(remainder):
+        if (aggregate is None) == (column is not None):
+            return None  # an aggregate needs a metric; a count must not name one
+        plan.update(
+            operation="aggregate",
+            aggregate=aggregate or "count",
+            column=column,
+            group_by="LoyaltyTier" if GROUP_PATTERN.search(remainder) else None,
+        )
+        return plan
+
+    high, low = words & HIGH_RANK_WORDS, words & LOW_RANK_WORDS
+    if high or low or limit:
+        column = column or "TrustScore"
+        ascending = bool(low) and not high
+        if column in RISK_COLUMNS and words & (GOOD_WORDS | BAD_WORDS):
+            ascending = bool(words & GOOD_WORDS)
+        plan.update(
+            operation="rank",
+            column=column,
+            ascending=ascending,
+            limit=int(next(g for g in limit.groups() if g)) if limit else QUERY_ENGINE_DEFAULT_LIMIT,
+        )
+        return plan
+
+    if column is None and (filters or tiers or exclusive is not None):
+        plan.update(operation="list")
+        return plan
+    return None
+
+
+# ------------------------------
+# Execution
+# ------------------------------
+def _apply_filters(df: pd.DataFrame, plan: Dict[str, Any]) -> Tuple[pd.DataFrame, List[str]]:
+    mask = np.ones(len(df), dtype=bool)
+    described = []
+    for column, op, value in plan["filters"]:
+        mask &= OPERATORS[op](df[column].to_numpy(), value)
+        described.append(f"{column} {op} {value:g}")
+    if plan["tiers"]:
+        mask &= df["LoyaltyTier"].isin(plan["tiers"]).to_numpy()
+        described.append(f"LoyaltyTier in {'/'.join(plan['tiers'])}")
+    if plan["exclusive"] is not None:
+        mask &= df["ExclusivityFlag"].to_numpy() == plan["exclusive"]
+        described.append("exclusive" if plan["exclusive"] else "non-exclusive")
+    return (df if mask.all() else df[mask]), described
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else round(float(value), 4)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def run_plan(df: pd.DataFrame, plan: Dict[str, Any], columns: Sequence[str]) -> Dict[str, Any]:
+    """Execute a parse_query plan over a scored frame; the result is JSON-ready."""
+    matched, described = _apply_filters(df, plan)
+    where = f" where {', '.join(described)}" if described else ""
+    result: Dict[str, Any] = {"operation": plan["operation"], "filters": described, "matched": len(matched)}
+
+    if plan["operation"] == "aggregate":
+        column, aggregate = plan["column"], plan["aggregate"]
+        label = f"{aggregate} of {column}" if column else "count"
+        if plan["group_by"]:
+            grouped = matched.groupby(plan["group_by"])
+            values = grouped.size() if column is None else grouped[column].agg(aggregate)
+            counts = grouped.size()
+            result["groups"] = [
+                {plan["group_by"]: key, "value": _json_value(values[key]), "count": int(counts[key])}
+                for key in values.index
+            ]
+            result["answer"] = f"{label} by {plan['group_by']}{where}"
+        else:
+            value = len(matched) if column is None else matched[column].agg(aggregate)
+            result["value"] = _json_value(value)
+            result["answer"] = f"{label}{where}: {result['value']}"
+        result.update(aggregate=aggregate, column=column)
+        return result
+
+    if plan["operation"] == "rank":
+        rows = select_top_k(matched, [plan["column"]], [plan["ascending"]], min(plan["limit"], QUERY_ENGINE_MAX_ROWS))
+        order = "lowest" if plan["ascending"] else "highest"
+        result["answer"] = f"{len(rows)} with the {order} {plan['column']}{where}"
+        result.update(column=plan["column"], ascending=plan["ascending"])
+    else:
+        rows = select_top_k(matched, ["TrustScore"], [False], QUERY_ENGINE_MAX_ROWS)
+        result["answer"] = f"{len(matched)} match{where}" + (
+            f" (showing {len(rows)} by TrustScore)" if len(rows) < len(matched) else ""
+        )
+    result["rows"] = [
+        {column: _json_value(value) for column, value in zip(columns, row)}
+        for row in rows[list(columns)].itertuples(index=False, name=None)
+    ]
+    return result
+
+
+class QueryEngine:
+    """
+    Answers common /ai-query shapes exactly from the scored frames, in
+    milliseconds, and counts how many queries still need the LLM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "local": 0, "ai": 0}
+
+    def answer(self, df: pd.DataFrame, query: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Local result for ``query``, or None when it is open-ended."""
+        plan = parse_query(query, columns)
+        result = run_plan(df, plan, columns) if plan is not None else None
+        with self._lock:
+            self._counters["queries"] += 1
+            self._counters["local" if result is not None else "ai"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "localRate": round(counters["local"] / counters["queries"], 4) if counters["queries"] else 0.0,
+        }
+
+
+# Shared by the /ai-query router
+query_engine = QueryEngine()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .db import get_connection, get_data_version
+from .single_flight import SingleFlight
+
+load_dotenv()
+
+# ------------------------------
+# Settings
+# ------------------------------
+# Rendered responses kept per data version (endpoint x parameters)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for GET)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class ResponseCache:
+    """
+    In-memory cache of rendered JSON responses for read endpoints whose output
+    depends only on their parameters and the app.db data version.
+
+    Entries are keyed by endpoint, parameters and data version, so ingest
+    invalidates them without any explicit purge: the first request after a
+    version bump rebuilds (once, however many requests arrive together) and
+    entries of older versions are dropped. The body is serialized once per
+    version and its hash is the ETag; a matching If-None-Match gets an empty 304.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._builds = SingleFlight()
+        self._counters = {"hits": 0, "misses": 0, "notModified": 0, "evictions": 0}
+
+    @staticmethod
+    def _render(builder: Callable[[], Any]) -> Tuple[bytes, str]:
+        # Same encoding as FastAPI's JSONResponse
+        body = json.dumps(
+            jsonable_encoder(builder()), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def _store(self, key: Tuple, version: int, entry: Tuple[bytes, str]) -> None:
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return  # built from data that has since changed
+            if version != self._version:
+                self._counters["evictions"] += len(self._entries)
+                self._entries.clear()
+                self._version = version
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def respond(
+        self,
+        request: Request,
+        endpoint: str,
+        params: Dict[str, Any],
+        builder: Callable[[], Any]
+    ) -> Response:
+        """
+        The cached response for ``endpoint`` with ``params`` at the current
+        data version, building it with ``builder()`` on a miss.
+        """
+        with get_connection() as conn:
+            version = get_data_version(conn)
+        key = (endpoint, tuple(sorted(params.items())), version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+        if entry is None:
+            entry, shared = self._builds.do(repr(key), lambda: self._render(builder))
+            with self._lock:
+                self._counters["hits" if shared else "misses"] += 1
+            if not shared:
+                self._store(key, version, entry)
+
+        body, etag = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            with self._lock:
+                self._counters["notModified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            entries = len(self._entries)
+            version = self._version
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "maxEntries": self.max_entries,
+            "entries": entries,
+            "dataVersion": version,
+            **counters,
+            "hitRate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by the dashboard endpoints
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES)
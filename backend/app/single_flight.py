@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.leaders = 0
+        self.shared = 0
+        self.in_flight = 0
+
+    def record(self, leader: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if leader:
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "inFlight": self.in_flight,
+            }
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight(_Stats):
+    """
+    Coalesces concurrent identical work across threads.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait and receive the same result or
+    exception. The key is forgotten as soon as the call finishes, so this
+    deduplicates bursts only; caching is left to the caller.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True for callers that waited on a leader."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.in_flight += 1
+        self.record(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self.in_flight -= 1
+            call.done.set()
+        return call.result, False
+
+
+class AsyncSingleFlight(_Stats):
+    """
+    SingleFlight for coroutines on one event loop. The leader's coroutine runs
+    as its own task, and every caller awaits it shielded, so a caller that is
+    cancelled (e.g. client disconnect) does not cancel the others.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            with self._lock:
+                self.in_flight += 1
+
+            def forget(_):
+                self._tasks.pop(key, None)
+                with self._lock:
+                    self.in_flight -= 1
+
+            task.add_done_callback(forget)
+        self.record(leader)
+        return await asyncio.shield(task), not leader
+
+
+# Shared by call_ai / acall_ai, keyed like the AI response cache
+ai_single_flight = SingleFlight()
+ai_async_single_flight = AsyncSingleFlight()
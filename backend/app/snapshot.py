@@ -0,0 +1,150 @@
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence
+
+import pandas as pd
+
+from .columnar_store import columnar_store
+from .db import DB_PATH, MERCHANTS_CSV, get_connection, get_data_version
+
+
+class DataSnapshot:
+    """
+    Process-wide, versioned in-memory copy of a dataset.
+
+    The data is loaded once and shared by every request. Each access checks a
+    cheap ``signature`` of the source (file mtime/size, or the database data
+    version) and reloads only when it changed, bumping ``version``. Frames
+    derived from the data (aggregations, records) are memoized per version
+    through ``derived``.
+
+    Returned frames are shared between requests: treat them as read-only and
+    copy before mutating.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        loader: Callable[[], pd.DataFrame],
+        signature: Callable[[], Hashable],
+    ):
+        self.name = name
+        self.source = source
+        self._loader = loader
+        self._current_signature = signature
+        self._lock = threading.RLock()
+        self._frame: Optional[pd.DataFrame] = None
+        self._signature: Optional[Hashable] = None
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._derived: Dict[str, Any] = {}
+
+    def _load(self, signature: Hashable) -> None:
+        self._frame = self._loader()
+        self._signature = signature
+        self._version += 1
+        self._loaded_at = time.time()
+        self._derived = {}
+
+    def _ensure_fresh(self) -> None:
+        signature = self._current_signature()
+        if self._frame is not None and signature == self._signature:
+            return
+        with self._lock:
+            if self._frame is None or signature != self._signature:
+                self._load(signature)
+
+    def frame(self) -> pd.DataFrame:
+        """Return the current data, reloading it first if the source changed."""
+        self._ensure_fresh()
+        return self._frame
+
+    def derived(self, key: str, builder: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        Return ``builder(frame)`` computed once per snapshot version.
+        Use it for aggregations that would otherwise be redone per request.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = builder(self._frame)
+            return self._derived[key]
+
+    def reload(self) -> Dict[str, Any]:
+        """Force a reload regardless of the source signature."""
+        with self._lock:
+            self._load(self._current_signature())
+        return self.info()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def info(self) -> Dict[str, Any]:
+        loaded_at = self._loaded_at
+        return {
+            "name": self.name,
+            "source": self.source,
+            "version": self._version,
+            "rows": None if self._frame is None else int(len(self._frame)),
+            "loadedAt": (
+                datetime.fromtimestamp(loaded_at, tz=timezone.utc).isoformat()
+                if loaded_at else None
+            ),
+            "ageSeconds": round(time.time() - loaded_at, 3) if loaded_at else None,
+        }
+
+
+def csv_snapshot(name: str, path: Path) -> DataSnapshot:
+    """Snapshot of a CSV file, reloaded when its mtime or size changes."""
+    def signature():
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    return DataSnapshot(name, str(path), lambda: pd.read_csv(path), signature)
+
+
+def table_snapshot(name: str, table: str) -> DataSnapshot:
+    """Snapshot of a table in app.db, reloaded when ingest bumps the data version."""
+    def signature():
+        with get_connection() as conn:
+            return get_data_version(conn)
+
+    def loader():
+        with get_connection() as conn:
+            return pd.read_sql_query(f"SELECT * FROM {table}", conn)
+
+    return DataSnapshot(name, f"{DB_PATH}:{table}", loader, signature)
+
+
+def payments_columns_snapshot(name: str, columns: Sequence[str]) -> DataSnapshot:
+    """
+    Snapshot of selected payment columns, reloaded when ingest bumps the data
+    version. Read from the columnar store's Parquet files when it is enabled,
+    otherwise from app.db.
+    """
+    def signature():
+        with get_connection() as conn:
+            return get_data_version(conn)
+
+    source = str(columnar_store.path) if columnar_store.enabled else f"{DB_PATH}:payments"
+    return DataSnapshot(name, source, lambda: columnar_store.read_payments(columns), signature)
+
+
+# Columns read by prepare_customer_metrics, the only consumer of the payments frame
+CUSTOMER_PAYMENT_COLUMNS = [
+    "CustomerID", "CustomerName", "PaymentAmount", "PaymentStatus", "DisputeFlag", "DefaultFlag",
+]
+
+# Payments can be ingested at runtime, so they are read from app.db (or its
+# columnar copy); merchant profiles only change with the CSV.
+payments_snapshot = payments_columns_snapshot("payments", CUSTOMER_PAYMENT_COLUMNS)
+merchants_snapshot = csv_snapshot("merchants", MERCHANTS_CSV)
+
+SNAPSHOTS = {
+    payments_snapshot.name: payments_snapshot,
+    merchants_snapshot.name: merchants_snapshot,
+}
@@ -1,10 +1,20 @@
 import os
+import asyncio
+import base64
 import math
 import json
-from typing import List, Dict, Union, Any
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Union, Any, Sequence, Callable, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
 import logging
+import sqlite3
+import openai
+
+from .ai_cache import AICache, ai_cache
+from .ai_client import sync_client, achat
+from .single_flight import ai_single_flight, ai_async_single_flight
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +22,13 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Shared pooled clients live in ai_client.py
+client = sync_client
+
+AI_MODEL = "gpt-4o-mini"
+DEFAULT_AI_SYSTEM = "You are a helpful financial assistant."
+# Tasks whose answer depends only on the entity profile, so it is cached by content
+CACHED_AI_TASKS = ("summary", "recommendations")
 
 # ------------------------------
 # Centralized AI Call (Summary & Recommendations only)
@@ -22,13 +38,101 @@ def call_ai(
     entity_type: str,
     data: Dict,
     default_response: Union[str, List[Dict], Dict] = None,
-    system: str = "You are a helpful financial assistant."
+    system: str = DEFAULT_AI_SYSTEM
 ) -> Any:
     """
     Unified AI wrapper for summaries, recommendations, classification, and analysis.
     Ensures AI outputs readable data (JSON, HTML, or plain text) depending on the task.
+    Summaries and recommendations are served from ai_cache when the same
+    profile was answered before; fallback responses are never cached.
+    Concurrent identical calls are coalesced into one upstream request.
+    """
+    key = AICache.make_key(task, entity_type, data, AI_MODEL, system)
+    hit, cached = _cache_lookup(key, task, entity_type)
+    if hit:
+        return cached
+
+    def request():
+        result = _request_ai(task, entity_type, data, default_response, system)
+        _cache_store(key, task, result, default_response)
+        return result
+
+    # Identical concurrent calls share one upstream request and its result
+    result, shared = ai_single_flight.do(key, request)
+    if shared:
+        logger.info(f"call_ai joined an in-flight request for task='{task}', entity_type='{entity_type}'")
+    return result
+
+
+async def acall_ai(
+    task: str,
+    entity_type: str,
+    data: Dict,
+    default_response: Union[str, List[Dict], Dict] = None,
+    system: str = DEFAULT_AI_SYSTEM
+) -> Any:
+    """
+    Async call_ai: same prompts, parsing, cache and fallbacks, but the model
+    call runs on the shared AsyncOpenAI client (see ai_client.py) instead of
+    pinning a threadpool worker for the whole round trip.
     """
+    key = AICache.make_key(task, entity_type, data, AI_MODEL, system)
+    # The disk tier is SQLite: keep its reads and writes off the event loop
+    hit, cached = await asyncio.to_thread(_cache_lookup, key, task, entity_type)
+    if hit:
+        return cached
+
+    async def request():
+        prompt = _start_ai_request(task, entity_type, data, system)
+        if prompt is None:
+            return default_response
+        try:
+            content = await achat(
+                [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+                model=AI_MODEL,
+                max_tokens=1000,
+                temperature=0.5,
+            )
+            result = _parse_ai_response(task, content, default_response)
+        except Exception as e:
+            logger.error(f"Exception calling AI: {e}. Returning default response.")
+            return default_response
+        await asyncio.to_thread(_cache_store, key, task, result, default_response)
+        return result
+
+    # Identical concurrent calls share one upstream request and its result
+    result, shared = await ai_async_single_flight.do(key, request)
+    if shared:
+        logger.info(f"acall_ai joined an in-flight request for task='{task}', entity_type='{entity_type}'")
+    return result
+
+
+def _cache_lookup(key: str, task: str, entity_type: str) -> Tuple[bool, Any]:
+    """Return ``(hit, value)`` from ai_cache; always a miss for uncached tasks."""
+    if ai_cache is None or task not in CACHED_AI_TASKS:
+        return False, None
+    try:
+        hit, cached = ai_cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"AI cache lookup failed: {e}")
+        return False, None
+    if hit:
+        logger.info(f"call_ai cache hit for task='{task}', entity_type='{entity_type}'")
+    return hit, cached
+
+
+def _cache_store(key: str, task: str, result: Any, default_response: Any) -> None:
+    # Only genuine AI answers are cached, never the fallback
+    if ai_cache is None or task not in CACHED_AI_TASKS or not result or result is default_response:
+        return
+    try:
+        ai_cache.set(key, result)
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        logger.warning(f"AI cache store failed: {e}")
 
+
+def _start_ai_request(task: str, entity_type: str, data: Dict, system: str) -> Optional[str]:
+    """Log the request and build its prompt; None means answer with the default."""
     logger.info(f"call_ai invoked with task='{task}', entity_type='{entity_type}'")
     try:
         logger.info(f"Input data: {json.dumps(data, indent=2)}")
@@ -37,8 +141,18 @@ def call_ai(
 
     if not client.api_key:
         logger.warning("OpenAI API key not set. Returning default response.")
-        return default_response
+        return None
+
+    prompt = _build_ai_prompt(task, entity_type, data, system)
+    if prompt is None:
+        logger.warning(f"Unknown task '{task}'. Returning default response.")
+        return None
+
+    logger.info(f"Prompt sent to AI:\n{prompt}")
+    return prompt
+
 
+def _build_ai_prompt(task: str, entity_type: str, data: Dict, system: str) -> Optional[str]:
     # -----------------------------
     # Build prompt based on task
     # -----------------------------
@@ -83,25 +197,68 @@ Query:
 Query:
 {data.get("query", "")}
 
-Data (sample or capped records):
-{data.get("records", [])}
+Data (population statistics and a CSV sample of the most relevant rows):
+{data.get("context", "")}
 
 ⚠️ IMPORTANT:
 - Respond with STRICT VALID JSON only.
 - Do NOT include markdown, explanations, or extra text.
 """
     else:
-        logger.warning(f"Unknown task '{task}'. Returning default response.")
-        return default_response
+        return None
+    return prompt
 
-    logger.info(f"Prompt sent to AI:\n{prompt}")
+
+def _parse_ai_response(task: str, content: str, default_response: Any) -> Any:
+    content = content.strip()
+    logger.info(f"Raw AI response: {content}")
+
+    # -----------------------------
+    # Parse response based on task
+    # -----------------------------
+    if task in ("recommendations", "analysis"):
+        # Strip markdown/code fences
+        content = content.strip("` \n")
+        # Attempt to fix common JSON issues
+        try:
+            parsed = json.loads(content)
+            return parsed if parsed else default_response
+        except json.JSONDecodeError:
+            # Try a simple fix: remove trailing commas
+            import re
+            repaired = re.sub(r",\s*([\]}])", r"\1", content)
+            try:
+                parsed = json.loads(repaired)
+                return parsed if parsed else default_response
+            except Exception:
+                logger.error("Failed to parse AI JSON. Returning default response.")
+                return default_response
+
+    elif task == "classification":
+        return content.lower().strip()
+
+    else:  # summary or free text (could be HTML)
+        return content
+
+
+def _request_ai(
+    task: str,
+    entity_type: str,
+    data: Dict,
+    default_response: Union[str, List[Dict], Dict],
+    system: str
+) -> Any:
+    """Build the prompt for ``task``, send it to the model and parse the reply."""
+    prompt = _start_ai_request(task, entity_type, data, system)
+    if prompt is None:
+        return default_response
 
     # -----------------------------
     # Send to AI
     # -----------------------------
     try:
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=AI_MODEL,
             messages=[
                 {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
@@ -109,35 +266,7 @@ Data (sample or capped records):
             max_tokens=1000,
             temperature=0.5,
         )
-        content = response.choices[0].message.content.strip()
-        logger.info(f"Raw AI response: {content}")
-
-        # -----------------------------
-        # Parse response based on task
-        # -----------------------------
-        if task in ("recommendations", "analysis"):
-            # Strip markdown/code fences
-            content = content.strip("` \n")
-            # Attempt to fix common JSON issues
-            try:
-                parsed = json.loads(content)
-                return parsed if parsed else default_response
-            except json.JSONDecodeError:
-                # Try a simple fix: remove trailing commas
-                import re
-                repaired = re.sub(r",\s*([\]}])", r"\1", content)
-                try:
-                    parsed = json.loads(repaired)
-                    return parsed if parsed else default_response
-                except Exception:
-                    logger.error("Failed to parse AI JSON. Returning default response.")
-                    return default_response
-
-        elif task == "classification":
-            return content.lower().strip()
-
-        else:  # summary or free text (could be HTML)
-            return content
+        return _parse_ai_response(task, response.choices[0].message.content, default_response)
 
     except Exception as e:
         logger.error(f"Exception calling AI: {e}. Returning default response.")
@@ -170,6 +299,32 @@ def calculate_customer_trust_score(
     return round(score, 2)
 
 
+def calculate_customer_trust_scores(
+    repayment_rate,
+    dispute_count,
+    default_rate
+) -> np.ndarray:
+    """
+    Vectorized calculate_customer_trust_score over array-likes (e.g. DataFrame columns).
+    Bit-for-bit equal to the scalar function; see calculate_merchant_trust_scores.
+    """
+    repayment_rate = np.asarray(repayment_rate, dtype=float)
+    dispute_count = np.asarray(dispute_count, dtype=float)
+    default_rate = np.asarray(default_rate, dtype=float)
+
+    normalized_dispute = np.minimum(dispute_count / 10, 1)
+    score = (repayment_rate * 0.5 +
+             (1 - default_rate) * 0.3 +
+             (1 - normalized_dispute) * 0.2) * 100
+    scores = np.round(score, 2)
+
+    for i in np.flatnonzero(_near_rounding_tie(score, 2)):
+        scores[i] = calculate_customer_trust_score(
+            repayment_rate[i].item(), dispute_count[i].item(), default_rate[i].item()
+        )
+    return scores
+
+
 # ------------------------------
 # Merchant Trust & Loyalty (Formula only)
 # ------------------------------
@@ -221,6 +376,65 @@ def calculate_merchant_trust_score(
     return round(min(score, 100), 2)
 
 
+def calculate_merchant_trust_scores(
+    repayment_rate,
+    dispute_rate,
+    default_rate,
+    transaction_volume,
+    engagement_score,
+    compliance_score,
+    responsiveness_score,
+    exclusivity_flag
+) -> np.ndarray:
+    """
+    Vectorized calculate_merchant_trust_score over array-likes (e.g. DataFrame columns).
+    Results are bit-for-bit equal to the scalar function: the arithmetic runs in
+    the same order, and the few rows whose score sits on a rounding boundary
+    (where NumPy's log10 may differ from math.log by an ulp) are recomputed
+    with the scalar function.
+    """
+    repayment_rate = np.asarray(repayment_rate, dtype=float)
+    dispute_rate = np.asarray(dispute_rate, dtype=float)
+    default_rate = np.asarray(default_rate, dtype=float)
+    transaction_volume = np.asarray(transaction_volume, dtype=float)
+    engagement_score = np.asarray(engagement_score, dtype=float)
+    compliance_score = np.asarray(compliance_score, dtype=float)
+    responsiveness_score = np.asarray(responsiveness_score, dtype=float)
+    exclusivity_flag = np.broadcast_to(np.asarray(exclusivity_flag), repayment_rate.shape)
+
+    score = (
+        repayment_rate * 0.3 +
+        (1 - default_rate) * 0.2 +
+        (1 - dispute_rate) * 0.1 +
+        engagement_score * 0.15 +
+        compliance_score * 0.15 +
+        responsiveness_score * 0.1
+    ) * 100
+
+    score = np.where(exclusivity_flag == 1, score + 5, score)
+    high_volume = transaction_volume > 1000
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_bonus = np.minimum(np.log(transaction_volume) / np.log(10), 5)
+    score = np.where(high_volume, score + volume_bonus, score)
+    score = np.minimum(score, 100)
+    scores = np.round(score, 2)
+
+    for i in np.flatnonzero(_near_rounding_tie(score, 2)):
+        scores[i] = calculate_merchant_trust_score(
+            repayment_rate[i].item(), dispute_rate[i].item(), default_rate[i].item(),
+            transaction_volume[i].item(), engagement_score[i].item(),
+            compliance_score[i].item(), responsiveness_score[i].item(),
+            exclusivity_flag[i].item()
+        )
+    return scores
+
+
+def _near_rounding_tie(values: np.ndarray, decimals: int) -> np.ndarray:
+    """Mask of values within float noise of a half-unit at the given decimals."""
+    scaled = np.abs(values) * 10 ** decimals
+    return np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+
+
 # ------------------------------
 # Loyalty Tier Assignment
 # ------------------------------
@@ -235,6 +449,129 @@ def assign_loyalty_tier(trust_score: float) -> str:
         return "Bronze"
 
 
+LOYALTY_TIERS_ASCENDING = np.array(["Bronze", "Silver", "Gold", "Platinum"], dtype=object)
+
+
+def assign_loyalty_tiers(trust_scores) -> np.ndarray:
+    """Vectorized assign_loyalty_tier; returns an object array of tier names."""
+    trust_scores = np.asarray(trust_scores, dtype=float)
+    tier_index = (
+        (trust_scores >= 80).astype(np.int8) +
+        (trust_scores >= 90) +
+        (trust_scores >= 95)
+    )
+    return LOYALTY_TIERS_ASCENDING[tier_index]
+
+
+# ------------------------------
+# Top-K Selection
+# ------------------------------
+def select_top_k(
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    ascending: Sequence[bool],
+    k: int
+) -> pd.DataFrame:
+    """
+    Same rows and order as ``df.sort_values(columns, ascending=ascending, kind="stable").head(k)``,
+    without sorting the whole frame: partial selection (O(n) per sort column)
+    narrows the frame to the k winning rows, and only those k rows are sorted.
+    NaNs sort last, as in pandas.
+    """
+    if k <= 0:
+        return df.iloc[:0]
+    keys = []
+    for column, asc in zip(columns, ascending):
+        values = df[column].to_numpy(dtype=float)
+        keys.append(np.where(np.isnan(values), np.inf, values if asc else -values))
+
+    chosen = _top_k_positions(keys, np.arange(len(df)), k)
+    # lexsort sorts by the last key first; position makes ties stable
+    order = np.lexsort([chosen] + [key[chosen] for key in reversed(keys)])
+    return df.iloc[chosen[order]]
+
+
+def _top_k_positions(keys: List[np.ndarray], positions: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k smallest rows by (keys..., position), in no particular order."""
+    if len(positions) <= k:
+        return positions
+    lead = keys[0][positions]
+    kth = np.partition(lead, k - 1)[k - 1]
+    better = positions[lead < kth]
+    tied = positions[lead == kth]
+    need = k - len(better)
+    if len(keys) == 1:
+        return np.concatenate([better, tied[:need]])
+    return np.concatenate([better, _top_k_positions(keys[1:], tied, need)])
+
+
+# ------------------------------
+# Keyset (Cursor) Pagination
+# ------------------------------
+def encode_cursor(sort_key: str, values: Sequence[Any]) -> str:
+    """Opaque cursor holding the sort key values of the last row of a page."""
+    payload = json.dumps({"sort": sort_key, "after": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str) -> List[Any]:
+    """
+    Values stored by ``encode_cursor``. Raises ValueError if the cursor is
+    malformed, holds non-scalar values or was issued for a different sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["after"]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if payload.get("sort") != sort_key or not isinstance(values, list):
+        raise ValueError("Cursor does not match the requested sort order")
+    if any(isinstance(value, bool) or not isinstance(value, (int, float, str, type(None))) for value in values):
+        raise ValueError("Cursor values must be numbers or strings")
+    return values
+
+
+def build_keyset_index(
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    ascending: Sequence[bool],
+    id_column: str
+) -> Dict[str, Any]:
+    """
+    Sorted view of ``df`` by (columns..., id_column ascending) for keyset paging.
+    Build it once per data version; each page is then a binary search plus a
+    slice. Keys are stored ascending (descending columns negated, NaN last).
+    """
+    keys = []
+    for column, asc in zip(columns, ascending):
+        values = df[column].to_numpy(dtype=float)
+        keys.append(np.where(np.isnan(values), np.inf, values if asc else -values))
+    keys.append(df[id_column].astype(str).to_numpy(dtype=object))
+
+    order = np.lexsort(list(reversed(keys)))
+    return {
+        "order": order,
+        "keys": [key[order] for key in keys],
+        "ascending": list(ascending),
+    }
+
+
+def keyset_start(index: Dict[str, Any], after: Sequence[Any]) -> int:
+    """Position in the sorted view of the first row strictly after the ``after`` key."""
+    lo, hi = 0, len(index["order"])
+    *values, last_id = after
+    for key, value, asc in zip(index["keys"], values, index["ascending"]):
+        value = np.nan if value is None else float(value)
+        value = np.inf if np.isnan(value) else (value if asc else -value)
+        segment = key[lo:hi]
+        lo, hi = (
+            lo + int(np.searchsorted(segment, value, side="left")),
+            lo + int(np.searchsorted(segment, value, side="right")),
+        )
+    return lo + int(np.searchsorted(index["keys"][-1][lo:hi], str(last_id), side="right"))
+
+
 # ------------------------------
 # Risk Score Assignment
 # ------------------------------
@@ -254,45 +591,175 @@ def assign_risk_score(
 # ------------------------------
 # Summary Generation (AI + fallback)
 # ------------------------------
-def generate_summary(entity_type: str, data: Dict) -> str:
+def default_summary(data: Dict) -> str:
     name = data.get("CustomerName") or data.get("MerchantName") or "Entity"
-    default_response = f"{name} has a TrustScore of {data.get('TrustScore', 'N/A')} and is in the {data.get('LoyaltyTier', 'N/A')} tier."
+    return f"{name} has a TrustScore of {data.get('TrustScore', 'N/A')} and is in the {data.get('LoyaltyTier', 'N/A')} tier."
+
 
+def generate_summary(entity_type: str, data: Dict) -> str:
     return call_ai(
         task="summary",
         entity_type=entity_type,
         data=data,
-        default_response=default_response
+        default_response=default_summary(data)
     )
 
 
 # ------------------------------
-# Customer Recommendations (AI + fallback)
+# Batched Summary Generation (AI + per-entity fallback)
 # ------------------------------
-def generate_customer_recommendations(customer_data: Dict) -> List[Dict]:
-    def default_recommendations():
-        recs = []
-        if customer_data.get("TrustScore", 0) < 80:
-            recs.append({
-                "title": "Improve Repayments",
-                "description": "Focus on timely repayments to improve your TrustScore."
-            })
+# Output budget per summary (2-3 sentences plus its JSON key)
+BATCH_SUMMARY_TOKENS_PER_ENTITY = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+def summary_cache_key(entity_type: str, data: Dict) -> str:
+    """The ai_cache key generate_summary uses for this profile."""
+    return AICache.make_key("summary", entity_type, data, AI_MODEL, DEFAULT_AI_SYSTEM)
+
+
+def generate_summaries_batch(
+    entity_type: str,
+    profiles: Dict[str, Dict],
+    max_prompt_tokens: int = 6000,
+    max_output_tokens: int = 4000,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Summaries for many profiles ({entity ID: profile}) in few LLM calls.
+
+    Profiles are packed into prompts that fit ``max_prompt_tokens`` and whose
+    answers fit ``max_output_tokens``; the model returns a JSON object keyed by
+    ID. A batch that is too long for the model or comes back truncated is split
+    in half and retried. Any entity without a usable answer gets the
+    generate_summary fallback. AI answers are stored in ai_cache under the
+    same keys generate_summary uses, so detail pages then hit the cache.
+    Already cached profiles are skipped unless ``force``.
+    """
+    summaries: Dict[str, str] = {}
+    stats = {"entities": len(profiles), "cached": 0, "generated": 0, "fallback": 0, "calls": 0}
+
+    pending = []
+    for entity_id, data in profiles.items():
+        if not force:
+            hit, cached = _cache_lookup(summary_cache_key(entity_type, data), "summary", entity_type)
+            if hit:
+                summaries[entity_id] = cached
+                stats["cached"] += 1
+                continue
+        pending.append((entity_id, data))
+
+    prompt_overhead = estimate_tokens(_batch_summary_prompt(entity_type, {}))
+    max_entities = max(max_output_tokens // BATCH_SUMMARY_TOKENS_PER_ENTITY, 1)
+    batch, batch_tokens = [], prompt_overhead
+    for entity_id, data in pending:
+        tokens = estimate_tokens(json.dumps({entity_id: data}, default=str))
+        if batch and (batch_tokens + tokens > max_prompt_tokens or len(batch) >= max_entities):
+            _summarize_batch(entity_type, batch, summaries, stats)
+            batch, batch_tokens = [], prompt_overhead
+        batch.append((entity_id, data))
+        batch_tokens += tokens
+    if batch:
+        _summarize_batch(entity_type, batch, summaries, stats)
+
+    return {"summaries": summaries, "stats": stats}
+
+
+def _batch_summary_prompt(entity_type: str, profiles: Dict[str, Dict]) -> str:
+    return f"""
+Summarize each of the following {entity_type} profiles in 2-3 sentences for business reporting.
+
+⚠️ IMPORTANT:
+- Return ONLY a JSON object mapping each profile ID to its summary string.
+- Include every ID exactly once.
+- Do NOT include markdown code fences or extra explanation.
+
+Profiles (by ID):
+{json.dumps(profiles, default=str)}
+"""
+
+
+def _summarize_batch(
+    entity_type: str,
+    batch: List[Tuple[str, Dict]],
+    summaries: Dict[str, str],
+    stats: Dict[str, int]
+) -> None:
+    answers: Dict[str, Any] = {}
+    if client.api_key:
+        prompt = _batch_summary_prompt(entity_type, dict(batch))
+        try:
+            stats["calls"] += 1
+            response = client.chat.completions.create(
+                model=AI_MODEL,
+                messages=[
+                    {"role": "system", "content": DEFAULT_AI_SYSTEM},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=BATCH_SUMMARY_TOKENS_PER_ENTITY * len(batch),
+                temperature=0.5,
+            )
+            choice = response.choices[0]
+            if choice.finish_reason == "length":
+                raise ValueError("batch answer was truncated")
+            answers = json.loads(choice.message.content.strip().strip("`").removeprefix("json").strip())
+            if not isinstance(answers, dict):
+                raise ValueError("batch answer is not a JSON object")
+        except (openai.BadRequestError, ValueError) as e:
+            # Too long for the model or unusable answer: retry as two smaller batches
+            if len(batch) > 1:
+                logger.warning(f"Batch of {len(batch)} {entity_type} summaries failed ({e}); splitting.")
+                middle = len(batch) // 2
+                _summarize_batch(entity_type, batch[:middle], summaries, stats)
+                _summarize_batch(entity_type, batch[middle:], summaries, stats)
+                return
+            logger.error(f"Summary for {batch[0][0]} failed: {e}. Using fallback.")
+        except Exception as e:
+            logger.error(f"Exception calling AI for {len(batch)} summaries: {e}. Using fallbacks.")
+
+    for entity_id, data in batch:
+        summary = answers.get(entity_id)
+        if isinstance(summary, str) and summary.strip():
+            summaries[entity_id] = summary.strip()
+            stats["generated"] += 1
+            _cache_store(summary_cache_key(entity_type, data), "summary", summaries[entity_id], None)
         else:
-            recs.append({
-                "title": "Premium Offers",
-                "description": "Eligible for higher loan limits and premium offers."
-            })
-        if customer_data.get("DisputeCount", 0) > 0:
-            recs.append({
-                "title": "Reduce Disputes",
-                "description": "Reduce disputes for smoother transactions."
-            })
+            summaries[entity_id] = default_summary(data)
+            stats["fallback"] += 1
+
+
+# ------------------------------
+# Customer Recommendations (AI + fallback)
+# ------------------------------
+def default_customer_recommendations(customer_data: Dict) -> List[Dict]:
+    recs = []
+    if customer_data.get("TrustScore", 0) < 80:
+        recs.append({
+            "title": "Improve Repayments",
+            "description": "Focus on timely repayments to improve your TrustScore."
+        })
+    else:
         recs.append({
-            "title": "Engage with Top Merchants",
-            "description": "Explore merchants with high engagement scores for rewards."
+            "title": "Premium Offers",
+            "description": "Eligible for higher loan limits and premium offers."
         })
-        return recs
+    if customer_data.get("DisputeCount", 0) > 0:
+        recs.append({
+            "title": "Reduce Disputes",
+            "description": "Reduce disputes for smoother transactions."
+        })
+    recs.append({
+        "title": "Engage with Top Merchants",
+        "description": "Explore merchants with high engagement scores for rewards."
+    })
+    return recs
+
 
+def generate_customer_recommendations(customer_data: Dict) -> List[Dict]:
     logger.info("Calling AI for customer recommendations...")
     logger.info(f"Customer input data: {json.dumps(customer_data, indent=2)}")
 
@@ -302,6 +769,12 @@ def generate_customer_recommendations(customer_data: Dict) -> List[Dict]:
         data=customer_data,
         default_response=None  # temporarily set None
     )
+    return _validate_customer_recommendations(customer_data, raw_recommendations)
+
+
+def _validate_customer_recommendations(customer_data: Dict, raw_recommendations: Any) -> List[Dict]:
+    def default_recommendations():
+        return default_customer_recommendations(customer_data)
 
     logger.info(f"AI raw output: {raw_recommendations}")
 
@@ -328,24 +801,25 @@ def generate_customer_recommendations(customer_data: Dict) -> List[Dict]:
 # ------------------------------
 # Merchant Recommendations (AI + fallback)
 # ------------------------------
-def generate_merchant_recommendations(merchant_data: Dict) -> List[Dict]:
-    def default_recommendations():
-        recs = []
-        if merchant_data.get("TrustScore", 0) < 80:
-            recs.append({
-                "title": "Improve TrustScore",
-                "description": "Improve repayment rate and reduce defaults to increase TrustScore."
-            })
+def default_merchant_recommendations(merchant_data: Dict) -> List[Dict]:
+    recs = []
+    if merchant_data.get("TrustScore", 0) < 80:
         recs.append({
-            "title": "Enhance Engagement",
-            "description": "Enhance engagement and responsiveness scores for better customer satisfaction."
+            "title": "Improve TrustScore",
+            "description": "Improve repayment rate and reduce defaults to increase TrustScore."
         })
-        recs.append({
-            "title": "Ensure Compliance",
-            "description": "Ensure compliance metrics are consistently met."
-        })
-        return recs
+    recs.append({
+        "title": "Enhance Engagement",
+        "description": "Enhance engagement and responsiveness scores for better customer satisfaction."
+    })
+    recs.append({
+        "title": "Ensure Compliance",
+        "description": "Ensure compliance metrics are consistently met."
+    })
+    return recs
+
 
+def generate_merchant_recommendations(merchant_data: Dict) -> List[Dict]:
     logger.info("Calling AI for merchant recommendations...")
     logger.info(f"Merchant input data: {json.dumps(merchant_data, indent=2)}")
 
@@ -353,8 +827,14 @@ def generate_merchant_recommendations(merchant_data: Dict) -> List[Dict]:
         task="recommendations",
         entity_type="merchant",
         data=merchant_data,
-        default_response=default_recommendations()
+        default_response=default_merchant_recommendations(merchant_data)
     )
+    return _validate_merchant_recommendations(merchant_data, raw_recommendations)
+
+
+def _validate_merchant_recommendations(merchant_data: Dict, raw_recommendations: Any) -> List[Dict]:
+    def default_recommendations():
+        return default_merchant_recommendations(merchant_data)
 
     logger.info(f"AI raw output: {raw_recommendations}")
 
@@ -380,3 +860,39 @@ def generate_merchant_recommendations(merchant_data: Dict) -> List[Dict]:
 
     logger.info(f"Returning {len(valid_recs)} recommendations.")
     return valid_recs
+
+
+# (generate, default) recommendation functions per entity type
+RECOMMENDERS: Dict[str, Tuple[Callable[[Dict], List[Dict]], Callable[[Dict], List[Dict]]]] = {
+    "customer": (generate_customer_recommendations, default_customer_recommendations),
+    "merchant": (generate_merchant_recommendations, default_merchant_recommendations),
+}
+
+
+# ------------------------------
+# Concurrent AI Tasks
+# ------------------------------
+# Bounded pool for blocking AI round trips (the enrichment worker's
+# recommendation calls): calls overlap, while in-flight model calls stay capped
+AI_MAX_WORKERS = int(os.getenv("AI_MAX_WORKERS", "8"))
+_ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="ai")
+
+
+def run_ai_tasks(
+    tasks: Dict[str, Callable[[], Any]],
+    fallbacks: Dict[str, Callable[[], Any]]
+) -> Dict[str, Any]:
+    """
+    Run independent AI tasks concurrently and return their results by name,
+    so latency is the slowest task rather than the sum. A task that raises
+    is replaced by its own fallback without affecting the others.
+    """
+    futures = {name: _ai_executor.submit(task) for name, task in tasks.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.error(f"AI task '{name}' failed: {e}. Using fallback.")
+            results[name] = fallbacks[name]()
+    return results
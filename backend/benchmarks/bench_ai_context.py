@@ -0,0 +1,127 @@
+"""
+bench_ai_context.py
+
+Compares the /ai-query analysis prompt built by app/ai_context.py with the
+previous one, by prompt size and build time, and optionally by model latency.
+
+- Legacy prompt: system prompt with an indented JSON preview of 5 records,
+  repeated in the user prompt, plus the first 200 records as Python dicts
+  (build time includes the indented JSON logging of the input data)
+- Compact prompt: population statistics plus a relevance-selected CSV sample
+  within AI_CONTEXT_TOKEN_BUDGET
+- Customer metrics are generated from synthetic payments
+- --live sends both prompts for each query to the configured model (needs
+  OPENAI_API_KEY) and reports round-trip time and answer tokens
+
+Usage (from backend/):
+    python -m benchmarks.bench_ai_context --customers 100000
+    python -m benchmarks.bench_ai_context --customers 1000 --live
+"""
+
+import argparse
+import json
+import time
+
+from app.ai_context import build_context, describe_frame
+from app.endpoints.customers_router import CUSTOMER_FULL_FIELDS_ORDER, prepare_customer_metrics
+from app.utils import AI_MODEL, _build_ai_prompt, client, estimate_tokens
+from benchmarks.bench_customer_metrics import make_payments
+
+QUERIES = [
+    "Which customers have the highest default rate?",
+    "Show me Gold tier customers with the best repayment",
+    "Which customers are at risk of churning?",
+    "Give me an overview of our customers",
+]
+SYSTEM = "You are a helpful financial data analyst."
+
+
+def legacy_prompt(query: str, records: list) -> tuple:
+    # call_ai logged its input data as indented JSON before building the prompt
+    json.dumps({"query": query, "records": records[:200]}, indent=2)
+    system = f"""
+{SYSTEM}
+
+User query: "{query}"
+
+Data sample (for reference):
+{json.dumps(records[:5], indent=2)}
+
+⚠️ IMPORTANT:
+- Respond with clean, structured, readable data.
+- Output can be JSON, HTML table, or text, depending on request.
+- Do NOT include markdown, explanations, or extra text outside output.
+"""
+    user = f"""
+{system}
+
+Query:
+{query}
+
+Data (sample or capped records):
+{records[:200]}
+
+⚠️ IMPORTANT:
+- Respond with STRICT VALID JSON only.
+- Do NOT include markdown, explanations, or extra text.
+"""
+    return system, user
+
+
+def compact_prompt(query: str, df, stats: str) -> tuple:
+    context = build_context(df, query, "CustomerID", CUSTOMER_FULL_FIELDS_ORDER, stats=stats, name_column="CustomerName")
+    json.dumps({"query": query, "context": context}, indent=2)
+    return SYSTEM, _build_ai_prompt("analysis", "customers", {"query": query, "context": context}, SYSTEM)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def ask(system: str, user: str) -> tuple:
+    start = time.perf_counter()
+    response = client.chat.completions.create(
+        model=AI_MODEL,
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+        max_tokens=1000,
+        temperature=0.5,
+    )
+    return time.perf_counter() - start, response.usage.prompt_tokens, response.usage.completion_tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--live", action="store_true", help="Also time both prompts against the model")
+    args = parser.parse_args()
+
+    df = prepare_customer_metrics(make_payments(args.customers * 20, args.seed))
+    records, records_secs = timed(lambda: df.to_dict(orient="records"))
+    stats, stats_secs = timed(describe_frame, df[CUSTOMER_FULL_FIELDS_ORDER], "CustomerID")
+    print(f"{len(df):,} customers; records {records_secs * 1000:.1f} ms, statistics {stats_secs * 1000:.1f} ms (both once per data version)")
+
+    print(f"{'':>8} {'legacy tok':>11} {'compact tok':>12} {'ratio':>6} {'legacy ms':>10} {'compact ms':>11}  query")
+    for query in QUERIES:
+        legacy, legacy_secs = timed(legacy_prompt, query, records)
+        compact, compact_secs = timed(compact_prompt, query, df, stats)
+        legacy_tokens = sum(estimate_tokens(part) for part in legacy)
+        compact_tokens = sum(estimate_tokens(part) for part in compact)
+        print(
+            f"{'build':>8} {legacy_tokens:>11,} {compact_tokens:>12,} {legacy_tokens / compact_tokens:>5.1f}x "
+            f"{legacy_secs * 1000:>10.1f} {compact_secs * 1000:>11.1f}  {query}"
+        )
+        if args.live:
+            legacy_rtt, legacy_in, legacy_out = ask(*legacy)
+            compact_rtt, compact_in, compact_out = ask(*compact)
+            print(
+                f"{'model':>8} {legacy_in:>11,} {compact_in:>12,} {legacy_in / compact_in:>5.1f}x "
+                f"{legacy_rtt * 1000:>10.0f} {compact_rtt * 1000:>11.0f}  "
+                f"(answer tokens {legacy_out} vs {compact_out})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+bench_columnar_store.py
+
+Compares reading payments from app.db (row-oriented SQLite) and from the
+Parquet columnar store in app/columnar_store.py, on a temporary database of
+synthetic payments, and checks both return the same rows.
+
+- Reads: the six columns prepare_customer_metrics uses (all months), the same
+  columns for one month (partition pruning), and every column
+- End to end: prepare_customer_metrics over each source
+- Sync: the initial export, and an incremental append after a small ingest
+- Requires pyarrow
+
+Usage (from backend/):
+    python -m benchmarks.bench_columnar_store --payments 1000000 --months 24
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.columnar_store import PAYMENT_COLUMNS, ColumnarPaymentStore, pa
+from app.db_pool import ConnectionPool
+from app.endpoints.customers_router import prepare_customer_metrics
+from app.snapshot import CUSTOMER_PAYMENT_COLUMNS
+from benchmarks.bench_customer_metrics import make_payments
+
+
+def make_dated_payments(n: int, months: int, seed: int, start: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = make_payments(n, seed)
+    month_starts = pd.date_range("2023-01-01", periods=months, freq="MS")
+    dates = month_starts[rng.integers(0, months, n)] + pd.to_timedelta(rng.integers(0, 28, n), unit="D")
+    merchant_idx = rng.integers(1, 201, n)
+    df.insert(0, "PaymentID", [f"P{start + i:09d}" for i in range(n)])
+    df.insert(3, "MerchantID", [f"M{i:04d}" for i in merchant_idx])
+    df.insert(4, "MerchantName", [f"Merchant {i}" for i in merchant_idx])
+    df.insert(5, "PaymentDate", dates.strftime("%Y-%m-%d"))
+    return df[PAYMENT_COLUMNS]
+
+
+def insert_payments(pool: ConnectionPool, df: pd.DataFrame) -> None:
+    with pool.connection() as conn:
+        conn.executemany(
+            f"INSERT INTO payments VALUES ({', '.join('?' * len(PAYMENT_COLUMNS))})",
+            zip(*(df[column].tolist() for column in PAYMENT_COLUMNS)),
+        )
+        conn.execute("UPDATE meta SET Value = Value + 1 WHERE Key = 'data_version'")
+
+
+def timed(fn, repeat: int):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def same_rows(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    key = list(a.columns)
+    a = a.sort_values(key, ignore_index=True)
+    b = b[key].sort_values(key, ignore_index=True)
+    return all(np.array_equal(a[column].to_numpy(object), b[column].to_numpy(object)) for column in key)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--payments", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Timing passes per read")
+    args = parser.parse_args()
+    if pa is None:
+        raise SystemExit("pyarrow is not installed")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp) / "bench.db")
+        with pool.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE payments (
+                    PaymentID TEXT PRIMARY KEY, CustomerID TEXT, CustomerName TEXT,
+                    MerchantID TEXT, MerchantName TEXT, PaymentDate TEXT, PaymentAmount REAL,
+                    PaymentStatus TEXT, DisputeFlag INTEGER, DefaultFlag INTEGER
+                )
+                """
+            )
+            conn.execute("CREATE TABLE meta (Key TEXT PRIMARY KEY, Value INTEGER)")
+            conn.execute("INSERT INTO meta VALUES ('data_version', 0)")
+        insert_payments(pool, make_dated_payments(args.payments, args.months, args.seed))
+
+        sqlite_store = ColumnarPaymentStore(Path(tmp) / "unused", False, pool.connection)
+        parquet_store = ColumnarPaymentStore(Path(tmp) / "parquet", True, pool.connection)
+
+        start = time.perf_counter()
+        stats = parquet_store.sync()
+        print(f"{args.payments:,} payments, {args.months} months")
+        print(f"export: {time.perf_counter() - start:.2f}s, {stats['files']} files, "
+              f"{stats['bytes'] / 1e6:.1f} MB Parquet vs {pool.path.stat().st_size / 1e6:.1f} MB app.db")
+
+        last_month = max(path.name.split("=")[1] for path in (Path(tmp) / "parquet").glob("Month=*"))
+        cases = [
+            ("customer columns, all months", CUSTOMER_PAYMENT_COLUMNS, None),
+            (f"customer columns, {last_month}", CUSTOMER_PAYMENT_COLUMNS, [last_month]),
+            ("all columns, all months", PAYMENT_COLUMNS, None),
+        ]
+        print(f"{'read':<32}{'sqlite':>10}{'parquet':>10}  same rows")
+        for label, columns, months in cases:
+            expected, sqlite_seconds = timed(lambda: sqlite_store.read_payments(columns, months), args.repeat)
+            actual, parquet_seconds = timed(lambda: parquet_store.read_payments(columns, months), args.repeat)
+            print(f"{label:<32}{sqlite_seconds:>9.3f}s{parquet_seconds:>9.3f}s  {same_rows(expected, actual)}")
+
+        _, sqlite_seconds = timed(lambda: prepare_customer_metrics(sqlite_store.read_payments(CUSTOMER_PAYMENT_COLUMNS)), 1)
+        _, parquet_seconds = timed(lambda: prepare_customer_metrics(parquet_store.read_payments(CUSTOMER_PAYMENT_COLUMNS)), 1)
+        print(f"{'read + prepare_customer_metrics':<32}{sqlite_seconds:>9.3f}s{parquet_seconds:>9.3f}s")
+
+        insert_payments(pool, make_dated_payments(1_000, args.months, args.seed + 1, start=args.payments))
+        start = time.perf_counter()
+        stats = parquet_store.sync()
+        print(f"append 1,000 ingested payments: {(time.perf_counter() - start) * 1000:.1f} ms, {stats['rows']:,} rows")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+bench_intent.py
+
+Measures the local /ai-query intent classifier in app/intent.py on a
+labeled set of queries: accuracy of local answers, how often it defers to
+the LLM, and time per query.
+
+- Labeled queries mix explicit entity words, IDs, metric-only wording
+  and deliberately ambiguous questions (labeled None)
+- A deferred query counts as correct when it is labeled ambiguous
+
+Usage (from backend/):
+    python -m benchmarks.bench_intent --repeat 10000
+"""
+
+import argparse
+import time
+
+from app.intent import INTENT_CONFIDENCE_THRESHOLD, INTENT_MIN_SCORE, IntentClassifier
+
+LABELED_QUERIES = [
+    ("Which customers have the highest default rate?", "customers"),
+    ("Top 10 consumers by TrustScore", "customers"),
+    ("Show borrowers with more than 2 disputes", "customers"),
+    ("How is C008 doing?", "customers"),
+    ("List clients in the Platinum tier", "customers"),
+    ("Which users are likely to miss loan installments?", "customers"),
+    ("Average repayment rate of our customers by tier", "customers"),
+    ("Customers with a dispute count above 3", "customers"),
+    ("Which merchants have the best compliance?", "merchants"),
+    ("Top sellers by transaction volume", "merchants"),
+    ("Compare M001 and M034", "merchants"),
+    ("Which vendors have low engagement scores?", "merchants"),
+    ("Show exclusive partners with tenure over 24 months", "merchants"),
+    ("Which stores are the most responsive?", "merchants"),
+    ("Merchant sectors with the highest dispute rate", "merchants"),
+    ("Rank retailers by TrustScore", "merchants"),
+    ("Give me an overview", None),
+    ("What is the average TrustScore?", None),
+    ("Who is in the Gold tier?", None),
+    ("Show the trend of payments", None),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10_000, help="Timing passes over the query set")
+    args = parser.parse_args()
+
+    classifier = IntentClassifier(INTENT_CONFIDENCE_THRESHOLD, INTENT_MIN_SCORE)
+    correct = 0
+    for query, expected in LABELED_QUERIES:
+        entity, confidence = classifier.classify(query)
+        ok = entity == expected
+        correct += ok
+        print(f"{'✅' if ok else '❌'} {str(entity):>9} ({confidence:.2f}) expected {str(expected):>9}  {query}")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for query, _ in LABELED_QUERIES:
+            classifier.classify(query)
+    per_query = (time.perf_counter() - start) / (args.repeat * len(LABELED_QUERIES))
+
+    stats = classifier.stats()
+    print(
+        f"{correct}/{len(LABELED_QUERIES)} correct, LLM fallback rate {stats['fallbackRate']:.1%}, "
+        f"{per_query * 1e6:.1f} µs per query"
+    )
+
+
+if __name__ == "__main__":
+    main()
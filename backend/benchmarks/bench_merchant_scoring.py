@@ -0,0 +1,90 @@
+"""
+bench_merchant_scoring.py
+
+Times the vectorized merchant trust scoring in app/utils.py against the
+scalar formula, row by row.
+
+- Synthetic merchants cover exclusivity, volumes around the 1000 threshold,
+  the log10 bonus cap and the 100 score cap
+- Bit-for-bit equality of the two is covered by test_merchant_scoring.py
+
+Usage (from backend/):
+    python -m benchmarks.bench_merchant_scoring --merchants 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils import (
+    calculate_merchant_trust_score,
+    calculate_merchant_trust_scores,
+    assign_loyalty_tiers,
+)
+
+
+def make_merchants(n: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "RepaymentRate": rng.uniform(0.5, 1.0, n).round(2),
+        "DisputeRate": rng.uniform(0.0, 0.2, n).round(2),
+        "DefaultRate": rng.uniform(0.0, 0.2, n).round(2),
+        "TransactionVolume": np.where(
+            rng.random(n) < 0.2, rng.integers(1, 1001, n), rng.integers(1001, 200_000, n)
+        ),
+        "EngagementScore": rng.uniform(0.3, 1.0, n).round(2),
+        "ComplianceScore": rng.uniform(0.3, 1.0, n).round(2),
+        "ResponsivenessScore": rng.uniform(0.3, 1.0, n).round(2),
+        "ExclusivityFlag": rng.integers(0, 2, n),
+    })
+
+
+def scalar_scores(df: pd.DataFrame) -> np.ndarray:
+    return np.array([
+        calculate_merchant_trust_score(*row)
+        for row in zip(
+            df["RepaymentRate"].tolist(), df["DisputeRate"].tolist(), df["DefaultRate"].tolist(),
+            df["TransactionVolume"].tolist(), df["EngagementScore"].tolist(),
+            df["ComplianceScore"].tolist(), df["ResponsivenessScore"].tolist(),
+            df["ExclusivityFlag"].tolist(),
+        )
+    ], dtype=float)
+
+
+def vector_scores(df: pd.DataFrame) -> np.ndarray:
+    return calculate_merchant_trust_scores(
+        df["RepaymentRate"], df["DisputeRate"], df["DefaultRate"],
+        df["TransactionVolume"], df["EngagementScore"],
+        df["ComplianceScore"], df["ResponsivenessScore"],
+        df["ExclusivityFlag"],
+    )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--merchants", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = make_merchants(args.merchants, args.seed)
+
+    _, scalar_secs = timed(scalar_scores, df)
+    scores, vector_secs = timed(vector_scores, df)
+    _, tier_secs = timed(assign_loyalty_tiers, scores)
+
+    print(f"merchants:          {args.merchants:,}")
+    print(f"scalar TrustScore:  {scalar_secs * 1000:10.1f} ms")
+    print(f"vector TrustScore:  {vector_secs * 1000:10.1f} ms  ({scalar_secs / vector_secs:.0f}x)")
+    print(f"vector LoyaltyTier: {tier_secs * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
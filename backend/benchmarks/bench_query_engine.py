@@ -0,0 +1,64 @@
+"""
+bench_query_engine.py
+
+Measures the local /ai-query engine in app/query_engine.py on synthetic
+customer metrics: which queries it answers without the LLM, what it
+answers, and time per query.
+
+- Queries mix ranking, aggregation, filtered lists and open-ended questions
+  (the open-ended ones should be deferred to the LLM)
+- Customer metrics are generated from synthetic payments
+
+Usage (from backend/):
+    python -m benchmarks.bench_query_engine --customers 100000 --repeat 20
+"""
+
+import argparse
+import time
+
+from app.endpoints.customers_router import CUSTOMER_FULL_FIELDS_ORDER, prepare_customer_metrics
+from app.query_engine import QueryEngine
+from benchmarks.bench_customer_metrics import make_payments
+
+QUERIES = [
+    "Top 10 customers by TrustScore",
+    "Which customers have the highest default rate?",
+    "Customers with the best default rate",
+    "Bottom 5 customers by repayment rate",
+    "Average repayment rate by tier",
+    "How many Gold customers are there?",
+    "Total transaction volume of Platinum customers",
+    "Customers with more than 2 disputes",
+    "Bronze customers with default rate above 20%",
+    "Show customers in the Silver tier with TrustScore below 60",
+    "Why are Bronze customers defaulting?",
+    "Recommend a strategy for improving repayment",
+    "Give me an overview of our customers",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20, help="Timing passes per query")
+    args = parser.parse_args()
+
+    df = prepare_customer_metrics(make_payments(args.customers * 20, args.seed))
+    engine = QueryEngine()
+    print(f"{len(df):,} customers")
+    for query in QUERIES:
+        result = engine.answer(df, query, CUSTOMER_FULL_FIELDS_ORDER)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            engine.answer(df, query, CUSTOMER_FULL_FIELDS_ORDER)
+        per_query = (time.perf_counter() - start) / args.repeat
+        answer = result["answer"] if result is not None else "-> LLM"
+        print(f"{per_query * 1000:>8.2f} ms  {query}\n{'':>13}{answer}")
+
+    stats = engine.stats()
+    print(f"answered locally: {stats['local'] // (args.repeat + 1)}/{len(QUERIES)} queries")
+
+
+if __name__ == "__main__":
+    main()
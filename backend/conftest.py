@@ -0,0 +1,50 @@
+"""
+Shared pytest setup for the backend tests (run from backend/: ``python -m pytest``).
+
+app.utils builds its OpenAI client at import time, so a placeholder key is
+set before any app module is imported; the tests never call the model.
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+# Keep the shared AI cache off app/data/ai_cache.db
+os.environ.setdefault("AI_CACHE_ENABLED", "0")
+# No background enrichment worker or queue during tests
+os.environ.setdefault("ENRICHMENT_ENABLED", "0")
+
+# Manual script against a running server with a real key (python test_ai_integration.py)
+collect_ignore = ["test_ai_integration.py"]
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """A fresh app.db in tmp_path, loaded from the bundled CSVs, behind db.pool."""
+    from app import db
+    from app.db_pool import ConnectionPool
+
+    pool = ConnectionPool(tmp_path / "app.db")
+    monkeypatch.setattr(db, "pool", pool)
+    db.init_db_from_csv()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def client(app_db):
+    """TestClient over the app_db database."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.response_cache import response_cache
+    from app.snapshot import SNAPSHOTS
+
+    # Cached responses and snapshots are keyed by data version, which restarts
+    # at 0 with every database
+    response_cache.clear()
+    for snapshot in SNAPSHOTS.values():
+        snapshot.reload()
+    yield TestClient(app)
+    response_cache.clear()
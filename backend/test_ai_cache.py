@@ -0,0 +1,135 @@
+"""
+Tests for the two-tier AI response cache (app/ai_cache.py): hits, misses and
+expiry in the memory LRU and the SQLite tier, and disk-tier eviction.
+"""
+
+import types
+
+import numpy as np
+import pytest
+
+from app import ai_cache as ai_cache_module
+from app.ai_cache import AICache
+
+TTL = 60
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_cache_module, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture
+def make_cache(tmp_path, clock):
+    caches = []
+
+    def make(memory_entries: int = 8, disk_entries: int = 100) -> AICache:
+        cache = AICache(tmp_path / "ai_cache.db", memory_entries, disk_entries, TTL)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def disk_keys(cache: AICache) -> set:
+    with cache._pool.connection() as conn:
+        return {key for key, in conn.execute("SELECT Key FROM ai_cache")}
+
+
+def test_miss_then_memory_hit(make_cache):
+    cache = make_cache()
+    assert cache.get("k") == (False, None)
+    cache.set("k", {"summary": "ok"})
+    assert cache.get("k") == (True, {"summary": "ok"})
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["memoryHits"], stats["diskHits"], stats["stores"]) == (1, 1, 0, 1)
+    assert stats["diskEntries"] == 1
+
+
+def test_disk_hit_survives_restart_and_is_promoted(make_cache):
+    make_cache().set("k", ["a", "b"])
+
+    cache = make_cache()
+    assert cache.get("k") == (True, ["a", "b"])
+    assert cache.get("k") == (True, ["a", "b"])
+    stats = cache.stats()
+    assert (stats["diskHits"], stats["memoryHits"]) == (1, 1)
+
+
+def test_memory_eviction_falls_back_to_disk(make_cache):
+    cache = make_cache(memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+
+    assert cache.stats()["memoryEvictions"] == 1
+    assert cache.get("a") == (True, "A")
+    assert cache.stats()["diskHits"] == 1
+
+
+def test_expired_entries_miss_in_both_tiers(make_cache, clock):
+    cache = make_cache()
+    cache.set("k", "value")
+    clock.now += TTL - 1
+    assert cache.get("k") == (True, "value")
+
+    clock.now += 1
+    assert cache.get("k") == (False, None)
+    stats = cache.stats()
+    # Dropped from memory, then found expired and deleted on disk
+    assert (stats["expired"], stats["misses"], stats["diskEntries"]) == (2, 1, 0)
+
+
+def test_expired_disk_entry_misses_after_restart(make_cache, clock):
+    make_cache().set("k", "value")
+    clock.now += TTL
+
+    cache = make_cache()
+    assert cache.get("k") == (False, None)
+    assert disk_keys(cache) == set()
+
+
+def test_disk_tier_evicts_least_recently_used(make_cache, clock):
+    cache = make_cache(memory_entries=1, disk_entries=10)
+    for i in range(10):
+        cache.set(f"k{i}", i)
+        clock.now += 1
+    # Touch k0 on disk so it is the most recently used
+    assert cache.get("k0") == (True, 0)
+    clock.now += 1
+
+    cache.set("k10", 10)
+    keys = disk_keys(cache)
+    assert len(keys) == 9
+    assert {"k0", "k10"} <= keys
+    assert "k1" not in keys
+    assert cache.stats()["diskEvictions"] == 2
+
+
+def test_sweep_purges_expired_rows(make_cache, clock):
+    cache = make_cache(memory_entries=1, disk_entries=3)
+    cache.set("old", 1)
+    clock.now += TTL
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert disk_keys(cache) == {"a", "b", "c"}
+    assert cache.stats()["expired"] == 1
+
+
+def test_make_key_is_canonical():
+    key = AICache.make_key("summary", "customer", {"a": 1, "b": 2.5}, "model", "system")
+    assert key == AICache.make_key("summary", "customer", {"b": np.float64(2.5), "a": np.int64(1)}, "model", "system")
+    assert key != AICache.make_key("summary", "customer", {"a": 1, "b": 2.6}, "model", "system")
+    assert key != AICache.make_key("summary", "customer", {"a": 1, "b": 2.5}, "other-model", "system")
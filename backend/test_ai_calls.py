@@ -0,0 +1,174 @@
+"""
+Tests for call_ai / acall_ai in app/utils.py around the model: cached answers
+are served without calling it, the SQLite cache tier is only touched off the
+event loop, and concurrent identical calls reach the model once. The model
+itself is always faked.
+"""
+
+import asyncio
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import utils
+from app.ai_cache import AICache
+from app.single_flight import ai_async_single_flight, ai_single_flight
+
+CALLERS = 8
+
+PROFILE = {"CustomerID": "C001", "TrustScore": 91.5, "LoyaltyTier": "Platinum"}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = AICache(tmp_path / "ai_cache.db", memory_entries=8, disk_entries=100, ttl_seconds=3600)
+    monkeypatch.setattr(utils, "ai_cache", cache)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def loop_threads(cache, monkeypatch):
+    """Records the thread of every cache get/set."""
+    threads = []
+    for name in ("get", "set"):
+        method = getattr(cache, name)
+
+        def traced(*args, _method=method):
+            threads.append(threading.get_ident())
+            return _method(*args)
+
+        monkeypatch.setattr(cache, name, traced)
+    return threads
+
+
+def summary_key(data=PROFILE) -> str:
+    return AICache.make_key("summary", "customer", data, utils.AI_MODEL, utils.DEFAULT_AI_SYSTEM)
+
+
+async def no_model(*args, **kwargs):
+    raise AssertionError("the model must not be called")
+
+
+def test_acall_ai_serves_cache_hits_off_the_event_loop(cache, loop_threads, monkeypatch):
+    monkeypatch.setattr(utils, "achat", no_model)
+    cache.set(summary_key(), "Cached summary.")
+    loop_threads.clear()
+
+    async def main():
+        result = await utils.acall_ai("summary", "customer", PROFILE, "fallback")
+        return result, threading.get_ident()
+
+    result, loop_thread = asyncio.run(main())
+    assert result == "Cached summary."
+    assert loop_threads and loop_thread not in loop_threads
+
+
+def test_acall_ai_stores_answers_off_the_event_loop(cache, loop_threads, monkeypatch):
+    async def fake_achat(messages, **kwargs):
+        return "  Fresh summary. "
+
+    monkeypatch.setattr(utils, "achat", fake_achat)
+
+    async def main():
+        first = await utils.acall_ai("summary", "customer", PROFILE, "fallback")
+        # Second call is a hit, the model is no longer reachable
+        monkeypatch.setattr(utils, "achat", no_model)
+        second = await utils.acall_ai("summary", "customer", PROFILE, "fallback")
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(main())
+    assert first == second == "Fresh summary."
+    assert loop_threads and loop_thread not in loop_threads
+    assert cache.get(summary_key()) == (True, "Fresh summary.")
+
+
+def test_acall_ai_does_not_cache_fallbacks(cache, monkeypatch):
+    async def failing_achat(messages, **kwargs):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(utils, "achat", failing_achat)
+    assert asyncio.run(utils.acall_ai("summary", "customer", PROFILE, "fallback")) == "fallback"
+    assert cache.get(summary_key()) == (False, None)
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class BlockingClient:
+    """Sync OpenAI client stand-in whose completions block until released."""
+
+    api_key = "sk-test"
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        assert self.release.wait(5)
+        message = types.SimpleNamespace(content="Shared summary.")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def test_concurrent_call_ai_reaches_the_client_once(monkeypatch):
+    monkeypatch.setattr(utils, "ai_cache", None)
+    client = BlockingClient()
+    monkeypatch.setattr(utils, "client", client)
+    shared_before = ai_single_flight.stats()["shared"]
+
+    with ThreadPoolExecutor(CALLERS) as executor:
+        futures = [executor.submit(utils.call_ai, "summary", "customer", PROFILE, "fallback") for _ in range(CALLERS)]
+        # Release the leader only once every other caller is waiting on it
+        wait_for(lambda: ai_single_flight.stats()["shared"] - shared_before == CALLERS - 1)
+        client.release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["Shared summary."] * CALLERS
+    assert len(client.calls) == 1
+    assert ai_single_flight.stats()["inFlight"] == 0
+
+
+def test_concurrent_acall_ai_reaches_the_model_once(monkeypatch):
+    monkeypatch.setattr(utils, "ai_cache", None)
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def fake_achat(messages, **kwargs):
+            calls.append(messages)
+            await release.wait()
+            return "Shared summary."
+
+        monkeypatch.setattr(utils, "achat", fake_achat)
+        shared_before = ai_async_single_flight.stats()["shared"]
+        tasks = [asyncio.ensure_future(utils.acall_ai("summary", "customer", PROFILE, "fallback")) for _ in range(CALLERS)]
+        while ai_async_single_flight.stats()["shared"] - shared_before < CALLERS - 1:
+            await asyncio.sleep(0.005)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == ["Shared summary."] * CALLERS
+    assert len(calls) == 1
+    assert ai_async_single_flight.stats()["inFlight"] == 0
+
+
+def test_different_profiles_are_not_coalesced(monkeypatch):
+    monkeypatch.setattr(utils, "ai_cache", None)
+    client = BlockingClient()
+    client.release.set()
+    monkeypatch.setattr(utils, "client", client)
+
+    with ThreadPoolExecutor(CALLERS) as executor:
+        profiles = [{**PROFILE, "CustomerID": f"C{i:03d}"} for i in range(CALLERS)]
+        list(executor.map(lambda data: utils.call_ai("summary", "customer", data, "fallback"), profiles))
+    assert len(client.calls) == CALLERS
@@ -0,0 +1,129 @@
+"""
+Tests for POST /ai/chat/stream server-sent event framing: a "meta" frame, the
+answer as delta frames, then exactly one "done" (or "error") frame, for model,
+chart, fallback and failure paths. The model stream is faked.
+"""
+
+import json
+
+import httpx
+import openai
+import pytest
+
+from app.endpoints import ai_router
+from app.endpoints.ai_router import generate_fallback_response
+
+QUESTION = "What is the average payment amount?"
+CHART_QUESTION = "Plot monthly collections"
+
+
+def parse_events(body: str) -> list:
+    """[(event name, data)] from an SSE body; unnamed frames are "message"."""
+    assert body.endswith("\n\n")
+    events = []
+    for frame in body[:-2].split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.split("\n"))
+        assert set(fields) <= {"event", "data"}
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def fake_stream(*chunks, error: Exception = None):
+    calls = []
+
+    async def astream_chat(**kwargs):
+        calls.append(kwargs)
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+    astream_chat.calls = calls
+    return astream_chat
+
+
+def quota_error() -> openai.APIError:
+    return openai.APIError("429 quota exceeded", httpx.Request("POST", "http://openai.test"), body=None)
+
+
+def stream(client, prompt: str, user_type: str = "consumer"):
+    response = client.post("/ai/chat/stream", json={"prompt": prompt, "userType": user_type})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+
+def split(events: list) -> tuple:
+    """(meta data, joined delta text, final event) checking the frame order."""
+    (first, meta), *middle, last = events
+    assert first == "meta"
+    assert all(name == "message" and list(data) == ["delta"] for name, data in middle)
+    return meta, "".join(data["delta"] for _, data in middle), last
+
+
+@pytest.fixture
+def api_key(monkeypatch):
+    monkeypatch.setattr(ai_router, "api_key_configured", lambda: True)
+
+
+@pytest.mark.parametrize("user_type", ["consumer", "merchant"])
+def test_model_tokens_are_forwarded_as_deltas(client, monkeypatch, api_key, user_type):
+    astream_chat = fake_stream("Average", " is $512.\n", "Multi\nline")
+    monkeypatch.setattr(ai_router, "astream_chat", astream_chat)
+
+    meta, text, done = split(stream(client, QUESTION, user_type))
+    assert meta == {"userType": user_type, "isChart": False}
+    assert text == "Average is $512.\nMulti\nline"
+    assert done == ("done", {"userType": user_type, "status": "success"})
+    assert astream_chat.calls[0]["model"] == "gpt-3.5-turbo"
+
+
+def test_chart_requests_stream_chart_code(client, monkeypatch, api_key):
+    monkeypatch.setattr(ai_router, "astream_chat", fake_stream("export default function Chart() {}"))
+
+    meta, text, done = split(stream(client, CHART_QUESTION))
+    assert meta == {"userType": "consumer", "isChart": True}
+    assert text == "export default function Chart() {}"
+    assert done == ("done", {"userType": "consumer", "status": "chart_code"})
+
+
+def test_quota_error_before_first_token_streams_fallback(client, monkeypatch, api_key):
+    monkeypatch.setattr(ai_router, "astream_chat", fake_stream(error=quota_error()))
+
+    _, text, done = split(stream(client, QUESTION))
+    assert text == generate_fallback_response(QUESTION, "consumer", ai_router.get_consumer_data())
+    assert done == ("done", {
+        "userType": "consumer", "status": "fallback", "note": "Using fallback response - OpenAI quota exceeded",
+    })
+
+
+def test_missing_api_key_streams_fallback(client, monkeypatch):
+    monkeypatch.setattr(ai_router, "api_key_configured", lambda: False)
+    monkeypatch.setattr(ai_router, "astream_chat", fake_stream(error=AssertionError("model called")))
+
+    _, text, done = split(stream(client, QUESTION))
+    assert text
+    assert done == ("done", {
+        "userType": "consumer", "status": "fallback", "note": "Using fallback response - OpenAI API not available",
+    })
+
+
+def test_error_after_first_token_ends_with_error_frame(client, monkeypatch, api_key):
+    monkeypatch.setattr(ai_router, "astream_chat", fake_stream("Partial", error=quota_error()))
+
+    _, text, last = split(stream(client, QUESTION))
+    assert text == "Partial"
+    assert last == ("error", {"detail": "OpenAI API error: 429 quota exceeded"})
+
+
+def test_other_errors_end_with_error_frame(client, monkeypatch, api_key):
+    monkeypatch.setattr(ai_router, "astream_chat", fake_stream(error=RuntimeError("boom")))
+
+    _, text, last = split(stream(client, QUESTION))
+    assert text == ""
+    assert last == ("error", {"detail": "Internal server error: boom"})
+
+
+def test_unknown_user_type_is_rejected_before_streaming(client):
+    response = client.post("/ai/chat/stream", json={"prompt": QUESTION, "userType": "admin"})
+    assert response.status_code == 400
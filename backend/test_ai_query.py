@@ -0,0 +1,45 @@
+"""
+Tests for POST /ai-query entity detection: whatever the LLM classifier
+replies, the query runs against "customers" or "merchants". The model is faked.
+"""
+
+import pytest
+
+from app.endpoints import ai_query_router
+from app.endpoints.ai_query_router import parse_entity_type
+
+# No entity keywords, so the local intent classifier defers to the LLM
+AMBIGUOUS_QUERY = "what should we focus on next quarter?"
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ("merchants", "merchants"),
+    (" Merchants.\n", "merchants"),
+    ("'merchant'", "merchants"),
+    ("The query is about merchants", "merchants"),
+    ("customers", "customers"),
+    ("CUSTOMER", "customers"),
+    ("customers or merchants", "customers"),
+    ("vendors", "customers"),
+    ("", "customers"),
+    (None, "customers"),
+    ({"entity": "merchants"}, "customers"),
+])
+def test_parse_entity_type(reply, expected):
+    assert parse_entity_type(reply) == expected
+
+
+@pytest.mark.parametrize("reply, expected", [("Merchants.", "merchants"), ("../../etc", "customers")])
+def test_llm_classified_query_uses_a_known_entity(client, monkeypatch, reply, expected):
+    calls = []
+
+    async def fake_acall_ai(task, entity_type, data, default_response=None, system=""):
+        calls.append((task, entity_type))
+        return reply if task == "classification" else {"message": "ok"}
+
+    monkeypatch.setattr(ai_query_router, "acall_ai", fake_acall_ai)
+    response = client.post("/ai-query", json={"query": AMBIGUOUS_QUERY})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["entity"], body["result"], body["answeredBy"]) == (expected, {"message": "ok"}, "ai")
+    assert calls == [("classification", "auto"), ("analysis", expected)]
@@ -0,0 +1,134 @@
+"""
+Tests for the resumable CSV loader (app/bulk_load.load_csv): an interrupted
+load resumes to the same table a one-shot load produces, a CSV that changed in
+between restarts it, and the header and value types follow the table schema.
+"""
+
+import sqlite3
+
+import pytest
+
+from app.bulk_load import load_csv, load_progress
+
+HEADER = "ItemID,Code,Amount,Quantity\n"
+CHUNK_BYTES = 1024
+
+
+class FailingConnection:
+    """Delegates to a connection, but the executemany after ``blocks`` successful ones raises."""
+
+    def __init__(self, conn: sqlite3.Connection, blocks: int):
+        self._conn = conn
+        self._remaining = blocks
+
+    def executemany(self, *args):
+        if self._remaining == 0:
+            raise sqlite3.OperationalError("disk I/O error")
+        self._remaining -= 1
+        return self._conn.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE items (ItemID TEXT PRIMARY KEY, Code TEXT, Amount REAL, Quantity INTEGER, Note TEXT)"
+    )
+    return conn
+
+
+def write_csv(path, n: int, start: int = 0, header: str = HEADER) -> None:
+    # Codes with leading zeros, and some missing amounts
+    lines = [
+        f"I{i:06d},{i % 1000:04d},{'' if i % 13 == 0 else round(i * 1.25, 2)},{i % 7}\n"
+        for i in range(start, start + n)
+    ]
+    path.write_text(header + "".join(lines))
+
+
+def items(conn: sqlite3.Connection) -> list:
+    return conn.execute(
+        "SELECT ItemID, Code, Amount, Quantity, typeof(Code), typeof(Quantity) FROM items ORDER BY ItemID"
+    ).fetchall()
+
+
+def one_shot(tmp_path, csv_path) -> list:
+    conn = connect(tmp_path / "one_shot.db")
+    load_csv(conn, "items", csv_path, CHUNK_BYTES)
+    rows = items(conn)
+    conn.close()
+    return rows
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(tmp_path / "items.db")
+    yield conn
+    conn.close()
+
+
+def test_values_are_parsed_with_the_table_types(tmp_path, conn):
+    csv_path = tmp_path / "items.csv"
+    write_csv(csv_path, 30)
+    progress = load_csv(conn, "items", csv_path, CHUNK_BYTES)
+    assert (progress["Completed"], progress["RowsLoaded"]) == (1, 30)
+
+    rows = items(conn)
+    assert rows[7][:4] == ("I000007", "0007", 8.75, 0)
+    assert rows[13][2] is None
+    assert {row[4:] for row in rows} == {("text", "integer")}
+
+
+def test_interrupted_load_resumes_to_the_one_shot_result(tmp_path, conn):
+    csv_path = tmp_path / "items.csv"
+    write_csv(csv_path, 2000)
+
+    with pytest.raises(sqlite3.OperationalError):
+        load_csv(FailingConnection(conn, blocks=5), "items", csv_path, CHUNK_BYTES)
+    progress = load_progress(conn)[0]
+    committed = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    assert progress["Completed"] == 0
+    assert 0 < progress["RowsLoaded"] == committed < 2000
+
+    resumed = load_csv(conn, "items", csv_path, CHUNK_BYTES)
+    assert (resumed["Completed"], resumed["RowsLoaded"]) == (1, 2000)
+    assert items(conn) == one_shot(tmp_path, csv_path)
+    assert load_csv(conn, "items", csv_path, CHUNK_BYTES)["skipped"] == "already loaded"
+
+
+def test_changed_csv_restarts_the_load(tmp_path, conn):
+    csv_path = tmp_path / "items.csv"
+    write_csv(csv_path, 2000)
+    with pytest.raises(sqlite3.OperationalError):
+        load_csv(FailingConnection(conn, blocks=5), "items", csv_path, CHUNK_BYTES)
+
+    # Different rows: resuming at the old offset would mix both files
+    write_csv(csv_path, 1500, start=10_000)
+    resumed = load_csv(conn, "items", csv_path, CHUNK_BYTES)
+    assert (resumed["Completed"], resumed["RowsLoaded"]) == (1, 1500)
+    assert items(conn) == one_shot(tmp_path, csv_path)
+    assert items(conn)[0][0] == "I010000"
+
+
+def test_header_is_parsed_as_csv(tmp_path, conn):
+    csv_path = tmp_path / "items.csv"
+    write_csv(csv_path, 10, header='﻿"ItemID", "Code" ,Amount,Quantity\n')
+    assert load_csv(conn, "items", csv_path, CHUNK_BYTES)["RowsLoaded"] == 10
+    assert items(conn) == one_shot(tmp_path, csv_path)
+
+
+@pytest.mark.parametrize("header", [
+    "ItemID,Code,Amount,Qty\n",
+    "ItemID,Code,Amount,Quantity) VALUES (1,2,3,4); DROP TABLE items; --\n",
+    "ItemID,Code,Code,Quantity\n",
+    "\n",
+])
+def test_bad_header_is_rejected_before_loading(tmp_path, conn, header):
+    csv_path = tmp_path / "items.csv"
+    write_csv(csv_path, 10, header=header)
+    with pytest.raises(ValueError):
+        load_csv(conn, "items", csv_path, CHUNK_BYTES)
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    assert load_progress(conn) == []
@@ -0,0 +1,122 @@
+"""
+Tests for the optional Parquet payments store (app/columnar_store.py): reads
+match SQLite after the initial export and after incremental ingest, reads
+never write the store, and without pyarrow everything is served from SQLite.
+The Parquet tests are skipped when pyarrow is not installed.
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+from app import columnar_store as columnar_store_module
+from app.columnar_store import PAYMENT_COLUMNS, ColumnarPaymentStore
+from app.db import get_connection, ingest_payments
+from app.endpoints import payments_router
+from app.snapshot import CUSTOMER_PAYMENT_COLUMNS
+
+
+def make_payments(start: int, n: int, month: str = "2031-02") -> list:
+    return [
+        {
+            "PaymentID": f"T-COL-{start + i:05d}", "CustomerID": f"C{i % 60 + 1:03d}",
+            "CustomerName": f"Customer {i % 60 + 1}", "MerchantID": f"M{i % 20 + 1:03d}",
+            "MerchantName": f"Merchant {chr(ord('A') + i % 20)}", "PaymentDate": f"{month}-{i % 28 + 1:02d}",
+            "PaymentAmount": round(5 + i * 3.17 % 900, 2), "PaymentStatus": "FAILED" if i % 4 == 0 else "PAID",
+            "DisputeFlag": int(i % 9 == 0), "DefaultFlag": int(i % 10 == 0),
+        }
+        for i in range(n)
+    ]
+
+
+def sqlite_payments(columns=PAYMENT_COLUMNS, months=None) -> pd.DataFrame:
+    query = f"SELECT {', '.join(columns)} FROM payments"
+    if months is not None:
+        query += f" WHERE substr(PaymentDate, 1, 7) IN ({', '.join(repr(m) for m in months)})"
+    with get_connection() as conn:
+        return pd.read_sql_query(query, conn)
+
+
+def assert_same_rows(actual: pd.DataFrame, expected: pd.DataFrame) -> None:
+    key = list(expected.columns)
+    assert list(actual.columns) == key
+    pd.testing.assert_frame_equal(
+        actual.sort_values(key, ignore_index=True).astype(object),
+        expected.sort_values(key, ignore_index=True).astype(object),
+    )
+
+
+def test_without_pyarrow_reads_come_from_sqlite(app_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar_store_module, "pa", None)
+    store = ColumnarPaymentStore(tmp_path / "parquet", enabled=True)
+
+    assert store.enabled is False
+    stats = store.sync(verify=True)
+    assert (stats["enabled"], stats["pyarrowAvailable"], stats["rows"]) == (False, False, None)
+    assert not (tmp_path / "parquet").exists()
+
+    assert_same_rows(store.read_payments(CUSTOMER_PAYMENT_COLUMNS), sqlite_payments(CUSTOMER_PAYMENT_COLUMNS))
+    assert (store.stats()["sqliteReads"], store.stats()["parquetReads"]) == (1, 0)
+
+
+@pytest.fixture
+def store(app_db, tmp_path):
+    pytest.importorskip("pyarrow")
+    store = ColumnarPaymentStore(tmp_path / "parquet", enabled=True)
+    store.sync(verify=True)
+    return store
+
+
+def test_initial_export_matches_sqlite(store):
+    with get_connection() as conn:
+        assert store.stats()["rows"] == conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0]
+
+    assert_same_rows(store.read_payments(), sqlite_payments())
+    assert_same_rows(store.read_payments(CUSTOMER_PAYMENT_COLUMNS), sqlite_payments(CUSTOMER_PAYMENT_COLUMNS))
+    month = sqlite_payments(["PaymentDate"])["PaymentDate"].str[:7].iloc[0]
+    assert_same_rows(store.read_payments(PAYMENT_COLUMNS, [month]), sqlite_payments(PAYMENT_COLUMNS, [month]))
+    assert store.stats()["parquetReads"] == 3
+
+
+def test_reads_after_ingest_use_sqlite_until_synced(store):
+    manifest, exported = store._read_manifest(), store.stats()["rowsAppended"]
+    with get_connection() as conn:
+        ingest_payments(conn, make_payments(0, 300))
+
+    # Behind app.db: served from SQLite, and the read does not touch the store
+    assert_same_rows(store.read_payments(), sqlite_payments())
+    assert store.stats()["staleReads"] == 1
+    assert store._read_manifest() == manifest
+
+    assert store.sync()["rowsAppended"] - exported == 300
+    assert_same_rows(store.read_payments(), sqlite_payments())
+    assert_same_rows(store.read_payments(PAYMENT_COLUMNS, ["2031-02"]), sqlite_payments(PAYMENT_COLUMNS, ["2031-02"]))
+    assert store.stats()["parquetReads"] == 2
+
+
+def test_ingest_endpoint_syncs_the_store(client, store, monkeypatch):
+    monkeypatch.setattr(payments_router, "columnar_store", store)
+    response = client.post("/payments/batch", json={"payments": make_payments(0, 120, month="2031-03")})
+    assert response.json()["inserted"] == 120
+
+    assert_same_rows(store.read_payments(), sqlite_payments())
+    assert (store.stats()["parquetReads"], store.stats()["staleReads"]) == (1, 0)
+
+
+def test_concurrent_syncs_from_two_stores_append_once(store, tmp_path):
+    # Two instances over one directory stand in for two API worker processes
+    other = ColumnarPaymentStore(tmp_path / "parquet", enabled=True)
+    exported = store.stats()["rowsAppended"]
+    with get_connection() as conn:
+        ingest_payments(conn, make_payments(0, 500))
+
+    threads = [threading.Thread(target=s.sync) for s in (store, other)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.stats()["rowsAppended"] + other.stats()["rowsAppended"] - exported == 500
+    assert_same_rows(store.read_payments(), sqlite_payments())
+    assert (tmp_path / "parquet.lock").exists()
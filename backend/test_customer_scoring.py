@@ -0,0 +1,73 @@
+"""
+Tests for the columnar customer scoring: calculate_customer_trust_scores and
+prepare_customer_metrics are bit-for-bit equal to the scalar, row-by-row formula.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.db import PAYMENTS_CSV
+from app.endpoints.customers_router import prepare_customer_metrics
+from app.utils import calculate_customer_trust_score, calculate_customer_trust_scores, get_customer_trust_loyalty
+
+
+def make_payments(n: int, seed: int) -> pd.DataFrame:
+    # About 20 payments per customer, so rates land on many two-decimal values
+    rng = np.random.default_rng(seed)
+    customer_idx = rng.integers(0, max(n // 20, 1), n)
+    return pd.DataFrame({
+        "CustomerID": [f"C{i + 1:05d}" for i in customer_idx],
+        "CustomerName": [f"Customer {i + 1}" for i in customer_idx],
+        "PaymentAmount": rng.uniform(20, 2000, n).round(2),
+        "PaymentStatus": np.where(rng.random(n) < 0.15, "FAILED", "PAID"),
+        "DisputeFlag": (rng.random(n) < 0.1).astype(int),
+        "DefaultFlag": (rng.random(n) < 0.1).astype(int),
+    })
+
+
+def scalar_metrics(customers: pd.DataFrame) -> pd.DataFrame:
+    results = [
+        get_customer_trust_loyalty(repayment, disputes, default)
+        for repayment, disputes, default in zip(
+            customers["RepaymentRate"].tolist(), customers["DisputeCount"].tolist(), customers["DefaultRate"].tolist()
+        )
+    ]
+    return pd.DataFrame(results, index=customers.index)
+
+
+def test_vectorized_scores_are_bit_for_bit_equal():
+    rng = np.random.default_rng(7)
+    n = 200_000
+    repayment = rng.integers(0, 101, n) / 100
+    disputes = rng.integers(0, 15, n)
+    default = rng.integers(0, 101, n) / 100
+
+    expected = np.array(
+        [calculate_customer_trust_score(*row) for row in zip(repayment.tolist(), disputes.tolist(), default.tolist())]
+    )
+    actual = calculate_customer_trust_scores(repayment, disputes, default)
+    # Compare the raw float64 bit patterns, not within a tolerance
+    assert np.array_equal(actual.view(np.int64), expected.view(np.int64))
+
+
+def test_prepared_customers_match_scalar_formula():
+    for payments in (make_payments(100_000, seed=42), pd.read_csv(PAYMENTS_CSV)):
+        customers = prepare_customer_metrics(payments)
+        expected = scalar_metrics(customers)
+        assert np.array_equal(
+            customers["TrustScore"].to_numpy(float).view(np.int64),
+            expected["TrustScore"].to_numpy(float).view(np.int64),
+        )
+        assert customers["LoyaltyTier"].tolist() == expected["LoyaltyTier"].tolist()
+
+
+def test_prepared_customer_aggregates():
+    payments = make_payments(5_000, seed=3)
+    customers = prepare_customer_metrics(payments).set_index("CustomerID")
+    for customer_id, rows in payments.groupby("CustomerID"):
+        row = customers.loc[customer_id]
+        assert row["RepaymentRate"] == round((rows["PaymentStatus"] == "PAID").mean(), 2)
+        assert row["DisputeCount"] == rows["DisputeFlag"].sum()
+        assert row["DefaultRate"] == round(rows["DefaultFlag"].mean(), 2)
+        # Summation order can differ from Series.sum in the last bit, so allow either side of a .5
+        assert abs(row["TransactionVolume"] - rows["PaymentAmount"].sum()) <= 0.5 + 1e-6
@@ -0,0 +1,120 @@
+"""
+Tests for precomputed AI enrichment (app/enrichment.py, jobs/enrichment_worker.py):
+detail endpoints serve template fallbacks until the worker has run, then the
+stored values; changed metrics mark them stale; the queue de-duplicates IDs
+and ingest queues only customers with new payments. The model is faked.
+"""
+
+import pytest
+
+from app.enrichment import EnrichmentQueue, enrichment_queue
+from app.jobs import enrichment_worker as worker_module
+from app.jobs.enrichment_worker import EnrichmentWorker
+from app.utils import RECOMMENDERS, default_summary
+
+
+def make_payment(payment_id: str, customer_id: str) -> dict:
+    return {
+        "PaymentID": payment_id, "CustomerID": customer_id, "CustomerName": f"Customer {customer_id}",
+        "MerchantID": "M001", "MerchantName": "Merchant A", "PaymentDate": "2024-06-01",
+        "PaymentAmount": 250.0, "PaymentStatus": "FAILED", "DisputeFlag": 1, "DefaultFlag": 1,
+    }
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """The shared queue, accepting work as if the worker were running."""
+    enrichment_queue.clear()
+    monkeypatch.setattr(enrichment_queue, "active", True)
+    yield enrichment_queue
+    enrichment_queue.clear()
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """An enrichment worker (not started) whose summaries and recommendations come from a fake model."""
+    calls = []
+
+    def fake_summaries(entity_type, profiles):
+        calls.append(list(profiles))
+        return {"summaries": {entity_id: f"AI summary {len(calls)}" for entity_id in profiles}}
+
+    def recommend(data):
+        return [{"title": "AI", "description": f"Keep {data['CustomerID']} on track"}]
+
+    monkeypatch.setattr(worker_module, "generate_summaries_batch", fake_summaries)
+    monkeypatch.setitem(RECOMMENDERS, "customer", (recommend, RECOMMENDERS["customer"][1]))
+    worker = EnrichmentWorker(batch_size=20, sweep_seconds=600, retry_seconds=3600)
+    worker.summary_calls = calls
+    return worker
+
+
+def test_queue_deduplicates_ids():
+    queue = EnrichmentQueue()
+    assert queue.put("customer", ["C001"]) == 0, "inactive queue accepts nothing"
+
+    queue.active = True
+    assert queue.put("customer", ["C001", "C002", "C001"]) == 2
+    assert queue.put("customer", ["C002", "C003"]) == 1
+    assert queue.put("merchant", ["C001"]) == 1
+    assert len(queue) == 4
+
+    assert queue.take(2, timeout=0) == ("customer", ["C001", "C002"])
+    assert queue.take(10, timeout=0) == ("customer", ["C003"])
+    # Taken IDs can be queued again
+    assert queue.put("customer", ["C001"]) == 1
+    assert queue.take(10, timeout=0) == ("merchant", ["C001"])
+    assert queue.take(10, timeout=0) == ("customer", ["C001"])
+    assert queue.take(10, timeout=0) == (None, [])
+
+
+def test_detail_serves_fallback_then_precomputed(client, queue, worker):
+    pending = client.get("/customers/C001").json()
+    assert pending["Enrichment"] == {"status": "pending", "source": None, "updatedAt": None, "ageSeconds": None}
+    assert pending["Summary"] == default_summary(pending)
+    assert pending["Recommendations"] == RECOMMENDERS["customer"][1](pending)
+    assert queue.take(10, timeout=0) == ("customer", ["C001"])
+
+    assert worker.enrich("customer", ["C001"]) == 1
+    fresh = client.get("/customers/C001").json()
+    assert (fresh["Enrichment"]["status"], fresh["Enrichment"]["source"]) == ("fresh", "ai")
+    assert fresh["Summary"] == "AI summary 1"
+    assert fresh["Recommendations"] == [{"title": "AI", "description": "Keep C001 on track"}]
+    assert fresh["Benchmark"].startswith("Top ")
+    assert len(queue) == 0
+
+    # Unchanged metrics: nothing to regenerate
+    assert worker.enrich("customer", ["C001"]) == 0
+    assert len(worker.summary_calls) == 1
+
+
+def test_changed_metrics_mark_enrichment_stale(client, queue, worker):
+    worker.enrich("customer", ["C001"])
+    assert client.post("/payments/batch", json={"payments": [make_payment("T-STALE-1", "C001")]}).status_code == 200
+    assert queue.take(10, timeout=0) == ("customer", ["C001"])
+
+    stale = client.get("/customers/C001").json()
+    assert stale["Enrichment"]["status"] == "stale"
+    assert stale["Summary"] == "AI summary 1"
+    assert queue.take(10, timeout=0) == ("customer", ["C001"])
+
+    assert worker.enrich("customer", ["C001"]) == 1
+    refreshed = client.get("/customers/C001").json()
+    assert refreshed["Enrichment"]["status"] == "fresh"
+    assert refreshed["Summary"] == "AI summary 2"
+
+
+def test_ingest_queues_only_customers_with_new_payments(client, queue):
+    first = client.post("/payments/batch", json={"payments": [make_payment("T-Q-1", "C001")]}).json()
+    assert first["enrichmentQueued"] == 1
+    queue.take(10, timeout=0)
+
+    replay = client.post("/payments/batch", json={"payments": [make_payment("T-Q-1", "C001")]}).json()
+    assert replay["inserted"] == 0
+    assert "enrichmentQueued" not in replay
+    assert len(queue) == 0
+
+    mixed = [make_payment("T-Q-1", "C001"), make_payment("T-Q-2", "C002")]
+    result = client.post("/payments/batch", json={"payments": mixed}).json()
+    assert (result["inserted"], result["enrichmentQueued"]) == (1, 1)
+    assert queue.take(10, timeout=0) == ("customer", ["C002"])
@@ -0,0 +1,69 @@
+"""
+Tests for the vectorized merchant scoring in app/utils.py: TrustScore and
+LoyaltyTier are bit-for-bit equal to the scalar functions.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.db import MERCHANTS_CSV
+from app.endpoints.merchants_router import prepare_merchant_metrics
+from app.utils import (
+    assign_loyalty_tier,
+    assign_loyalty_tiers,
+    calculate_merchant_trust_score,
+    calculate_merchant_trust_scores,
+)
+
+SCORE_COLUMNS = [
+    "RepaymentRate", "DisputeRate", "DefaultRate", "TransactionVolume",
+    "EngagementScore", "ComplianceScore", "ResponsivenessScore", "ExclusivityFlag",
+]
+
+
+def make_merchants(n: int, seed: int) -> pd.DataFrame:
+    # Exclusivity, volumes around the 1000 threshold, the log10 bonus cap (volume > 1e5)
+    # and the 100 score cap are all common
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "RepaymentRate": rng.uniform(0.5, 1.0, n).round(2),
+        "DisputeRate": rng.uniform(0.0, 0.2, n).round(2),
+        "DefaultRate": rng.uniform(0.0, 0.2, n).round(2),
+        "TransactionVolume": np.where(
+            rng.random(n) < 0.2, rng.integers(990, 1011, n), rng.integers(1, 500_000, n)
+        ),
+        "EngagementScore": rng.uniform(0.3, 1.0, n).round(2),
+        "ComplianceScore": rng.uniform(0.3, 1.0, n).round(2),
+        "ResponsivenessScore": rng.uniform(0.3, 1.0, n).round(2),
+        "ExclusivityFlag": rng.integers(0, 2, n),
+    })
+
+
+def scalar_scores(df: pd.DataFrame) -> np.ndarray:
+    return np.array(
+        [calculate_merchant_trust_score(*row) for row in zip(*(df[c].tolist() for c in SCORE_COLUMNS))],
+        dtype=float,
+    )
+
+
+def test_vectorized_scores_are_bit_for_bit_equal():
+    df = make_merchants(200_000, seed=42)
+    expected = scalar_scores(df)
+    actual = calculate_merchant_trust_scores(*(df[c] for c in SCORE_COLUMNS))
+    # Compare the raw float64 bit patterns, not within a tolerance
+    assert np.array_equal(actual.view(np.int64), expected.view(np.int64))
+
+
+def test_vectorized_tiers_match_scalar():
+    scores = np.concatenate([
+        np.linspace(0, 100, 10_001),
+        [79.99, 80, 80.01, 89.99, 90, 90.01, 94.99, 95, 95.01, np.nextafter(95, 0)],
+    ])
+    assert assign_loyalty_tiers(scores).tolist() == [assign_loyalty_tier(s) for s in scores.tolist()]
+
+
+def test_prepared_merchants_match_scalar_formula():
+    merchants = prepare_merchant_metrics(pd.read_csv(MERCHANTS_CSV))
+    expected = scalar_scores(merchants)
+    assert np.array_equal(merchants["TrustScore"].to_numpy(float).view(np.int64), expected.view(np.int64))
+    assert merchants["LoyaltyTier"].tolist() == [assign_loyalty_tier(s) for s in expected.tolist()]
@@ -0,0 +1,123 @@
+"""
+Tests for payment ingest: replaying a batch changes nothing, the
+incrementally maintained aggregates match a full rebuild from payments, and
+dashboards built from them match the payments table.
+"""
+
+import sqlite3
+
+import pytest
+from pydantic import ValidationError
+
+from app.db import (
+    get_connection,
+    get_data_version,
+    ingest_payments,
+    rebuild_customer_metrics,
+    rebuild_payment_rollups,
+)
+from app.endpoints.ai_router import get_consumer_data, get_merchant_data
+from app.endpoints.dashboard import build_consumers_dashboard
+from app.models import PaymentBatch
+
+AGGREGATE_TABLES = {
+    "customer_metrics": "CustomerID",
+    "payments_daily": "Day, PaymentStatus, MerchantID",
+    "payments_monthly": "Month, PaymentStatus, MerchantID",
+}
+
+
+def make_payments(start: int, n: int) -> list:
+    # Existing customers (C001..C050) and merchants (M001..M020, "Merchant A"..) plus new ones,
+    # across several months
+    return [
+        {
+            "PaymentID": f"T{start + i:05d}",
+            "CustomerID": f"C{i % 60 + 1:03d}",
+            "CustomerName": f"Customer {i % 60 + 1}",
+            "MerchantID": f"M{i % 25 + 1:03d}",
+            "MerchantName": f"Merchant {chr(ord('A') + i % 25)}",
+            "PaymentDate": f"2024-{i % 14 % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "PaymentAmount": round(10 + i * 7.31 % 500, 2),
+            "PaymentStatus": "FAILED" if i % 5 == 0 else "PAID",
+            "DisputeFlag": int(i % 7 == 0),
+            "DefaultFlag": int(i % 11 == 0),
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def conn(app_db):
+    with get_connection() as conn:
+        yield conn
+
+
+def aggregates(conn: sqlite3.Connection) -> dict:
+    return {
+        table: conn.execute(f"SELECT * FROM {table} ORDER BY {key}").fetchall()
+        for table, key in AGGREGATE_TABLES.items()
+    }
+
+
+def test_replayed_batch_is_a_no_op(conn):
+    payments = make_payments(0, 200)
+    first = ingest_payments(conn, payments)
+    assert (first["received"], first["inserted"], first["duplicates"]) == (200, 200, 0)
+    before, version = aggregates(conn), get_data_version(conn)
+
+    replay = ingest_payments(conn, payments)
+    assert (replay["received"], replay["inserted"], replay["duplicates"]) == (200, 0, 200)
+    assert replay["customersUpdated"] == replay["rollupRowsUpdated"] == 0
+    assert aggregates(conn) == before
+    assert get_data_version(conn) == version
+
+
+def test_repeated_ids_within_a_batch_count_once(conn):
+    payments = make_payments(0, 10)
+    result = ingest_payments(conn, payments + payments[:4])
+    assert (result["received"], result["inserted"], result["duplicates"]) == (14, 10, 4)
+
+
+def test_incremental_aggregates_match_full_rebuild(conn):
+    for start in range(0, 900, 300):
+        ingest_payments(conn, make_payments(start, 300))
+    # Overlaps the previous batches: only its last 100 payments are new
+    assert ingest_payments(conn, make_payments(800, 200))["inserted"] == 100
+    incremental = aggregates(conn)
+
+    rebuild_customer_metrics(conn)
+    rebuild_payment_rollups(conn)
+    conn.commit()
+    assert aggregates(conn) == incremental
+
+
+def test_consumers_dashboard_matches_payments(conn):
+    ingest_payments(conn, make_payments(0, 300))
+    expected = conn.execute(
+        """
+        SELECT substr(PaymentDate, 1, 7),
+               SUM(CAST(ROUND(PaymentAmount * 100) AS INTEGER)),
+               SUM(CASE WHEN PaymentStatus = 'PAID' THEN CAST(ROUND(PaymentAmount * 100) AS INTEGER) ELSE 0 END)
+        FROM payments
+        GROUP BY 1
+        ORDER BY 1
+        """
+    ).fetchall()
+
+    series = {s["id"]: s["data"] for s in build_consumers_dashboard()["monthlyCollections"]}
+    assert series["expected"] == [{"x": month, "y": total / 100} for month, total, _ in expected]
+    assert series["received"] == [{"x": month, "y": paid / 100} for month, _, paid in expected]
+
+
+def test_pending_payments_are_rejected():
+    payment = {**make_payments(0, 1)[0], "PaymentStatus": "PENDING"}
+    with pytest.raises(ValidationError):
+        PaymentBatch(payments=[payment])
+
+
+def test_chat_context_has_no_pending_counts(conn):
+    # PENDING is not an accepted status, so the AI chat context does not report it
+    ingest_payments(conn, make_payments(0, 100))
+    for context in (get_consumer_data(), get_merchant_data()):
+        assert "pending" not in context.lower()
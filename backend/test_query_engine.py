@@ -0,0 +1,70 @@
+"""
+Tests for the local /ai-query parser (app/query_engine.parse_query): the
+shapes it answers, and queries it must hand to the LLM rather than answer
+wrongly.
+"""
+
+import pytest
+
+from app.endpoints.customers_router import CUSTOMER_FULL_FIELDS_ORDER as CUSTOMERS
+from app.endpoints.merchants_router import MERCHANT_OUTPUT_FIELDS_ORDER as MERCHANTS
+from app.query_engine import parse_query
+
+
+@pytest.mark.parametrize("query, columns, expected", [
+    ("Top 10 customers by TrustScore", CUSTOMERS,
+     {"operation": "rank", "column": "TrustScore", "ascending": False, "limit": 10}),
+    ("Customers with the best default rate", CUSTOMERS,
+     {"operation": "rank", "column": "DefaultRate", "ascending": True}),
+    ("Bottom 5 customers by repayment rate", CUSTOMERS,
+     {"operation": "rank", "column": "RepaymentRate", "ascending": True, "limit": 5}),
+    ("Average repayment rate by tier", CUSTOMERS,
+     {"operation": "aggregate", "aggregate": "mean", "column": "RepaymentRate", "group_by": "LoyaltyTier"}),
+    ("How many Gold customers are there?", CUSTOMERS,
+     {"operation": "aggregate", "aggregate": "count", "column": None, "tiers": ["Gold"]}),
+    ("Customers with more than 2 disputes", CUSTOMERS,
+     {"operation": "list", "filters": [("DisputeCount", ">", 2.0)]}),
+    ("Bronze customers with default rate above 20%", CUSTOMERS,
+     {"operation": "list", "filters": [("DefaultRate", ">", 0.2)], "tiers": ["Bronze"]}),
+    ("merchants with engagement score above 0.8", MERCHANTS,
+     {"operation": "list", "filters": [("EngagementScore", ">", 0.8)]}),
+    ("top 5 merchants by compliance score", MERCHANTS,
+     {"operation": "rank", "column": "ComplianceScore", "limit": 5}),
+    ("exclusive merchants with tenure over 24 months", MERCHANTS,
+     {"operation": "list", "filters": [("TenureMonths", ">", 24.0)], "exclusive": 1}),
+    ("non-exclusive merchants with dispute rate below 5%", MERCHANTS,
+     {"operation": "list", "filters": [("DisputeRate", "<", 0.05)], "exclusive": 0}),
+])
+def test_parses_supported_shapes(query, columns, expected):
+    plan = parse_query(query, columns)
+    assert plan is not None
+    assert {key: plan[key] for key in expected} == expected
+
+
+@pytest.mark.parametrize("query, columns", [
+    # Negation would flip the result set
+    ("customers whose repayment rate is not above 80%", CUSTOMERS),
+    ("merchants without disputes", MERCHANTS),
+    # Ranges
+    ("customers with trust score between 60 and 80", CUSTOMERS),
+    # "of 0" is a condition the parser does not consume
+    ("how many customers have a dispute count of 0", CUSTOMERS),
+    # Time windows are not in the scored data
+    ("customers in the last 30 days", CUSTOMERS),
+    ("which customers paid over 500 last month", CUSTOMERS),
+    # A fraction metric cannot exceed 100%; a percentage of a count is meaningless
+    ("customers with repayment rate above 500", CUSTOMERS),
+    ("customers with more than 5% disputes", CUSTOMERS),
+    # Two metrics to rank by
+    ("top customers by trust score and default rate", CUSTOMERS),
+    # An aggregate without a metric
+    ("average Gold customers", CUSTOMERS),
+    # Open-ended
+    ("Why are Bronze customers defaulting?", CUSTOMERS),
+    # An empty or negative limit
+    ("top 0 merchants by trust score", MERCHANTS),
+    ("0 best customers", CUSTOMERS),
+    ("top -5 customers by trust score", CUSTOMERS),
+])
+def test_defers_to_llm(query, columns):
+    assert parse_query(query, columns) is None
@@ -0,0 +1,80 @@
+"""
+Tests for the dashboard response cache (app/response_cache.py): a matching
+If-None-Match gets an empty 304, and ingesting payments (a new data version)
+invalidates both the cached body and its ETag.
+"""
+
+import pytest
+
+from app.endpoints.dashboard import build_consumers_dashboard
+from app.response_cache import response_cache
+
+DASHBOARDS = ["/dashboard/consumers", "/dashboard/merchants"]
+
+PAYMENT = {
+    "PaymentID": "T-ETAG-1", "CustomerID": "C001", "CustomerName": "Customer 1",
+    "MerchantID": "M001", "MerchantName": "Merchant A", "PaymentDate": "2031-01-15",
+    "PaymentAmount": 1234.56, "PaymentStatus": "PAID", "DisputeFlag": 0, "DefaultFlag": 0,
+}
+
+
+def ingest(client, payment=PAYMENT) -> dict:
+    response = client.post("/payments/batch", json={"payments": [payment]})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("path", DASHBOARDS)
+def test_matching_etag_returns_304(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(path, headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+    stale = client.get(path, headers={"If-None-Match": '"other"'})
+    assert (stale.status_code, stale.json(), stale.headers["ETag"]) == (200, first.json(), etag)
+
+
+def test_cached_body_matches_a_fresh_build(client):
+    before = response_cache.stats()
+    response = client.get("/dashboard/consumers")
+    assert response.json() == build_consumers_dashboard()
+    assert client.get("/dashboard/consumers").content == response.content
+    after = response_cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+
+
+def test_parameters_get_their_own_entries(client):
+    top5 = client.get("/dashboard/merchants", params={"limit": 5})
+    top10 = client.get("/dashboard/merchants", params={"limit": 10})
+    assert top5.headers["ETag"] != top10.headers["ETag"]
+    assert len(top5.json()["topMerchantTrust"]) == 5
+    assert client.get("/dashboard/merchants", params={"limit": 5}, headers={"If-None-Match": top10.headers["ETag"]}).status_code == 200
+
+
+@pytest.mark.parametrize("path", DASHBOARDS)
+def test_ingest_invalidates_the_etag(client, path):
+    before = client.get(path)
+    etag = before.headers["ETag"]
+
+    version = ingest(client)["dataVersion"]
+    after = client.get(path, headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+    assert after.json() != before.json()
+    assert response_cache.stats()["dataVersion"] == version
+
+    # The new ETag is honoured until the next version
+    assert client.get(path, headers={"If-None-Match": after.headers["ETag"]}).status_code == 304
+
+
+def test_replayed_batch_keeps_the_etag(client):
+    ingest(client)
+    etag = client.get("/dashboard/consumers").headers["ETag"]
+    assert ingest(client)["inserted"] == 0
+    assert client.get("/dashboard/consumers", headers={"If-None-Match": etag}).status_code == 304
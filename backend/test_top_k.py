@@ -0,0 +1,43 @@
+"""
+Tests for utils.select_top_k: same rows and order as a full stable sort
+followed by head(k), for any k (including 0 and k > len(df)).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import select_top_k
+
+
+def make_frame(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    # Few distinct values so ties across several keys are common; some NaNs
+    frame = pd.DataFrame({
+        "a": rng.integers(0, 4, n).astype(float),
+        "b": rng.integers(0, 3, n).astype(float),
+        "c": rng.random(n).round(1),
+    })
+    frame.loc[rng.random(n) < 0.1, "a"] = np.nan
+    return frame
+
+
+def test_matches_sort_values_head():
+    rng = np.random.default_rng(7)
+    for _ in range(500):
+        df = make_frame(rng, int(rng.integers(0, 60)))
+        columns = list(rng.permutation(["a", "b", "c"])[: rng.integers(1, 4)])
+        ascending = [bool(flag) for flag in rng.integers(0, 2, len(columns))]
+        k = int(rng.integers(0, len(df) + 3))
+
+        expected = df.sort_values(columns, ascending=ascending, kind="stable").head(k)
+        actual = select_top_k(df, columns, ascending, k)
+        assert list(actual.index) == list(expected.index), (columns, ascending, k)
+
+
+@pytest.mark.parametrize("columns", [["a"], ["a", "b"], ["a", "b", "c"]])
+@pytest.mark.parametrize("k", [0, -1])
+def test_non_positive_k_returns_no_rows(columns, k):
+    df = make_frame(np.random.default_rng(1), 50)
+    result = select_top_k(df, columns, [False] * len(columns), k)
+    assert result.empty
+    assert list(result.columns) == list(df.columns)
@@ -24,6 +24,8 @@ const ConsumersListing = () => {
   const [page, setPage] = useState(0);
   const [rowsPerPage, setRowsPerPage] = useState(10);
   const [totalCount, setTotalCount] = useState(0);
+  // cursors[i] is the X-Next-Cursor that fetches page i (null for the first page)
+  const [cursors, setCursors] = useState([null]);
   const [isQueryMode, setIsQueryMode] = useState(false);
   const navigate = useNavigate();
 
@@ -33,11 +35,10 @@ const ConsumersListing = () => {
         setLoading(true);
         setError(null);
 
-        // Note: The backend route is /customers but we need to use the leaderboard endpoint
-        // which is likely at /leaderboard/customers based on the file structure
+        const cursor = cursors[page];
         const response = await fetch(
-          `http://localhost:8000/customers?limit=${rowsPerPage}&offset=${
-            page * rowsPerPage
+          `http://localhost:8000/customers?limit=${rowsPerPage}${
+            cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""
           }`
         );
 
@@ -47,7 +48,14 @@ const ConsumersListing = () => {
 
         const data = await response.json();
         setConsumers(data);
-        setTotalCount(data.length); // Note: This is a simplified approach, ideally the API should return total count
+        const nextCursor = response.headers.get("X-Next-Cursor");
+        setCursors((prev) => {
+          const next = prev.slice(0, page + 1);
+          next[page + 1] = nextCursor;
+          return next;
+        });
+        // Keyset pagination has no total count: -1 ("more than") until the last page
+        setTotalCount(nextCursor ? -1 : page * rowsPerPage + data.length);
       } catch (err) {
         console.error("Error fetching consumers:", err);
         setError("Failed to load consumers. Please try again.");
@@ -65,6 +73,7 @@ const ConsumersListing = () => {
 
   const handleChangeRowsPerPage = (event) => {
     setRowsPerPage(parseInt(event.target.value, 10));
+    setCursors([null]);
     setPage(0);
   };
 